@@ -0,0 +1,106 @@
+"""Measure how many chunks must be re-embedded after small page edits
+
+Each page is chunked, edited (a sentence inserted near the top, a sentence
+rewritten in the middle, or a paragraph appended) and chunked again. Chunks
+whose content hash survived the edit keep their stored embeddings when the
+pipeline re-indexes, so the share of new hashes is the share of embed calls
+that a re-index still has to make.
+
+    python benchmarks/chunking_benchmark.py --data apex_college_data.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus_io import iter_records
+from rag_pipeline import chunk_hash, content_defined_chunks, fixed_size_chunks, split_sentences
+
+WORDS = ('student campus course semester faculty laboratory placement company package '
+         'admission eligibility merit counselling hostel library research project '
+         'internship industry scholarship fee payment department engineering science').split()
+
+def synthetic_pages(count: int, seed: int = 42) -> List[Dict]:
+    """Generate pages of random sentences long enough to span several chunks"""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        sentences = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 25))).capitalize() + '.'
+                     for _ in range(rng.randint(30, 90))]
+        pages.append({'title': f"Page {i}", 'content': ' '.join(sentences)})
+    return pages
+
+def edit_page(text: str, kind: str, rng: random.Random) -> str:
+    """Apply one small edit of the given kind to page text"""
+    sentences = split_sentences(text)
+    new_sentence = f"Updated notice {rng.randint(1, 10**6)} for the current academic session."
+    if kind == 'insert-top':
+        sentences.insert(min(1, len(sentences)), new_sentence)
+    elif kind == 'rewrite-middle':
+        sentences[len(sentences) // 2] = new_sentence
+    else:
+        sentences.append(new_sentence)
+    return ' '.join(sentences)
+
+def reembed_share(pages: List[Dict], chunker: Callable[[str], List[str]], kind: str, seed: int = 7) -> Dict:
+    """Count chunks before/after editing every page and how many need new embeddings"""
+    rng = random.Random(seed)
+    before_total = after_total = changed = 0
+    for page in pages:
+        text = f"Title: {page.get('title', 'Untitled')}\n\nContent: {page.get('content', '')}"
+        before = {chunk_hash(chunk) for chunk in chunker(text)}
+        after = [chunk_hash(chunk) for chunk in chunker(edit_page(text, kind, rng))]
+        before_total += len(before)
+        after_total += len(after)
+        changed += sum(1 for h in after if h not in before)
+    return {
+        'chunks_before': before_total,
+        'chunks_after': after_total,
+        're_embedded': changed,
+        'embed_calls_saved': after_total - changed,
+        'saved_pct': round(100 * (after_total - changed) / after_total, 1) if after_total else 0.0,
+    }
+
+def print_table(results: List[Dict]):
+    """Print results as an aligned table"""
+    columns = list(results[0].keys())
+    widths = {col: max(len(col), *(len(str(row[col])) for row in results)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    for row in results:
+        print('  '.join(str(row[col]).ljust(widths[col]) for col in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare re-embedding cost of fixed vs content-defined chunking")
+    parser.add_argument("--data", default=None, help="Scraped JSON/JSONL corpus (default: synthetic pages)")
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic pages to generate without --data")
+    parser.add_argument("--min-size", type=int, default=300)
+    parser.add_argument("--max-size", type=int, default=1000)
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    pages = list(iter_records(args.data)) if args.data else synthetic_pages(args.pages)
+    pages = [page for page in pages if page.get('content')]
+    print(f"📄 {len(pages)} pages")
+
+    chunkers = [
+        ('fixed', lambda text: fixed_size_chunks(text, args.max_size, 100)),
+        ('cdc', lambda text: content_defined_chunks(text, args.min_size, args.max_size)),
+    ]
+    results = []
+    for kind in ('insert-top', 'rewrite-middle', 'append'):
+        for name, chunker in chunkers:
+            results.append({'edit': kind, 'chunking': name, **reembed_share(pages, chunker, kind)})
+
+    print()
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Benchmark APEXWebScraper against a synthetic site served from localhost
+
+The generated site has a known number of near-duplicate pages (print views),
+URL variants (tracking parameters, fragments, trailing slashes) and site-wide
+boilerplate, so each crawl mode's dedup effectiveness can be checked against
+ground truth without touching https://www.apex.ac.in.
+
+    python benchmarks/crawler_benchmark.py --pages 300 --parse-workers 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web_scraper import APEXWebScraper
+
+TOPICS = ['programs', 'admission', 'placements', 'facilities', 'fees', 'scholarship',
+          'hostel', 'faculty', 'engineering', 'management', 'pharmacy', 'contact']
+
+WORDS = ('student campus course semester faculty laboratory placement company package '
+         'admission eligibility merit counselling hostel library research project '
+         'internship industry scholarship fee payment department engineering science').split()
+
+BOILERPLATE = (
+    '<div class="banner">Admissions open for the 2026 batch - call +91-7351408009 today</div>'
+    '<p>Contact us at admissions@apex.ac.in or visit the campus office on any working day</p>'
+)
+
+def build_site(pages: int, links_per_page: int, duplicate_ratio: float, variant_ratio: float,
+               seed: int = 42) -> Dict:
+    """Generate {path: html} for a synthetic college site plus ground-truth counts"""
+    rng = random.Random(seed)
+    paths = [f"/{TOPICS[i % len(TOPICS)]}/page-{i}" for i in range(pages)]
+    site = {}
+    variants = 0
+    duplicates = 0
+
+    for i, path in enumerate(paths):
+        body = ' '.join(
+            f"<p>{' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 90)))}.</p>"
+            for _ in range(rng.randint(3, 8))
+        )
+        links = []
+        for target in rng.sample(paths, min(links_per_page, pages)):
+            if rng.random() < variant_ratio:
+                target = rng.choice([f"{target}/", f"{target}#section", f"{target}?utm_source=newsletter",
+                                     f"{target}?utm_campaign=fb&fbclid=abc{i}"])
+                variants += 1
+            links.append(f'<a href="{target}">{target}</a>')
+        if rng.random() < duplicate_ratio:
+            links.append(f'<a href="{path}/print">Print view</a>')
+            duplicates += 1
+
+        html = (f"<html><head><title>APEX {path}</title></head><body>"
+                f"<nav><a href='/'>Home</a></nav><main>{BOILERPLATE}<h1>Page {i}</h1>{body}"
+                f"<h2>Related</h2>{''.join(links)}</main></body></html>")
+        site[path] = html
+        # Print view: same text, different chrome
+        site[f"{path}/print"] = html.replace(f"<h1>Page {i}</h1>", f"<h1>Page {i} (print)</h1>")
+
+    home_links = ''.join(f'<a href="{path}">{path}</a>' for path in paths[:links_per_page * 2])
+    site['/'] = (f"<html><head><title>APEX Home</title></head><body><main>{BOILERPLATE}"
+                 f"<h1>Welcome</h1><p>{' '.join(WORDS * 3)}</p>{home_links}</main></body></html>")
+
+    return {'pages': site, 'paths': paths, 'variant_links': variants, 'duplicate_links': duplicates}
+
+def serve_site(site: Dict) -> ThreadingHTTPServer:
+    """Serve generated pages, robots.txt and sitemap.xml on a free local port"""
+    pages = site['pages']
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('#')[0].split('?')[0]
+            if path != '/':
+                path = path.rstrip('/')
+            base = f"http://{self.headers['Host']}"
+
+            if path == '/robots.txt':
+                body, content_type = f"User-agent: *\nSitemap: {base}/sitemap.xml\n", 'text/plain'
+            elif path == '/sitemap.xml':
+                urls = ''.join(f"<url><loc>{base}{p}</loc></url>" for p in site['paths'])
+                body = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+                content_type = 'application/xml'
+            elif path in pages:
+                body, content_type = pages[path], 'text/html'
+            else:
+                self.send_error(404)
+                return
+
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def crawl_once(base_url: str, max_pages: int, options: Dict, trace_memory: bool = False) -> tuple:
+    """Run one crawl with scraper output silenced; returns (scraper, seconds, peak heap bytes)"""
+    options = dict(options)
+    with tempfile.TemporaryDirectory() as tmp:
+        if options.pop('stream', False):
+            options['stream_output'] = os.path.join(tmp, 'pages.jsonl')
+        scraper = APEXWebScraper(base_url=base_url, max_pages=max_pages, delay=0.0, **options)
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.scrape_website()
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return scraper, elapsed, peak
+
+def run_mode(name: str, base_url: str, max_pages: int, options: Dict) -> Dict:
+    """Crawl the fixture site and collect throughput, memory and dedup numbers
+
+    tracemalloc slows allocation-heavy parsing by an order of magnitude, so
+    timing and peak memory come from two separate crawls.
+    """
+    scraper, elapsed, _ = crawl_once(base_url, max_pages, options)
+    _, _, peak = crawl_once(base_url, max_pages, options, trace_memory=True)
+
+    stats = scraper.stats
+    return {
+        'mode': name,
+        'pages_kept': stats['pages'],
+        'pages_fetched': stats['fetched'],
+        'pages_per_sec': round(stats['fetched'] / elapsed, 1) if elapsed else 0.0,
+        'parse_ms_per_page': round(1000 * stats['parse_seconds'] / stats['parsed'], 2) if stats['parsed'] else 0.0,
+        'peak_memory_mb': round(peak / 1e6, 1),
+        'near_duplicates': stats['near_duplicates'],
+        'canonical_collapsed': stats['canonical_collapsed'],
+        'boilerplate_chars_removed': stats.get('boilerplate_chars_before', 0) - stats.get('boilerplate_chars_after', 0),
+        'embeddings_saved': stats['embeddings_saved'],
+        'wall_seconds': round(elapsed, 2),
+    }
+
+def crawl_modes(parse_workers: int, fetch_workers: int) -> List[tuple]:
+    """(name, scraper options) for each crawl mode being compared"""
+    return [
+        ('sequential', {}),
+        ('sequential-raw', {'canonicalize': False, 'dedup': False, 'strip_boilerplate': False}),
+        ('pipelined', {'fetch_workers': fetch_workers, 'parse_workers': parse_workers}),
+        ('pipelined-stream', {'fetch_workers': fetch_workers, 'parse_workers': parse_workers, 'stream': True}),
+    ]
+
+def print_table(results: List[Dict]):
+    """Print results as an aligned table"""
+    columns = list(results[0].keys())
+    widths = {col: max(len(col), *(len(str(row[col])) for row in results)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    for row in results:
+        print('  '.join(str(row[col]).ljust(widths[col]) for col in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawler against a local fixture site")
+    parser.add_argument("--pages", type=int, default=200, help="Distinct content pages to generate")
+    parser.add_argument("--links-per-page", type=int, default=8)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2,
+                        help="Share of pages that link to a near-duplicate print view")
+    parser.add_argument("--variant-ratio", type=float, default=0.3,
+                        help="Share of links written as a non-canonical URL variant")
+    parser.add_argument("--fetch-workers", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=4)
+    parser.add_argument("--modes", default=None,
+                        help="Comma-separated subset of: sequential, sequential-raw, pipelined, pipelined-stream")
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    site = build_site(args.pages, args.links_per_page, args.duplicate_ratio, args.variant_ratio)
+    server = serve_site(site)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"💻 {os.cpu_count()} CPUs available for parse workers")
+    print(f"🏗️ Serving {len(site['pages'])} pages at {base_url} "
+          f"({site['duplicate_links']} print-view duplicates, {site['variant_links']} variant links)")
+
+    wanted = set(args.modes.split(',')) if args.modes else None
+    results = []
+    try:
+        for name, options in crawl_modes(args.parse_workers, args.fetch_workers):
+            if wanted and name not in wanted:
+                continue
+            print(f"⏱️ Crawling in {name} mode...")
+            results.append(run_mode(name, base_url, max_pages=len(site['pages']) * 2, options=options))
+    finally:
+        server.shutdown()
+
+    print()
+    print_table(results)
+    print("\npeak_memory_mb is Python heap in the main process (tracemalloc); parse workers are not included.")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'site': {k: site[k] for k in ('variant_links', 'duplicate_links')},
+                       'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare flat and two-level (centroid -> chunks) retrieval at 10k and 100k chunks
+
+Synthetic documents are drawn around topic centres, and each document's chunks
+are drawn around the document, mirroring how scraped pages break into chunks.
+For every corpus size the benchmark reports query latency and recall@k
+(against exact neighbours) for:
+
+    flat          Chroma query over the whole collection
+    two-level     SectionCentroidIndex picks the top documents, then a Chroma
+                  query with a `where` filter on their group ids
+    numpy-flat    exact in-memory matrix search (reference)
+    numpy-2level  in-memory search partitioned by the same centroids
+
+    python benchmarks/hierarchical_benchmark.py --sizes 10000,100000 --sections 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from retrieval import SectionCentroidIndex, hnsw_metadata, index_params
+
+def make_corpus(chunks: int, dim: int, chunks_per_doc: int, topics: int, seed: int = 42) -> Dict:
+    """Unit chunk vectors with a group id per document"""
+    rng = np.random.default_rng(seed)
+    docs = max(1, chunks // chunks_per_doc)
+    topic_centres = rng.normal(size=(topics, dim))
+    doc_centres = topic_centres[rng.integers(0, topics, size=docs)] + 0.7 * rng.normal(size=(docs, dim))
+    groups = np.repeat(np.arange(docs), chunks_per_doc)[:chunks]
+    if len(groups) < chunks:
+        groups = np.concatenate([groups, rng.integers(0, docs, size=chunks - len(groups))])
+    vectors = doc_centres[groups] + 0.5 * rng.normal(size=(chunks, dim))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    return {'vectors': vectors, 'groups': [f"doc{g}" for g in groups]}
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 7) -> np.ndarray:
+    """Noisy copies of stored chunks, like paraphrased questions"""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), size=count)]
+    queries = picks + 0.5 * rng.normal(size=picks.shape) / np.sqrt(vectors.shape[1])
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+def summarize(name: str, latencies: List[float], found: List[set], truth: List[set], k: int) -> Dict:
+    latencies_ms = np.array(latencies) * 1000
+    hits = sum(len(f & t) for f, t in zip(found, truth))
+    return {
+        'mode': name,
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 2),
+        f'recall@{k}': round(hits / (len(truth) * k), 4),
+    }
+
+def run_size(client, size: int, args) -> List[Dict]:
+    """Build one corpus and time every retrieval mode on it"""
+    corpus = make_corpus(size, args.dim, args.chunks_per_doc, args.topics)
+    vectors, groups = corpus['vectors'], corpus['groups']
+    queries = make_queries(vectors, args.queries)
+    truth = [set(map(str, top_k(vectors @ q, args.k))) for q in queries]
+
+    coarse = SectionCentroidIndex('group')
+    for group, vector in zip(groups, vectors):
+        coarse.add(group, vector)
+    coarse.finalize()
+    members = {}
+    for i, group in enumerate(groups):
+        members.setdefault(group, []).append(i)
+    members = {group: np.array(rows) for group, rows in members.items()}
+
+    name = f"hier_bench_{size}"
+    start = time.perf_counter()
+    collection = client.create_collection(name=name, metadata=hnsw_metadata(index_params({'space': 'cosine'})))
+    for offset in range(0, size, 2000):
+        collection.add(ids=[str(i) for i in range(offset, min(offset + 2000, size))],
+                       embeddings=vectors[offset:offset + 2000].tolist(),
+                       metadatas=[{'group': g} for g in groups[offset:offset + 2000]])
+    build_seconds = time.perf_counter() - start
+    print(f"🏗️ {size} chunks in {len(coarse)} documents indexed in {build_seconds:.1f}s")
+
+    def timed(search) -> tuple:
+        latencies, found = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            found.append(search(query))
+            latencies.append(time.perf_counter() - t0)
+        return latencies, found
+
+    def chroma_flat(query):
+        return set(collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])['ids'][0])
+
+    def chroma_two_level(query):
+        where = coarse.where_filter(query, args.sections)
+        return set(collection.query(query_embeddings=[query.tolist()], n_results=args.k, where=where,
+                                    include=[])['ids'][0])
+
+    def numpy_flat(query):
+        return set(map(str, top_k(vectors @ query, args.k)))
+
+    def numpy_two_level(query):
+        rows = np.concatenate([members[g] for g in coarse.top_groups(query, args.sections)])
+        return set(map(str, rows[top_k(vectors[rows] @ query, args.k)]))
+
+    results = []
+    for mode, search in [('flat', chroma_flat), ('two-level', chroma_two_level),
+                         ('numpy-flat', numpy_flat), ('numpy-2level', numpy_two_level)]:
+        latencies, found = timed(search)
+        results.append({'chunks': size, 'documents': len(coarse),
+                        **summarize(mode, latencies, found, truth, args.k)})
+    client.delete_collection(name=name)
+    return results
+
+def print_table(results: List[Dict]):
+    """Print results as an aligned table"""
+    columns = list(results[0].keys())
+    widths = {col: max(len(col), *(len(str(row[col])) for row in results)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    for row in results:
+        print('  '.join(str(row[col]).ljust(widths[col]) for col in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat vs two-level retrieval benchmark")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated chunk counts")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--chunks-per-doc", type=int, default=20)
+    parser.add_argument("--topics", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=5, help="Documents searched per query in two-level mode")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    client = chromadb.EphemeralClient()
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        results.extend(run_size(client, size, args))
+
+    print()
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Sweep Chroma HNSW settings for query latency versus recall
+
+Synthetic clustered unit vectors stand in for text-embedding-004 output, so
+no API key is needed. Each (space, M, ef_construction, ef_search) setting
+gets its own in-memory collection; recall@k is measured against exact
+brute-force neighbours computed with numpy.
+
+    python benchmarks/hnsw_benchmark.py --chunks 20000 --M 8,16,32 --ef-search 10,50,100
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from retrieval import distance_to_similarity, hnsw_metadata, index_params
+
+def make_vectors(count: int, dim: int, clusters: int, seed: int = 42) -> np.ndarray:
+    """Unit vectors grouped around random topic centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    vectors = centres[rng.integers(0, clusters, size=count)] + 0.6 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 7) -> np.ndarray:
+    """Noisy copies of stored vectors, like paraphrased questions"""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), size=count)]
+    queries = picks + 0.3 * rng.normal(size=picks.shape) / np.sqrt(vectors.shape[1])
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Ground-truth top-k by dot product (same order as cosine/ip/l2 for unit vectors)"""
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(map(str, row)) for row in top]
+
+def build_collection(client, name: str, params: Dict, vectors: np.ndarray, batch_size: int = 2000):
+    """Create a collection with the given HNSW params and load all vectors"""
+    collection = client.create_collection(name=name, metadata=hnsw_metadata(params))
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        collection.add(ids=[str(i) for i in range(start, start + len(batch))], embeddings=batch.tolist())
+    return collection
+
+def run_setting(client, params: Dict, vectors: np.ndarray, queries: np.ndarray, truth: List[set],
+                k: int) -> Dict:
+    """Build one index, time every query and score recall against ground truth"""
+    name = f"bench_{params['space']}_{params['M']}_{params['ef_construction']}_{params['ef_search']}"
+    start = time.perf_counter()
+    collection = build_collection(client, name, params, vectors)
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    top_similarity = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = collection.query(query_embeddings=[query.tolist()], n_results=k, include=['distances'])
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected & set(results['ids'][0]))
+        top_similarity.append(distance_to_similarity(results['distances'][0][0], params['space']))
+    client.delete_collection(name=name)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'space': params['space'],
+        'M': params['M'],
+        'ef_construction': params['ef_construction'],
+        'ef_search': params['ef_search'],
+        'build_s': round(build_seconds, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 2),
+        f'recall@{k}': round(hits / (len(queries) * k), 4),
+        'top1_similarity': round(float(np.mean(top_similarity)), 3),
+    }
+
+def print_table(results: List[Dict]):
+    """Print results as an aligned table"""
+    columns = list(results[0].keys())
+    widths = {col: max(len(col), *(len(str(row[col])) for row in results)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    for row in results:
+        print('  '.join(str(row[col]).ljust(widths[col]) for col in columns))
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency vs recall sweep over HNSW parameters")
+    parser.add_argument("--chunks", type=int, default=10000, help="Vectors in the index")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension (text-embedding-004 is 768)")
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--spaces", default="cosine,ip,l2")
+    parser.add_argument("--M", type=int_list, default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=int_list, default=[100])
+    parser.add_argument("--ef-search", type=int_list, default=[10, 50, 100])
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.chunks, args.dim, args.clusters)
+    queries = make_queries(vectors, args.queries)
+    truth = exact_neighbours(vectors, queries, args.k)
+    print(f"📐 {args.chunks} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+
+    client = chromadb.EphemeralClient()
+    results = []
+    for space, m, ef_construction, ef_search in itertools.product(
+            args.spaces.split(','), args.M, args.ef_construction, args.ef_search):
+        params = index_params({'space': space, 'M': m, 'ef_construction': ef_construction, 'ef_search': ef_search})
+        print(f"⏱️ space={space} M={m} ef_construction={ef_construction} ef_search={ef_search}")
+        results.append(run_setting(client, params, vectors, queries, truth, args.k))
+
+    print()
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
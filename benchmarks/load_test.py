@@ -0,0 +1,221 @@
+"""Concurrent-user load test for the query path
+
+Virtual users replay a question mix: each one asks, waits for the answer,
+then "thinks" for an exponentially distributed pause before the next
+question. The run steps through increasing user counts and, for each step,
+reports throughput, latency percentiles, error rate and how many answers
+came from a degraded generation path. The saturation point is the first step
+where throughput stops growing (less than --knee gain over the previous step)
+or errors pass --max-error-rate.
+
+Targets:
+    server    POST /query on a running query_server.py (--url)
+    pipeline  GoogleAIRAGPipeline in-process behind SharedKnowledgeBase
+    chatbot   FixedAPEXRAG in-process (imports streamlit in bare mode)
+
+In-process targets use fake_gemini unless --real-gemini is given, so
+back-end latency can be injected:
+
+    python benchmarks/load_test.py --target pipeline --users 1,4,16,64 --fake-generate-ms 800 --fake-tail-rate 0.05
+    python query_server.py --fake-gemini &
+    python benchmarks/load_test.py --target server --users 1,8,32,128 --think-ms 500
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faq_store import CURATED_QUESTIONS
+
+# Curated questions (often repeated by real users) plus long-tail ones
+LONG_TAIL_QUESTIONS = [
+    "Is there a bus service from the city?",
+    "What is the fee for the MBA program?",
+    "Do hostel rooms have Wi-Fi?",
+    "Which companies hired in 2023?",
+    "What marks do I need for B.Tech admission?",
+    "When does counselling happen?",
+    "What are the office hours?",
+    "How much is the highest placement package?",
+]
+
+HEALTHY_PATHS = (None, 'primary', 'hedge')
+
+def server_target(url: str) -> Callable[[str], Dict]:
+    """POST /query over one keep-alive connection per virtual user"""
+    parsed = urlparse(url)
+    local = threading.local()
+
+    def call(question: str) -> Dict:
+        if getattr(local, 'conn', None) is None:
+            local.conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=120)
+        try:
+            local.conn.request('POST', '/query', json.dumps({'question': question}),
+                               {'Content-Type': 'application/json'})
+            response = local.conn.getresponse()
+            body = json.loads(response.read() or b'{}')
+        except Exception:
+            local.conn.close()
+            local.conn = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {body.get('error', '')}")
+        return body
+    return call
+
+def in_process_target(args) -> Callable[[str], Dict]:
+    """Shared knowledge base over an in-process backend, indexed if empty"""
+    if not args.real_gemini:
+        import fake_gemini
+        fake_gemini.install(generate_ms=args.fake_generate_ms, embed_ms=args.fake_embed_ms,
+                            tail_rate=args.fake_tail_rate, error_rate=args.fake_error_rate)
+    import rate_limiter
+    from kb_service import SharedKnowledgeBase
+    if args.generate_rpm:
+        rate_limiter.configure_limits('generate', rpm=args.generate_rpm)
+    api_key = os.getenv("GOOGLE_AI_API_KEY", "fake")
+
+    if args.target == 'chatbot':
+        from final_apex_chatbot import FixedAPEXRAG
+        kb = SharedKnowledgeBase(lambda: FixedAPEXRAG(api_key))
+    else:
+        from rag_pipeline import GoogleAIRAGPipeline, load_scraped_data
+        kb = SharedKnowledgeBase(lambda: GoogleAIRAGPipeline(
+            api_key, collection_name="apex_loadtest" if not args.real_gemini else "apex_knowledge_base"))
+        if kb.backend.collection.count() == 0:
+            documents = load_scraped_data(args.data) if os.path.exists(args.data) else None
+            if not documents and not args.real_gemini:
+                import fake_gemini
+                documents = fake_gemini.DEMO_DOCUMENTS
+            kb.rebuild(lambda backend: backend.process_documents(documents))
+    kb.backend
+
+    def call(question: str) -> Dict:
+        return kb.query(question, use_faq=not args.no_faq)
+    return call
+
+def run_step(call: Callable[[str], Dict], users: int, duration: float, think_ms: float,
+             questions: List[str], seed: int) -> Dict:
+    """Run `users` virtual users for `duration` seconds and summarise"""
+    latencies, errors, degraded = [], [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        # Stagger starts so users don't fire in lockstep
+        time.sleep(rng.uniform(0, think_ms / 1000))
+        while time.perf_counter() < stop_at:
+            question = rng.choice(questions)
+            start = time.perf_counter()
+            try:
+                result = call(question)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    if result.get('generation_path') not in HEALTHY_PATHS:
+                        degraded.append(result.get('generation_path'))
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            if think_ms:
+                time.sleep(rng.expovariate(1000 / think_ms))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies) + len(errors)
+    latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'users': users,
+        'requests': total,
+        'rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 1),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 1),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 1),
+        'error_rate': round(len(errors) / total, 4) if total else 0.0,
+        'degraded': len(degraded),
+        'first_error': errors[0][:80] if errors else '',
+    }
+
+def saturation_point(results: List[Dict], knee: float, max_error_rate: float) -> Optional[Dict]:
+    """First step where throughput stops scaling or errors exceed the limit"""
+    for previous, current in zip(results, results[1:]):
+        if current['error_rate'] > max_error_rate:
+            return previous
+        if current['rps'] < previous['rps'] * (1 + knee):
+            return previous
+    return None
+
+def print_table(results: List[Dict]):
+    """Print results as an aligned table"""
+    columns = list(results[0].keys())
+    widths = {col: max(len(col), *(len(str(row[col])) for row in results)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    for row in results:
+        print('  '.join(str(row[col]).ljust(widths[col]) for col in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the RAG query path")
+    parser.add_argument("--target", choices=['server', 'pipeline', 'chatbot'], default='pipeline')
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Query server URL (--target server)")
+    parser.add_argument("--users", default="1,2,4,8,16,32", help="Comma-separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per step")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="Mean pause between a user's questions")
+    parser.add_argument("--long-tail", type=float, default=0.5, help="Share of questions outside the curated set")
+    parser.add_argument("--no-faq", action="store_true", help="Bypass precomputed FAQ answers (in-process)")
+    parser.add_argument("--knee", type=float, default=0.1, help="Minimum throughput gain per step")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--data", default=os.getenv("APEX_DATA_FILE", "apex_college_data.json"))
+    parser.add_argument("--real-gemini", action="store_true", help="Call the real API (needs GOOGLE_AI_API_KEY)")
+    parser.add_argument("--fake-generate-ms", type=float, default=800.0)
+    parser.add_argument("--fake-embed-ms", type=float, default=20.0)
+    parser.add_argument("--fake-tail-rate", type=float, default=0.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--generate-rpm", type=int, default=0, help="Override the generate rate limit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    call = server_target(args.url) if args.target == 'server' else in_process_target(args)
+
+    # Weighted mix: the curated set once, the long tail scaled to its share
+    tail_copies = max(1, round(args.long_tail / max(1e-9, 1 - args.long_tail)
+                               * len(CURATED_QUESTIONS) / len(LONG_TAIL_QUESTIONS)))
+    questions = list(CURATED_QUESTIONS) + LONG_TAIL_QUESTIONS * tail_copies
+
+    results = []
+    for users in (int(u) for u in args.users.split(',')):
+        print(f"👥 {users} users for {args.duration:.0f}s (think {args.think_ms:.0f}ms)...")
+        results.append(run_step(call, users, args.duration, args.think_ms, questions, args.seed))
+        print(f"   {results[-1]['rps']} req/s, p95 {results[-1]['p95_ms']}ms, errors {results[-1]['error_rate']:.1%}")
+
+    print()
+    print_table(results)
+    knee = saturation_point(results, args.knee, args.max_error_rate)
+    if knee:
+        print(f"\n📈 Saturation at ~{knee['users']} users ({knee['rps']} req/s, p95 {knee['p95_ms']}ms)")
+    else:
+        print("\n📈 No saturation within the tested user counts")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'steps': results, 'saturation': knee}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
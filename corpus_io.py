@@ -0,0 +1,132 @@
+import gzip
+import io
+import json
+import os
+import zlib
+from typing import Dict, Iterable, Iterator
+
+# zstd is optional - only needed for *.zst corpus files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = ('.gz', '.zst')
+
+# What a compressed stream raises when it was cut off mid-write (a killed crawl)
+TRUNCATION_ERRORS = (EOFError, zlib.error, gzip.BadGzipFile) + ((zstandard.ZstdError,) if zstandard else ())
+
+def is_jsonl(path: str) -> bool:
+    """Check if a corpus path uses the JSON Lines format (optionally compressed)"""
+    for suffix in COMPRESSION_SUFFIXES:
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+    return path.endswith('.jsonl')
+
+def open_corpus(path: str, mode: str = 'r'):
+    """Open a corpus file as text, compressing by extension (.gz / .zst)
+
+    mode is 'r', 'w' or 'a'. Appending to compressed files adds a new
+    gzip member / zstd frame, which readers consume transparently.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError("zstandard is required for .zst files: pip install zstandard")
+        raw = open(path, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+class JSONLWriter:
+    """Append one compact JSON record per line as pages are extracted
+
+    With append on, a file left damaged by a killed writer is first cut back
+    to its last complete record (see repair_jsonl).
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.count = 0
+        if append and os.path.exists(path):
+            repair_jsonl(path)
+        self._file = open_corpus(path, 'a' if append else 'w')
+
+    def write(self, record: Dict):
+        """Write a single record"""
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+        self.count += 1
+
+    def flush(self):
+        """Push buffered records to disk"""
+        self._file.flush()
+
+    def close(self):
+        """Flush and close the underlying file"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Lazily yield records from a JSON Lines corpus, or from a plain JSON list
+
+    A truncated last line (e.g. from a killed crawl) is skipped instead of
+    failing the whole read.
+    """
+    if not is_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    with open_corpus(path, 'r') as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping malformed line in {path}")
+        except TRUNCATION_ERRORS:
+            # Compressed stream cut off mid-write
+            print(f"⚠️ {path} ends with a truncated block")
+
+def repair_jsonl(path: str) -> int:
+    """Rewrite a JSON Lines corpus with only its complete records
+
+    Appending after a truncated gzip member / zstd frame or a partial last
+    line would make the rest of the file unreadable, so the records that can
+    still be read are copied to a new file that replaces the old one.
+    Returns the number of records kept.
+    """
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".tmp-{name}")
+    count = save_records(iter_records(path), tmp_path)
+    os.replace(tmp_path, path)
+    return count
+
+def save_records(records: Iterable[Dict], path: str) -> int:
+    """Write records as JSON Lines or as one pretty-printed JSON list, by extension"""
+    if is_jsonl(path):
+        with JSONLWriter(path) as writer:
+            for record in records:
+                writer.write(record)
+            return writer.count
+
+    records = list(records)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    return len(records)
@@ -0,0 +1,85 @@
+import math
+import re
+import time
+from typing import Dict, List
+
+from faq_store import question_terms
+
+# Ranking weights: query-term coverage dominates, the chunk's retrieval
+# similarity breaks ties between sentences from different chunks
+CHUNK_WEIGHT = 0.2
+MIN_SENTENCE_CHARS = 20
+
+def _segments(text: str) -> List[str]:
+    """Sentences and list lines, each list line prefixed with its heading
+
+    "Computer Science Engineering:" followed by "- Annual Fee: ₹1,20,000"
+    becomes "Computer Science Engineering - Annual Fee: ₹1,20,000", so the
+    line still makes sense on its own.
+    """
+    segments = []
+    heading = ''
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.endswith(':') and len(line) < 80:
+            heading = line[:-1]
+            continue
+        if line.startswith(('-', '•', '*')) or re.match(r"^\d+\.\s", line):
+            item = line.lstrip('-•* ').strip()
+            segments.append(f"{heading} - {item}" if heading else item)
+            continue
+        heading = ''
+        segments.extend(s.strip() for s in re.split(r'(?<=[.!?])\s+', line) if s.strip())
+    return [s for s in segments if len(s) >= MIN_SENTENCE_CHARS]
+
+def _label(source: str) -> str:
+    """Section keys like "fee_structure" read as "Fee Structure"; page titles are kept"""
+    return source.replace('_', ' ').title() if source.islower() else source
+
+def extractive_answer(question: str, chunks: List[Dict], source_field: str,
+                      max_sentences: int = 4) -> Dict:
+    """Answer by quoting the retrieved sentences that best cover the question
+
+    chunks are retrieval results ('content', 'metadata', 'similarity_score').
+    Each sentence is scored by the IDF-weighted share of question terms it
+    contains plus CHUNK_WEIGHT times its chunk's similarity; the top
+    max_sentences are returned in ranking order, each attributed to the
+    metadata[source_field] of its chunk. No API calls are made.
+    """
+    start = time.perf_counter()
+    query_terms = question_terms(question)
+    candidates = []
+    for rank, chunk in enumerate(chunks):
+        source = chunk['metadata'].get(source_field) or 'unknown'
+        for position, sentence in enumerate(_segments(chunk['content'])):
+            candidates.append({'text': sentence, 'source': source, 'terms': question_terms(sentence),
+                               'chunk_score': chunk['similarity_score'], 'order': (rank, position)})
+
+    # Terms that appear in fewer of the retrieved sentences count for more
+    document_frequency = {term: sum(1 for c in candidates if term in c['terms']) for term in query_terms}
+    idf = {term: math.log(1 + len(candidates) / (1 + df)) for term, df in document_frequency.items()}
+    total_weight = sum(idf.values()) or 1.0
+    for candidate in candidates:
+        coverage = sum(idf[term] for term in query_terms & candidate['terms']) / total_weight
+        candidate['score'] = coverage + CHUNK_WEIGHT * candidate['chunk_score']
+        candidate['matched'] = coverage > 0
+
+    # Prefer sentences sharing a term with the question; fall back to the top chunk's opening
+    ranked = sorted(candidates, key=lambda c: (not c['matched'], -c['score'], c['order']))
+    selected = [c for c in ranked if c['matched']][:max_sentences] or ranked[:min(2, max_sentences)]
+
+    sources = list(dict.fromkeys(c['source'] for c in selected))
+    if selected:
+        lines = [f"- {c['text']} [{sources.index(c['source']) + 1}]" for c in selected]
+        answer = ("Here is what the APEX knowledge base says:\n\n" + '\n'.join(lines) + "\n\nSources: "
+                  + '; '.join(f"[{i}] {_label(source)}" for i, source in enumerate(sources, 1)))
+    else:
+        answer = ("I couldn't find a direct answer in the knowledge base. Please contact APEX College at "
+                  "+91-7351408009 or admissions@apex.ac.in.")
+    return {
+        'answer': answer,
+        'sentences': [{'text': c['text'], 'source': c['source'], 'score': round(c['score'], 4)} for c in selected],
+        'seconds': time.perf_counter() - start,
+    }
@@ -0,0 +1,298 @@
+import re
+from typing import Dict, List, Optional, Set
+
+# Fact records are plain dicts with a fixed schema:
+#   kind       "fee" | "contact" | "eligibility"
+#   subject    what the fact is about, as written in the source ("MBA", "Admissions")
+#   attribute  "annual_fee" | "total_fee" | "email" | "phone" | "address" | "hours" | "criterion"
+#   value      the literal value from the source text
+#   section    APEX_COLLEGE_DATA key the fact came from
+#   group      optional grouping used for list answers ("btech")
+
+# Short forms people use for programs and offices
+SUBJECT_ALIASES = {
+    'computer science engineering': ['cse', 'computer science', 'cs'],
+    'computer science': ['cse', 'cs'],
+    'ai & machine learning': ['aiml', 'ai ml', 'ai', 'machine learning', 'artificial intelligence'],
+    'data science': ['ds'],
+    'cloud technology & security': ['cloud', 'ctis', 'cloud technology', 'cloud security'],
+    'cloud technology': ['cloud', 'ctis'],
+    'mba': ['mba'],
+    'mba programs': ['mba'],
+    'b.com (hons)': ['bcom', 'b com', 'commerce'],
+    'transportation': ['transport', 'bus'],
+    'admissions': ['admission'],
+    'admission helpdesk': ['admission'],
+    'fee related': ['fee', 'fees', 'accounts'],
+    'accounts department': ['fee', 'fees', 'accounts'],
+    'training & placement': ['placement', 'placements', 'tpo'],
+    'placements': ['placement'],
+    'hostel enquiries': ['hostel'],
+    'hostel office': ['hostel'],
+    'general information': ['general', 'info'],
+    'general enquiry': ['general', 'enquiry', 'helpdesk'],
+    'academic queries': ['academic', 'academics'],
+    'academic office': ['academic', 'academics'],
+}
+
+INTENT_KEYWORDS = {
+    'fee': {'fee', 'fees', 'cost', 'costs', 'tuition', 'charges', 'price', 'expense', 'expenses'},
+    'email': {'email', 'mail', 'e-mail', 'emails'},
+    'phone': {'phone', 'call', 'telephone', 'extension', 'ext', 'helpline', 'mobile'},
+    'address': {'address', 'located', 'location'},
+    'hours': {'hours', 'timings', 'timing'},
+    'eligibility': {'eligibility', 'eligible', 'minimum', 'marks', 'percentage', 'criteria', 'qualify', 'qualification'},
+}
+
+# Questions that need reasoning or more than a lookup go to the RAG path
+RAG_ONLY_WORDS = {'why', 'compare', 'compared', 'comparison', 'difference', 'vs', 'vs.', 'versus', 'better',
+                  'cheaper', 'costlier', 'scholarship', 'scholarships', 'refund', 'waiver', 'loan',
+                  'installment', 'installments', 'discount', 'package'}
+# Comparisons also need both sides, which a single-fact lookup can't give
+RAG_ONLY_PHRASES = ('more than', 'less than', 'higher than', 'lower than')
+
+# Words that carry no slot information
+FILLER_WORDS = {'what', 'is', 'are', 'the', 'a', 'an', 'of', 'for', 'to', 'at', 'in', 'me', 'my', 'i',
+                'can', 'do', 'does', 'how', 'tell', 'give', 'please', 'apex', 'college', 'your', 'main',
+                'official', 'contact', 'number', 'office', 'institute'}
+
+# Generic "Phone:"/"Email:" lines belong to the office whose section they sit in
+SECTION_CONTACT_SUBJECTS = {'admission_process': 'Admissions'}
+
+BTECH_WORDS = {'btech', 'b.tech', 'b tech', 'engineering'}
+
+# Words that may accompany a plain "B.Tech fee" question; anything else
+# ("lateral entry", "NRI quota") asks about a fee the table doesn't list
+FEE_QUALIFIER_WORDS = {'b', 'tech', 'annual', 'yearly', 'total', 'structure', 'per', 'year', 'much',
+                       'program', 'programs', 'course', 'courses', 'all', 'programme', 'programmes'}
+
+MAX_QUESTION_WORDS = 16
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9.&+-]+", text.lower())
+
+def _subject_keys(subject: str) -> Set[str]:
+    """Phrases that refer to a subject: its own name plus known short forms"""
+    name = subject.lower().strip()
+    keys = {name, name.replace('&', 'and')}
+    keys.update(SUBJECT_ALIASES.get(name, []))
+    return keys
+
+def extract_facts(data: Dict[str, str]) -> List[Dict]:
+    """Pull fees, contact details and eligibility rules out of the curated text"""
+    facts = []
+
+    def add(kind, subject, attribute, value, section, group=''):
+        facts.append({'kind': kind, 'subject': subject.strip(), 'attribute': attribute,
+                      'value': value.strip(), 'section': section, 'group': group})
+
+    fees = data.get('fee_structure', '')
+    program = None
+    in_btech = False
+    for line in fees.splitlines():
+        line = line.strip()
+        if line.startswith('B.TECH PROGRAMS'):
+            in_btech = True
+        elif line.isupper() and line.endswith(':'):
+            in_btech = False
+        if re.match(r"^[A-Z][\w &().-]+:$", line) and not line.isupper():
+            program = line[:-1]
+            continue
+        fee = re.match(r"^- (Annual Fee|4-Year Total): (₹[\d,]+)", line)
+        if fee and program:
+            attribute = 'annual_fee' if fee.group(1) == 'Annual Fee' else 'total_fee'
+            add('fee', program, attribute, fee.group(2), 'fee_structure', 'btech' if in_btech else '')
+            continue
+        other = re.match(r"^- ([\w .&()]+): (₹[\d,]+(?:-₹[\d,]+)? per year(?: \([^)]*\))?)", line)
+        if other:
+            add('fee', other.group(1), 'annual_fee', other.group(2), 'fee_structure')
+
+    for section in ('contact_information', 'admission_process'):
+        address_lines = None
+        for line in data.get(section, '').splitlines():
+            line = line.strip()
+            if line == 'MAIN CAMPUS ADDRESS:':
+                address_lines = []
+                continue
+            if address_lines is not None:
+                if line:
+                    address_lines.append(line)
+                    continue
+                add('contact', 'Main Campus', 'address', ', '.join(address_lines), section)
+                address_lines = None
+            entry = re.match(r"^([A-Z][\w &/-]+): (.+)$", line)
+            if not entry:
+                continue
+            label, value = entry.groups()
+            if label in ('Phone', 'Email'):
+                if section not in SECTION_CONTACT_SUBJECTS:
+                    continue
+                label = SECTION_CONTACT_SUBJECTS[section]
+            if re.match(r"^[\w.-]+@[\w.-]+$", value):
+                add('contact', label, 'email', value, section)
+            elif re.match(r"^\+[\d-]+(?: \(Ext: \d+\))?$", value):
+                add('contact', label, 'phone', value, section)
+            elif re.match(r"^(Monday to \w+|Saturday|Sunday)$", label):
+                add('contact', label, 'hours', value, section)
+
+    eligibility = re.search(r"ELIGIBILITY CRITERIA[^\n]*:\n(.*?)(?:\n\s*\n|$)", data.get('btech_programs', ''), re.S)
+    if eligibility:
+        for line in eligibility.group(1).splitlines():
+            line = line.strip().lstrip('- ').strip()
+            if line:
+                add('eligibility', 'B.Tech', 'criterion', line, 'btech_programs', 'btech')
+
+    return facts
+
+class FactStore:
+    """Indexed fact table with a keyword intent/slot matcher
+
+    match() only answers when it finds exactly one intent and a subject that
+    resolves to specific facts; anything else returns None and the question
+    goes through the normal RAG path.
+    """
+
+    def __init__(self, data: Dict[str, str]):
+        self.load(data)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def load(self, data: Dict[str, str]):
+        """(Re)build the table and its indexes from source text"""
+        facts = extract_facts(data)
+        by_attribute = {}
+        for fact in facts:
+            by_attribute.setdefault(fact['attribute'], []).append(fact)
+        self.facts, self._by_attribute = facts, by_attribute
+
+    def _detect_intents(self, words: Set[str], text: str) -> Set[str]:
+        intents = {intent for intent, keywords in INTENT_KEYWORDS.items() if words & keywords}
+        if 'contact number' in text:
+            intents.add('phone')
+        if text.startswith('where is') and words & {'apex', 'campus', 'college'} and len(words) <= 6:
+            intents.add('address')
+        return intents
+
+    def _is_generic(self, words: Set[str], intent: str) -> bool:
+        """True if the question names no office or program ("what is your email?")"""
+        return not (words - FILLER_WORDS - INTENT_KEYWORDS[intent])
+
+    def _mentions(self, text: str, candidates: List[Dict]) -> Dict[str, List[Dict]]:
+        """Subject mentions in the question: matched key -> facts it refers to
+
+        A key is dropped when it only occurs inside a longer matched key
+        ("computer science" within "computer science engineering").
+        """
+        padded = f" {text} "
+        found = {}
+        for fact in candidates:
+            for key in _subject_keys(fact['subject']):
+                if f" {key} " in padded and fact not in found.setdefault(key, []):
+                    found[key].append(fact)
+        return {key: facts for key, facts in found.items()
+                if not any(len(other) > len(key) and f" {key} " in f" {other} " for other in found)}
+
+    def _match_subjects(self, text: str, candidates: List[Dict]) -> List[Dict]:
+        """Facts for every subject (or alias) the question mentions"""
+        facts = []
+        for matched in self._mentions(text, candidates).values():
+            facts.extend(fact for fact in matched if fact not in facts)
+        return facts
+
+    def match(self, question: str) -> Optional[Dict]:
+        """Answer a factual lookup from the table, or None if not confident"""
+        words = _words(question)
+        word_set = set(words)
+        text = ' '.join(words).replace('?', '')
+        if (len(words) > MAX_QUESTION_WORDS or word_set & RAG_ONLY_WORDS
+                or any(phrase in text for phrase in RAG_ONLY_PHRASES)):
+            self.stats['misses'] += 1
+            return None
+
+        intents = self._detect_intents(word_set, text)
+        # "fee contact email" is a contact question, not a fee question
+        if intents & {'email', 'phone', 'address', 'hours'}:
+            intents.discard('fee')
+            intents.discard('eligibility')
+        if len(intents) != 1:
+            self.stats['misses'] += 1
+            return None
+        intent = intents.pop()
+
+        answer = None
+        facts = []
+        if intent == 'fee':
+            candidates = self._by_attribute.get('annual_fee', []) + self._by_attribute.get('total_fee', [])
+            facts = self._match_subjects(text, candidates)
+            if len({fact['subject'] for fact in facts}) > 1:
+                # "CSE fee with hostel" wants a combination, not one of the two
+                facts = []
+            elif not facts and (word_set & BTECH_WORDS or 'b.tech' in text) and not (
+                    word_set - FILLER_WORDS - INTENT_KEYWORDS['fee'] - BTECH_WORDS - FEE_QUALIFIER_WORDS):
+                facts = [fact for fact in candidates if fact['group'] == 'btech']
+            if facts:
+                answer = self._fee_answer(facts)
+        elif intent == 'eligibility':
+            # Criteria are only listed for B.Tech; questions that don't name it
+            # or one of its branches (PhD, B.Ed, diploma, ...) go to RAG
+            btech_programs = [f for f in self._by_attribute.get('annual_fee', []) if f['group'] == 'btech']
+            if word_set & BTECH_WORDS or 'b.tech' in text or self._match_subjects(text, btech_programs):
+                facts = self._by_attribute.get('criterion', [])
+            if facts:
+                answer = "Eligibility for B.Tech programs at APEX:\n" + '\n'.join(f"- {f['value']}" for f in facts)
+        elif intent == 'address':
+            facts = self._by_attribute.get('address', [])
+            if facts:
+                address = facts[0]['value'].replace('APEX Group of Institutions, ', '', 1)
+                answer = f"APEX Group of Institutions is located at {address}."
+        elif intent == 'hours':
+            facts = [f for f in self._by_attribute.get('hours', []) if f['subject'] != 'Office Hours']
+            if facts:
+                answer = "Office hours:\n" + '\n'.join(f"- {f['subject']}: {f['value']}" for f in facts)
+        else:
+            candidates = self._by_attribute.get(intent, [])
+            facts = self._match_subjects(text, candidates)
+            if not facts and self._is_generic(word_set, intent):
+                general = 'General Information' if intent == 'email' else 'General Enquiry'
+                facts = [f for f in candidates if f['subject'] == general]
+            # Same office listed twice (e.g. admission helpdesk and admission queries) - keep one value each
+            facts = list({f['value']: f for f in facts}.values())
+            if facts:
+                label = 'email' if intent == 'email' else 'phone number'
+                answer = '\n'.join(f"The {f['subject']} {label} is {f['value']}." for f in facts)
+
+        if not answer:
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        sections = list(dict.fromkeys(f['section'] for f in facts))
+        return {
+            'answer': answer,
+            'sources': [{'section': section, 'similarity': 1.0} for section in sections],
+            'confidence': 1.0,
+            'retrieved_chunks': 0,
+            'path': 'facts',
+            'intent': intent,
+        }
+
+    def _fee_answer(self, facts: List[Dict]) -> str:
+        by_subject = {}
+        for fact in facts:
+            by_subject.setdefault(fact['subject'], {})[fact['attribute']] = fact['value']
+        lines = []
+        for subject, values in by_subject.items():
+            line = f"- {subject}: {values.get('annual_fee', 'n/a')}"
+            if 'annual_fee' in values and 'per year' not in values['annual_fee']:
+                line += " per year"
+            if 'total_fee' in values:
+                line += f" ({values['total_fee']} total)"
+            lines.append(line)
+        contact = next((f['value'] for f in self._by_attribute.get('email', []) if f['subject'] == 'Fee Related'), None)
+        answer = "Fees at APEX:\n" + '\n'.join(lines)
+        if contact:
+            answer += f"\n\nFor fee queries, contact {contact}."
+        return answer
+
+    def get_stats(self) -> Dict:
+        """Table size plus hit/miss counters"""
+        return {'facts': len(self.facts), **self.stats}
@@ -0,0 +1,141 @@
+"""Offline stand-in for google.generativeai
+
+Lets the pipeline, the query server and the load tests run without an API key
+or network. install() registers this module as `google.generativeai`; it must
+run before rag_pipeline / generation are imported:
+
+    import fake_gemini
+    fake_gemini.install(generate_ms=800, error_rate=0.01)
+    from rag_pipeline import GoogleAIRAGPipeline
+
+Embeddings are hashed bags of words, so questions still retrieve chunks that
+share their vocabulary. Generated answers quote the first context sentence.
+Latency and failures are injected from `settings`, which can be changed while
+running.
+"""
+import hashlib
+import random
+import re
+import sys
+import threading
+import time
+import types as _types
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DIM = 768
+
+settings = {
+    'embed_ms': 20.0,       # mean latency of one embed_content call
+    'generate_ms': 800.0,   # mean latency of one generate_content call
+    'jitter': 0.3,          # +/- fraction of the mean, uniformly distributed
+    'tail_rate': 0.0,       # share of generate calls that take tail_ms instead
+    'tail_ms': 5000.0,
+    'error_rate': 0.0,      # share of calls that raise
+}
+
+calls = {'embed': 0, 'generate': 0, 'errors': 0}
+_calls_lock = threading.Lock()
+_random = random.Random()
+
+# Small corpus for offline runs when no scraped data file is available
+DEMO_DOCUMENTS = [
+    {'title': 'Fee Structure', 'url': 'https://www.apex.ac.in/fees',
+     'content': "The annual fee for B.Tech Computer Science Engineering is ₹1,85,000. "
+                "The MBA program costs ₹1,50,000 per year. Hostel fees range from ₹65,000 to ₹1,05,000 per year. "
+                "Fees can be paid in two installments each academic year."},
+    {'title': 'Hostel Facilities', 'url': 'https://www.apex.ac.in/hostel',
+     'content': "APEX has separate hostels for boys and girls with single, double and triple occupancy rooms. "
+                "Hostels have Wi-Fi, a mess serving four meals a day, laundry and 24x7 security."},
+    {'title': 'Placements', 'url': 'https://www.apex.ac.in/placements',
+     'content': "The Training & Placement Cell placed 95.8% of eligible students in 2023-24. "
+                "287 companies participated, and the highest package was ₹42 LPA. "
+                "Recruiters include TCS, Infosys, Wipro, Amazon and Deloitte."},
+    {'title': 'Admissions', 'url': 'https://www.apex.ac.in/admissions',
+     'content': "B.Tech admission requires 10+2 with Physics and Mathematics and at least 45% marks. "
+                "Applications open in March. Counselling is held in June and July. "
+                "Contact admissions@apex.ac.in or +91-7351408009 for help."},
+    {'title': 'Contact', 'url': 'https://www.apex.ac.in/contact',
+     'content': "APEX Group of Institutions, Rampur Road, Uttar Pradesh. "
+                "General enquiries: info@apex.ac.in. Office hours are Monday to Saturday, 9 AM to 5 PM."},
+]
+
+def _sleep(mean_ms: float, tail: bool = False):
+    if tail and _random.random() < settings['tail_rate']:
+        mean_ms = settings['tail_ms']
+    jitter = settings['jitter']
+    time.sleep(max(0.0, mean_ms * (1 + _random.uniform(-jitter, jitter))) / 1000)
+
+def _maybe_fail(kind: str):
+    with _calls_lock:
+        calls[kind] += 1
+        failed = _random.random() < settings['error_rate']
+        if failed:
+            calls['errors'] += 1
+    if failed:
+        raise RuntimeError(f"fake {kind} error (429 Resource has been exhausted)")
+
+def _vector(text: str) -> List[float]:
+    """Unit vector of hashed word counts"""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        vector[int(hashlib.md5(word.encode('utf-8')).hexdigest()[:8], 16) % DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+def configure(api_key: Optional[str] = None, **kwargs):
+    pass
+
+def embed_content(model: str, content, task_type: Optional[str] = None, **kwargs) -> Dict:
+    """Same response shape as the real API: one vector, or a list for a list of texts"""
+    _sleep(settings['embed_ms'])
+    _maybe_fail('embed')
+    if isinstance(content, list):
+        return {'embedding': [_vector(text) for text in content]}
+    return {'embedding': _vector(content)}
+
+class GenerationConfig:
+    def __init__(self, temperature: float = 1.0, top_p: float = 1.0, max_output_tokens: int = 1024, **kwargs):
+        self.temperature = temperature
+        self.top_p = top_p
+        self.max_output_tokens = max_output_tokens
+
+types = _types.SimpleNamespace(GenerationConfig=GenerationConfig)
+
+class GenerateContentResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class GenerativeModel:
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, generation_config: Optional[GenerationConfig] = None, **kwargs):
+        _sleep(settings['generate_ms'], tail=True)
+        _maybe_fail('generate')
+        context = re.split(r'QUESTION:', prompt.split('CONTEXT:', 1)[-1])[0]
+        lines = [line.replace('Content:', '', 1) for line in context.splitlines()
+                 if not line.startswith(('Source:', 'Section:'))]
+        sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', ' '.join(lines)) if len(s.strip()) > 30]
+        text = f"According to the APEX knowledge base: {sentences[0]}" if sentences else \
+            "Please contact APEX College at +91-7351408009 for details."
+        max_chars = 4 * (generation_config.max_output_tokens if generation_config else 1024)
+        return GenerateContentResponse(text[:max_chars])
+
+def install(**overrides) -> _types.ModuleType:
+    """Register this module as google.generativeai, applying settings overrides"""
+    unknown = set(overrides) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown fake_gemini settings: {', '.join(sorted(unknown))}")
+    settings.update(overrides)
+    module = sys.modules[__name__]
+    try:
+        import google  # namespace package shared with protobuf etc. when installed
+    except ImportError:
+        google = sys.modules['google'] = _types.ModuleType('google')
+    google.generativeai = module
+    sys.modules['google.generativeai'] = module
+    return module
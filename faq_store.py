@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# Questions offered as one-click examples in the Streamlit app
+EXAMPLE_QUESTIONS = [
+    "What B.Tech programs does APEX offer?",
+    "How can I apply for admission to APEX?",
+    "Tell me about placement opportunities and companies",
+    "What are the campus facilities and infrastructure?",
+    "What is the fee structure for engineering programs?",
+    "Are there any scholarships available?",
+    "What is the hostel and accommodation like?",
+    "How do I contact APEX college?"
+]
+
+# Smoke-test queries run after indexing in rag_pipeline.py
+TEST_QUERIES = [
+    "What B.Tech programs does APEX offer?",
+    "How can I apply for admission to APEX?",
+    "What are the placement opportunities?",
+]
+
+# Curated list precomputed after every index build
+CURATED_QUESTIONS = list(dict.fromkeys(EXAMPLE_QUESTIONS + TEST_QUERIES))
+
+# Answers from these generation paths are served but never precomputed
+DEGRADED_PATHS = {'fallback', 'timeout', 'error', 'circuit_open', 'extractive'}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'be', 'do', 'does', 'can', 'i', 'me', 'my', 'we', 'you',
+    'what', 'which', 'how', 'tell', 'about', 'any', 'there', 'of', 'for', 'to', 'at', 'in', 'on',
+    'and', 'or', 'like', 'please', 'apex', 'college',
+}
+
+# A question that differs from a curated one only by a negation asks the opposite
+NEGATION_PATTERN = re.compile(r"\b(?:not|no|never|without|except|nor|cannot|dont|doesnt|isnt|arent|cant)\b|n't\b")
+
+def hash_text(text: str) -> str:
+    """Content hash of a chunk (same scheme as rag_pipeline.chunk_hash)"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.findall(r'[a-z0-9]+', question.lower()))
+
+def is_negated(question: str) -> bool:
+    """True if the question contains a negation ("not", "without", "doesn't", ...)"""
+    return bool(NEGATION_PATTERN.search(question.lower().replace('\u2019', "'")))
+
+def question_terms(question: str) -> Set[str]:
+    """Content words used for fuzzy matching, with a crude plural strip"""
+    terms = set()
+    for word in normalize_question(question).split():
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.add(word)
+    return terms
+
+class FAQStore:
+    """Precomputed answers for curated questions, kept in a compact JSON file
+
+    Entries remember the content hashes of the chunks their answer was
+    generated from; an entry is only served while all of those chunks are
+    still in the live index (see set_live_hashes).
+    """
+
+    def __init__(self, path: str, min_similarity: float = 0.8):
+        self.path = path
+        self.min_similarity = min_similarity
+        self.entries: List[Dict] = []
+        self.live_hashes: Optional[Set[str]] = None
+        self.stats = {'hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'stale': 0}
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._by_term = {}
+        self.load()
+
+    def load(self):
+        """Read entries from disk; a missing or corrupt file means an empty store"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get('entries', [])
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            entries = []
+        self._index(entries)
+
+    def save(self):
+        """Write entries atomically in compact form"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'built': time.time(), 'entries': self.entries}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def _index(self, entries: List[Dict]):
+        exact = {}
+        by_term = {}
+        for i, entry in enumerate(entries):
+            exact[entry['key']] = i
+            for term in entry['terms']:
+                by_term.setdefault(term, set()).add(i)
+        with self._lock:
+            self.entries, self._exact, self._by_term = entries, exact, by_term
+
+    def set_live_hashes(self, hashes: Iterable[str]):
+        """Record the chunk hashes of the live index version"""
+        self.live_hashes = set(hashes)
+
+    def _is_fresh(self, entry: Dict) -> bool:
+        if self.live_hashes is None:
+            return False
+        return all(h in self.live_hashes for h in entry['chunk_hashes'])
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """Return a stored result for an exact or close match, or None"""
+        entries, exact, by_term = self.entries, self._exact, self._by_term
+        if not entries:
+            return None
+
+        match = exact.get(normalize_question(question))
+        similarity = 1.0
+        if match is None:
+            terms = question_terms(question)
+            negated = is_negated(question)
+            candidates = set()
+            for term in terms:
+                candidates |= by_term.get(term, set())
+            best = 0.0
+            for i in candidates:
+                if is_negated(entries[i]['question']) != negated:
+                    continue
+                entry_terms = set(entries[i]['terms'])
+                score = len(terms & entry_terms) / len(terms | entry_terms)
+                if score > best:
+                    match, best = i, score
+            similarity = best
+            if match is None or similarity < self.min_similarity:
+                self.stats['misses'] += 1
+                return None
+
+        entry = entries[match]
+        if not self._is_fresh(entry):
+            self.stats['stale'] += 1
+            return None
+
+        self.stats['hits' if similarity == 1.0 else 'fuzzy_hits'] += 1
+        return {
+            'answer': entry['answer'],
+            'sources': entry['sources'],
+            'confidence': entry['confidence'],
+            'retrieved_chunks': len(entry['chunk_hashes']),
+            'path': 'faq',
+            'matched_question': entry['question'],
+            'match_similarity': round(similarity, 3),
+        }
+
+    def refresh(self, questions: Iterable[str], answer_fn: Callable[[str], Dict]) -> Dict:
+        """Recompute answers whose source chunks changed; keep the rest
+
+        answer_fn(question) must run the full RAG path and return a result
+        with 'chunk_hashes'. Results without retrieved chunks, or answered by
+        a degraded generation path (see DEGRADED_PATHS), are not stored.
+        """
+        kept = computed = skipped = 0
+        current = {entry['key']: entry for entry in self.entries}
+        entries = []
+        for question in questions:
+            key = normalize_question(question)
+            entry = current.get(key)
+            if entry is not None and self._is_fresh(entry):
+                entries.append(entry)
+                kept += 1
+                continue
+
+            result = answer_fn(question)
+            if not result.get('chunk_hashes') or result.get('generation_path') in DEGRADED_PATHS:
+                skipped += 1
+                continue
+            entries.append({
+                'question': question,
+                'key': key,
+                'terms': sorted(question_terms(question)),
+                'answer': result['answer'],
+                'sources': result.get('sources', []),
+                'confidence': result.get('confidence', 0.0),
+                'chunk_hashes': result['chunk_hashes'],
+            })
+            computed += 1
+
+        self._index(entries)
+        self.save()
+        return {'kept': kept, 'computed': computed, 'skipped': skipped}
+
+    def get_stats(self) -> Dict:
+        """Entry count plus hit/miss counters"""
+        fresh = sum(1 for entry in self.entries if self._is_fresh(entry))
+        return {'entries': len(self.entries), 'fresh': fresh, **self.stats}
+
+if __name__ == "__main__":
+    # Offline job: precompute FAQ answers against the rag_pipeline index
+    from rag_pipeline import GoogleAIRAGPipeline
+
+    API_KEY = os.getenv("GOOGLE_AI_API_KEY", "your-api-key-here")
+    if API_KEY == "your-api-key-here":
+        print("❌ Please set your GOOGLE_AI_API_KEY environment variable")
+    else:
+        rag = GoogleAIRAGPipeline(API_KEY, chunk_mode=os.getenv("APEX_CHUNK_MODE", "fixed"))
+        result = rag.refresh_faq()
+        print(f"✅ FAQ store: {result['kept']} kept, {result['computed']} computed, {result['skipped']} skipped")
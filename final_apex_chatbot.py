@@ -4,7 +4,16 @@ from dotenv import load_dotenv
 import google.generativeai as genai
 import chromadb
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
+from kb_service import CollectionVersions, fingerprint_data, get_shared_knowledge_base, validate_collection
+from faq_store import CURATED_QUESTIONS, EXAMPLE_QUESTIONS, FAQStore, hash_text
+from fact_store import FactStore
+from extractive import extractive_answer
+from generation import CircuitOpen, GenerationTimeout, HedgedGenerator
+import profiling
+import rate_limiter
+from retrieval import (SectionCentroidIndex, adaptive_params, candidate_count, collection_space,
+                       distance_to_similarity, estimate_tokens, hnsw_metadata, index_params, select_adaptive)
 
 # Load environment variables
 load_dotenv()
@@ -428,9 +437,19 @@ APEX_COLLEGE_DATA = {
 class FixedAPEXRAG:
     """Fixed RAG system with proper embedding handling"""
     
-    def __init__(self, api_key: str):
-        """Initialize with embedded data and Google AI"""
+    def __init__(self, api_key: str, index_config: Optional[Dict] = None, n_sections: int = 0,
+                 adaptive_config: Optional[Dict] = None, generation_config: Optional[Dict] = None):
+        """Initialize with embedded data and Google AI
+
+        index_config overrides the HNSW space/M/ef settings for new versions.
+        n_sections > 0 searches only the chunks of the closest data sections.
+        adaptive_config tunes how many retrieved chunks go into the prompt.
+        generation_config sets the per-query latency budget and hedging.
+        """
         self.api_key = api_key
+        self.index_params = index_params(index_config)
+        self.n_sections = n_sections
+        self.adaptive = adaptive_params(adaptive_config)
         
         # Configure Google AI
         genai.configure(api_key=api_key)
@@ -439,22 +458,95 @@ class FixedAPEXRAG:
         if not self._test_api():
             raise Exception("Google AI API connection failed")
         
-        # Initialize ChromaDB
+        # Initialize ChromaDB - "apex_fixed_kb" is an alias for the live version
         self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="apex_fixed_kb"
-        )
+        self.versions = CollectionVersions(self.chroma_client, "apex_fixed_kb")
+        self.data_fingerprint = fingerprint_data(APEX_COLLEGE_DATA)
+        self.embedding_failures = 0
         
         # Models
         self.embedding_model = "models/text-embedding-004" 
-        self.generation_model = genai.GenerativeModel("gemini-2.0-flash-lite")
+        # flash-lite is already the fastest model, so the fallback only shortens the answer
+        self.generator = HedgedGenerator("gemini-2.0-flash-lite", temperature=0.2, max_output_tokens=600,
+                                         params=generation_config)
+        self.generation_model = self.generator.model
+        
+        # Precomputed answers for the example questions
+        self.faq = FAQStore("./chroma_db/faq_apex_fixed_kb.json")
+        
+        # Fees, contacts and eligibility extracted into a lookup table
+        self.facts = FactStore(APEX_COLLEGE_DATA)
         
-        # Process embedded data
-        self._process_embedded_data()
+        # Reuse the live version if it was built from the same data
+        active = self.versions.active()
+        self.collection = self.versions.get_active_collection()
+        if (self.collection is not None and active.get('fingerprint') == self.data_fingerprint
+                and active.get('index_params') == self.index_params and self.collection.count() > 0):
+            st.info(f"♻️ Using existing knowledge base version {active['name']}")
+            self.faq.set_live_hashes(self._chunk_hashes(self.collection))
+            self.coarse_index = SectionCentroidIndex.from_collection(self.collection, 'section')
+        elif self.collection is not None and self.collection.count() > 0:
+            # Rebuild for changed data or index settings, but keep serving the
+            # live version if the new one can't be built (e.g. embedding outage)
+            try:
+                self.activate_version(self.build_next_version(show_progress=True))
+                self.collect_garbage()
+            except Exception as e:
+                st.warning(f"⚠️ Could not rebuild the knowledge base ({e}); using version {active['name']}")
+                self.faq.set_live_hashes(self._chunk_hashes(self.collection))
+                self.coarse_index = SectionCentroidIndex.from_collection(self.collection, 'section')
+        else:
+            # Process embedded data
+            self.activate_version(self.build_next_version(show_progress=True))
+            self.collect_garbage()
+        self.refresh_precomputed()
+    
+    def _chunk_hashes(self, collection) -> List[str]:
+        """Content hashes of every chunk in a collection version"""
+        return [hash_text(doc) for doc in collection.get(include=['documents'])['documents']]
+    
+    @profiling.profiled()
+    @rate_limiter.background
+    def build_next_version(self, show_progress: bool = False) -> Dict:
+        """Build and validate a new collection version without touching the live one"""
+        name, collection = self.versions.create(hnsw_metadata(self.index_params))
+        try:
+            self.embedding_failures = 0
+            count, probe = self._process_embedded_data(collection, show_progress)
+            validate_collection(collection, count, probe, placeholder_embeddings=self.embedding_failures)
+        except Exception:
+            self.versions.discard(name)
+            raise
+        return {'name': name, 'collection': collection, 'count': count,
+                'chunk_hashes': self._chunk_hashes(collection),
+                'coarse_index': SectionCentroidIndex.from_collection(collection, 'section')}
+    
+    def activate_version(self, version: Dict):
+        """Point the alias and this instance at a built version"""
+        self.versions.activate(version['name'], count=version['count'], fingerprint=self.data_fingerprint,
+                               index_params=self.index_params)
+        self.collection = version['collection']
+        self.faq.set_live_hashes(version['chunk_hashes'])
+        self.coarse_index = version['coarse_index']
+        self.facts.load(APEX_COLLEGE_DATA)
+    
+    @profiling.profiled()
+    @rate_limiter.background
+    def refresh_precomputed(self) -> Dict:
+        """Recompute FAQ answers whose source chunks changed in the live version"""
+        result = self.faq.refresh(CURATED_QUESTIONS, lambda q: self.query(q, use_faq=False, use_facts=False))
+        print(f"💡 FAQ store: {result['computed']} answers computed, {result['kept']} still fresh")
+        return result
+    
+    def collect_garbage(self):
+        """Drop versions older than the previous one"""
+        for name in self.versions.collect_garbage():
+            print(f"🗑️ Removed old knowledge base version {name}")
     
     def _test_api(self) -> bool:
         """Test API connection"""
         try:
+            rate_limiter.acquire('embed', 1)
             test_response = genai.embed_content(
                 model="models/text-embedding-004",
                 content="test",
@@ -501,26 +593,21 @@ class FixedAPEXRAG:
         
         return [chunk for chunk in chunks if chunk.strip()]
     
-    def _process_embedded_data(self):
-        """Process embedded APEX data into vector database"""
-        st.info("🔄 Processing comprehensive APEX college data...")
-        
-        # Clear existing data
-        try:
-            existing = self.collection.count()
-            if existing > 0:
-                all_data = self.collection.get()
-                if all_data['ids']:
-                    self.collection.delete(ids=all_data['ids'])
-                st.info(f"🗑️ Cleared {existing} existing chunks")
-        except:
-            pass
+    def _process_embedded_data(self, collection, show_progress: bool = True):
+        """Process embedded APEX data into a (new, empty) collection version
+
+        Returns (chunks added, a stored embedding to smoke-test the version with).
+        Background rebuilds pass show_progress=False and log to stdout instead
+        of the Streamlit page.
+        """
+        notify = st.info if show_progress else print
+        notify("🔄 Processing comprehensive APEX college data...")
         
         all_chunks = []
         all_metadata = []
         all_ids = []
         
-        progress_bar = st.progress(0)
+        progress_bar = st.progress(0) if show_progress else None
         total_sections = len(APEX_COLLEGE_DATA)
         
         for idx, (section_name, content) in enumerate(APEX_COLLEGE_DATA.items()):
@@ -539,30 +626,36 @@ class FixedAPEXRAG:
                 all_metadata.append(metadata)
                 all_ids.append(f"{section_name}_{chunk_id}")
             
-            progress_bar.progress((idx + 1) / total_sections * 0.5)
+            if progress_bar:
+                progress_bar.progress((idx + 1) / total_sections * 0.5)
         
-        st.success(f"📝 Created {len(all_chunks)} chunks from embedded data")
+        notify(f"📝 Created {len(all_chunks)} chunks from embedded data")
         
         # Generate embeddings with fixed handling
-        st.info("🧠 Generating embeddings...")
-        embeddings = self._generate_embeddings_fixed(all_chunks)
-        progress_bar.progress(0.8)
+        notify("🧠 Generating embeddings...")
+        embeddings = self._generate_embeddings_fixed(all_chunks, show_progress)
+        if progress_bar:
+            progress_bar.progress(0.8)
         
         # Add to ChromaDB
-        st.info("💾 Adding to vector database...")
-        self._add_to_chromadb(all_chunks, embeddings, all_metadata, all_ids)
+        notify("💾 Adding to vector database...")
+        self._add_to_chromadb(collection, all_chunks, embeddings, all_metadata, all_ids, show_progress)
         
-        progress_bar.progress(1.0)
-        st.success(f"✅ Successfully processed {self.collection.count()} chunks!")
+        if progress_bar:
+            progress_bar.progress(1.0)
+        notify(f"✅ Successfully processed {collection.count()} chunks!")
+        return len(all_chunks), embeddings[0] if embeddings else None
     
-    def _generate_embeddings_fixed(self, texts: List[str]) -> List[List[float]]:
+    def _generate_embeddings_fixed(self, texts: List[str], show_progress: bool = True) -> List[List[float]]:
         """Generate embeddings with fixed response handling"""
+        warn = st.warning if show_progress else print
         embeddings = []
         
         # Process texts individually to avoid batch issues
         for i, text in enumerate(texts):
             try:
                 # Call API for single text
+                rate_limiter.acquire('embed', estimate_tokens(text))
                 response = genai.embed_content(
                     model=self.embedding_model,
                     content=text,  # Single string, not list
@@ -575,41 +668,68 @@ class FixedAPEXRAG:
                     embeddings.append(response['embedding'])
                 else:
                     # Fallback to dummy embedding
-                    st.warning(f"No embedding in response for text {i+1}")
+                    warn(f"No embedding in response for text {i+1}")
                     embeddings.append([0.1] * 768)
+                    self.embedding_failures += 1
                 
             except Exception as e:
-                st.warning(f"Embedding error for text {i+1}: {e}")
-                # Add dummy embedding
+                warn(f"Embedding error for text {i+1}: {e}")
+                # Add dummy embedding (the version then fails validation)
                 embeddings.append([0.1] * 768)
+                self.embedding_failures += 1
             
             # Show progress for long operations
-            if (i + 1) % 10 == 0:
+            if show_progress and (i + 1) % 10 == 0:
                 st.info(f"Processed {i+1}/{len(texts)} embeddings...")
         
         return embeddings
     
-    def _add_to_chromadb(self, chunks, embeddings, metadata, ids):
+    def _add_to_chromadb(self, collection, chunks, embeddings, metadata, ids, show_progress: bool = True):
         """Add data to ChromaDB"""
+        warn = st.warning if show_progress else print
         batch_size = 10  # Very small batches
         
         for i in range(0, len(chunks), batch_size):
             end_idx = min(i + batch_size, len(chunks))
             
             try:
-                self.collection.add(
+                collection.add(
                     documents=chunks[i:end_idx],
                     embeddings=embeddings[i:end_idx], 
                     metadatas=metadata[i:end_idx],
                     ids=ids[i:end_idx]
                 )
             except Exception as e:
-                st.warning(f"ChromaDB error for batch {i//batch_size + 1}: {e}")
+                warn(f"ChromaDB error for batch {i//batch_size + 1}: {e}")
     
-    def query(self, user_question: str, n_results: int = 3) -> Dict:
-        """Query the RAG system with fixed embedding generation"""
+    @profiling.profiled()
+    def query(self, user_question: str, n_results: int = 3, use_faq: bool = True,
+              use_facts: bool = True, budget_seconds: Optional[float] = None,
+              extractive: bool = False) -> Dict:
+        """Query the RAG system with fixed embedding generation
+
+        Confident fee/contact/eligibility lookups are answered from the fact
+        table and curated questions from the FAQ store, both without API calls.
+        budget_seconds bounds the whole query; 'generation_path' records which
+        request answered (primary/hedge/fallback). extractive=True, a timeout
+        or an open circuit answers by quoting the best retrieved sentences
+        ("extractive", with 'fallback_reason').
+        """
+        deadline = self.generator.deadline(budget_seconds)
+        
+        if use_facts:
+            fact = self.facts.match(user_question)
+            if fact:
+                return fact
+        
+        if use_faq:
+            cached = self.faq.lookup(user_question)
+            if cached:
+                return cached
+        
         try:
             # Generate query embedding - single text, not list
+            rate_limiter.acquire('embed', estimate_tokens(user_question))
             query_response = genai.embed_content(
                 model=self.embedding_model,
                 content=user_question,  # Single string
@@ -622,22 +742,26 @@ class FixedAPEXRAG:
             else:
                 raise ValueError("No embedding in query response")
             
-            # Search ChromaDB
-            results = self.collection.query(
+            # Search ChromaDB - hold on to the live version even if a rebuild swaps it
+            collection = self.collection
+            results = collection.query(
                 query_embeddings=[query_embedding],
-                n_results=min(n_results, max(1, self.collection.count())),
+                n_results=min(candidate_count(self.adaptive, n_results), max(1, collection.count())),
+                where=self.coarse_index.where_filter(query_embedding, self.n_sections),
                 include=['documents', 'metadatas', 'distances']
             )
             
-            # Process results
-            relevant_chunks = []
+            # Process results - keep only candidates close to the best match
+            space = collection_space(collection)
+            candidates = []
             if results['documents'] and results['documents'][0]:
                 for i, doc in enumerate(results['documents'][0]):
-                    relevant_chunks.append({
+                    candidates.append({
                         'content': doc,
                         'metadata': results['metadatas'][0][i],
-                        'similarity_score': 1 - results['distances'][0][i],
+                        'similarity_score': distance_to_similarity(results['distances'][0][i], space),
                     })
+            relevant_chunks = select_adaptive(candidates, self.adaptive, n_results)
             
             if not relevant_chunks:
                 return {
@@ -672,14 +796,21 @@ Instructions:
 
 ANSWER:"""
             
-            response = self.generation_model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.2,
-                    top_p=0.9,
-                    max_output_tokens=600,
-                )
-            )
+            fallback_reason = 'requested' if extractive else None
+            if not extractive:
+                try:
+                    generated = self.generator.generate(prompt, deadline)
+                except CircuitOpen:
+                    fallback_reason = 'circuit_open'
+                except GenerationTimeout:
+                    fallback_reason = 'timeout'
+                except Exception as e:
+                    # Every attempt failed (GenerationFailed), or something else went wrong
+                    print(f"❌ Error generating answer: {e}")
+                    fallback_reason = 'error'
+            if fallback_reason:
+                extracted = extractive_answer(user_question, relevant_chunks, source_field='section')
+                generated = {'text': extracted['answer'], 'path': 'extractive', 'latency': extracted['seconds']}
             
             # Extract sources
             sources = []
@@ -692,10 +823,18 @@ ANSWER:"""
             avg_confidence = np.mean([chunk['similarity_score'] for chunk in relevant_chunks])
             
             return {
-                'answer': response.text.strip(),
+                'answer': generated['text'],
                 'sources': sources,
                 'confidence': float(avg_confidence),
-                'retrieved_chunks': len(relevant_chunks)
+                'retrieved_chunks': len(relevant_chunks),
+                'candidates': len(candidates),
+                'context_tokens': sum(estimate_tokens(chunk['content']) for chunk in relevant_chunks),
+                'prompt_tokens': estimate_tokens(prompt),
+                'chunk_hashes': [hash_text(chunk['content']) for chunk in relevant_chunks],
+                'path': 'rag',
+                'generation_path': generated['path'],
+                'generation_seconds': round(generated['latency'], 4),
+                'fallback_reason': fallback_reason
             }
             
         except Exception as e:
@@ -709,6 +848,12 @@ ANSWER:"""
         """Get system statistics"""
         return {
             'total_chunks': self.collection.count(),
+            'active_version': self.collection.name,
+            'distance_space': collection_space(self.collection),
+            'faq': self.faq.get_stats(),
+            'facts': self.facts.get_stats(),
+            'generation': self.generator.get_stats(),
+            'rate_limits': rate_limiter.get_stats(),
             'data_sections': len(APEX_COLLEGE_DATA),
             'embedding_model': self.embedding_model,
             'status': 'ready'
@@ -752,16 +897,19 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+KB_NAME = "apex_fixed_kb"
+
+def get_knowledge_base(api_key: str):
+    """Process-wide knowledge base shared by every browser session"""
+    return get_shared_knowledge_base(KB_NAME, lambda: FixedAPEXRAG(api_key))
+
 def main():
     """Main Streamlit application"""
     
-    # Session state initialization
+    # Session state initialization - only chat history is per session
     if "messages" not in st.session_state:
         st.session_state.messages = []
     
-    if "rag_system" not in st.session_state:
-        st.session_state.rag_system = None
-    
     # Header
     st.markdown('<div class="main-header"><h1>🎓 APEX College AI Assistant</h1><p>Fixed Embedding Processing - Ready for Streamlit Cloud</p></div>', unsafe_allow_html=True)
     
@@ -784,21 +932,29 @@ def main():
         
         st.divider()
         
-        # Initialize RAG system
-        if st.session_state.rag_system is None:
-            with st.spinner("🚀 Initializing APEX knowledge base with fixed embedding..."):
-                try:
-                    st.session_state.rag_system = FixedAPEXRAG(api_key)
-                    st.success("✅ Knowledge Base Ready!")
-                except Exception as e:
-                    st.error(f"❌ Failed to initialize: {e}")
-                    st.stop()
+        # Initialize RAG system (once per process, shared by all sessions)
+        with st.spinner("🚀 Initializing APEX knowledge base with fixed embedding..."):
+            try:
+                rag_system = get_knowledge_base(api_key)
+            except Exception as e:
+                st.error(f"❌ Failed to initialize: {e}")
+                st.stop()
+        
+        # Fast mode answers from the retrieved text without calling Gemini
+        fast_mode = st.checkbox("⚡ Fast answers (no AI generation)", key="fast_mode",
+                                help="Quote the most relevant sentences from the knowledge base instead of generating an answer")
+        
+        # Profiling dumps cProfile stats for this session's queries (see profiling.py)
+        profile_mode = st.checkbox("🔬 Profile queries", key="profile_mode",
+                                   help=f"Write a profile of each query to {profiling.PROFILE_DIR}")
+        profiling.set_session_profiling(profile_mode)
+        if profile_mode and st.session_state.get('last_profile'):
+            st.caption(f"Last profile: {st.session_state.last_profile}")
         
         # System stats
-        if st.session_state.rag_system:
-            st.header("📊 System Status")
-            stats = st.session_state.rag_system.get_stats()
-            st.json(stats)
+        st.header("📊 System Status")
+        stats = rag_system.get_stats()
+        st.json(stats)
         
         st.divider()
         
@@ -808,10 +964,16 @@ def main():
         for section in sections:
             st.write(f"• {section.replace('_', ' ').title()}")
         
-        # Refresh button
+        # Refresh button - rebuilds a new index version in the background;
+        # queries keep using the live version until the new one is swapped in
         if st.button("🔄 Restart System"):
-            st.session_state.rag_system = None
-            st.rerun()
+            if rag_system.rebuild_in_background():
+                st.info("🔄 Rebuilding knowledge base in the background...")
+            else:
+                st.info("⏳ A rebuild is already running")
+        if stats.get('last_rebuild_error'):
+            st.warning(f"⚠️ Last rebuild failed: {stats['last_rebuild_error']}")
+
     
     # Main chat interface
     st.subheader("💬 Chat with APEX Assistant")
@@ -829,10 +991,10 @@ def main():
         st.session_state.messages.append({"role": "user", "content": prompt})
         st.markdown(f'<div class="user-message">👤 {prompt}</div>', unsafe_allow_html=True)
         
-        # Generate response
-        with st.spinner("🤔 Searching knowledge base..."):
+        # Generate response (profiled together with its rendering when profiling is on)
+        with profiling.profile('streamlit_turn') as turn, st.spinner("🤔 Searching knowledge base..."):
             try:
-                result = st.session_state.rag_system.query(prompt)
+                result = rag_system.query(prompt, extractive=fast_mode)
                 
                 # Add assistant response
                 st.session_state.messages.append({"role": "assistant", "content": result['answer']})
@@ -844,6 +1006,12 @@ def main():
                         st.header("📚 Retrieved Sources")
                         st.write(f"**Confidence:** {result['confidence']:.3f}")
                         st.write(f"**Chunks:** {result['retrieved_chunks']}")
+                        if 'prompt_tokens' in result:
+                            st.write(f"**Prompt tokens:** ~{result['prompt_tokens']} "
+                                     f"({result['retrieved_chunks']} of {result['candidates']} candidates)")
+                        if 'generation_path' in result:
+                            st.write(f"**Answered by:** {result['generation_path']} "
+                                     f"({result.get('generation_seconds') or '-'}s)")
                         
                         for i, source in enumerate(result['sources'], 1):
                             st.write(f"{i}. {source['section'].replace('_', ' ').title()} (Score: {source['similarity']:.3f})")
@@ -853,21 +1021,15 @@ def main():
                 st.session_state.messages.append({"role": "assistant", "content": error_msg})
                 st.markdown(f'<div class="assistant-message">🤖 {error_msg}</div>', unsafe_allow_html=True)
         
+        if turn['path']:
+            st.session_state.last_profile = turn['path']
+        
         st.rerun()
     
     # Example questions
     st.subheader("💡 Try These Questions")
     
-    example_questions = [
-        "What B.Tech programs does APEX offer?",
-        "How can I apply for admission to APEX?",
-        "Tell me about placement opportunities and companies",
-        "What are the campus facilities and infrastructure?",  
-        "What is the fee structure for engineering programs?",
-        "Are there any scholarships available?",
-        "What is the hostel and accommodation like?",
-        "How do I contact APEX college?"
-    ]
+    example_questions = EXAMPLE_QUESTIONS
     
     # Display example questions in columns
     cols = st.columns(2)
@@ -879,7 +1041,9 @@ def main():
                 st.session_state.messages.append({"role": "user", "content": question})
                 
                 try:
-                    result = st.session_state.rag_system.query(question)
+                    result = rag_system.query(question, extractive=fast_mode)
+                    if result.get('profile'):
+                        st.session_state.last_profile = result['profile']
                     st.session_state.messages.append({"role": "assistant", "content": result['answer']})
                 except Exception as e:
                     error_msg = f"Error processing question: {str(e)}"
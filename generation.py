@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+import google.generativeai as genai
+
+import rate_limiter
+from retrieval import estimate_tokens
+
+# Generation calls run here so a query can stop waiting at its deadline.
+# Python threads cannot be cancelled: abandoned calls finish in the background.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemini")
+
+# Per-query latency budget and the hedging/fallback schedule inside it
+DEFAULT_GENERATION_PARAMS = {
+    'budget_seconds': 15.0,             # end-to-end, from query start to answer
+    'hedge_delay': 3.0,                 # used until min_samples latencies are recorded
+    'min_samples': 20,                  # then the observed p95 is used instead
+    'fallback_reserve': 4.0,            # seconds before the deadline to start the fallback
+    'fallback_model': None,             # None = same model, shorter output only
+    'fallback_max_output_tokens': 256,
+    'breaker_failures': 3,              # consecutive failed queries that open the circuit
+    'breaker_reset_seconds': 30.0,      # then one probe query is let through after this long
+}
+
+def generation_params(overrides: Optional[Dict] = None) -> Dict:
+    """Defaults merged with overrides"""
+    params = dict(DEFAULT_GENERATION_PARAMS)
+    params.update(overrides or {})
+    if params['budget_seconds'] <= 0:
+        raise ValueError("budget_seconds must be positive")
+    return params
+
+class GenerationUnavailable(Exception):
+    """Gemini did not produce an answer for this query"""
+
+class GenerationTimeout(GenerationUnavailable):
+    """No generation attempt finished before the query deadline"""
+
+class GenerationFailed(GenerationUnavailable):
+    """Every generation attempt raised an error before the deadline"""
+
+class CircuitOpen(GenerationUnavailable):
+    """Recent queries kept failing, so Gemini is not being called"""
+
+class CircuitBreaker:
+    """Stop calling an API after repeated failures, probing again after a pause
+
+    closed     calls go through
+    open       calls are refused until reset_seconds have passed
+    half-open  one probe call goes through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self._probing else 'open'
+
+    def allow(self) -> bool:
+        """True if a call may be made now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+class HedgedGenerator:
+    """Deadline-bounded Gemini generation with hedging and a fallback cascade
+
+    1. The primary model is called with the full generation config.
+    2. If it has not answered after the observed p95 latency (or
+       hedge_delay until min_samples calls have been seen), a
+       duplicate request is fired at the same model ("hedge").
+    3. Once less than fallback_reserve seconds remain before the deadline,
+       fallback_model (or the same model) is called with
+       fallback_max_output_tokens ("fallback").
+
+    Hedging only covers slowness: once an attempt has raised an error (a
+    429, say), no duplicate of it is fired. If nothing else is still
+    running, the fallback is called straight away, so a failing query costs
+    at most two calls.
+
+    The first attempt to succeed wins. If every attempt raised an error,
+    GenerationFailed is raised (the last error chained); if attempts were
+    still running at the deadline, GenerationTimeout. Both feed a circuit
+    breaker; while it is open, generate() raises CircuitOpen at once.
+    """
+
+    def __init__(self, model_name: str, temperature: float, max_output_tokens: int,
+                 params: Optional[Dict] = None, top_p: float = 0.9):
+        self.params = generation_params(params)
+        self.model_name = model_name
+        self.fallback_model_name = self.params['fallback_model'] or model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.fallback_model = genai.GenerativeModel(self.fallback_model_name)
+        self.temperature = temperature
+        self.top_p = top_p
+        self.max_output_tokens = max_output_tokens
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(self.params['breaker_failures'], self.params['breaker_reset_seconds'])
+        self.stats = {'primary': 0, 'hedge': 0, 'fallback': 0, 'timeout': 0, 'failed': 0, 'circuit_open': 0,
+                      'hedges_fired': 0, 'fallbacks_fired': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the primary before firing a duplicate"""
+        if len(self.latency) < self.params['min_samples']:
+            return self.params['hedge_delay']
+        return self.latency.percentile(95)
+
+    def _call(self, model, prompt: str, max_output_tokens: int, priority: str, deadline: float) -> Dict:
+        start = time.monotonic()
+        rate_limiter.acquire('generate', estimate_tokens(prompt) + max_output_tokens, priority,
+                             timeout=max(0.0, deadline - start))
+        response = model.generate_content(
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_output_tokens=max_output_tokens,
+            )
+        )
+        return {'text': response.text.strip(), 'latency': time.monotonic() - start}
+
+    def deadline(self, budget_seconds: Optional[float] = None) -> float:
+        """Absolute deadline (time.monotonic()) for a query starting now"""
+        return time.monotonic() + (budget_seconds or self.params['budget_seconds'])
+
+    def generate(self, prompt: str, deadline: float) -> Dict:
+        """Return {'text', 'path', 'latency', 'attempts'} before deadline (time.monotonic())
+
+        path is "primary", "hedge" or "fallback". Raises GenerationFailed
+        when every attempt errored, GenerationTimeout when the deadline
+        passed first and CircuitOpen while the breaker is open.
+        """
+        if not self.breaker.allow():
+            self._count('circuit_open')
+            raise CircuitOpen(f"generation disabled after {self.breaker.failures} failed queries")
+        start = time.monotonic()
+        # Worker threads don't inherit the caller's context, so pass its priority along
+        priority = rate_limiter.current_priority()
+        attempts = {_executor.submit(self._call, self.model, prompt, self.max_output_tokens,
+                                     priority, deadline): 'primary'}
+        hedge_at = start + self.hedge_delay()
+        fallback_at = deadline - self.params['fallback_reserve']
+        fired = {'primary'}
+        finished = set()
+        last_error = None
+        errored = False
+
+        while True:
+            # The first attempt to finish without an error wins
+            for future, path in list(attempts.items()):
+                if future in finished or not future.done():
+                    continue
+                finished.add(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error, errored = e, True
+                    continue
+                if path in ('primary', 'hedge'):
+                    self.latency.record(result['latency'])
+                self._count(path)
+                self.breaker.record_success()
+                result.update(path=path, latency=time.monotonic() - start, attempts=len(attempts))
+                return result
+
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            pending = [f for f in attempts if not f.done()]
+            # Hedge a slow attempt, never a failed one; fall back early once everything failed
+            if 'hedge' not in fired and not errored and pending and hedge_at <= now < fallback_at:
+                attempts[_executor.submit(self._call, self.model, prompt, self.max_output_tokens,
+                                          priority, deadline)] = 'hedge'
+                fired.add('hedge')
+                self._count('hedges_fired')
+                continue
+            if 'fallback' not in fired and (now >= fallback_at or not pending):
+                attempts[_executor.submit(self._call, self.fallback_model, prompt,
+                                          self.params['fallback_max_output_tokens'], priority, deadline)] = 'fallback'
+                fired.add('fallback')
+                self._count('fallbacks_fired')
+                continue
+            if not pending:
+                break
+
+            next_event = deadline
+            if 'hedge' not in fired and not errored:
+                next_event = min(next_event, hedge_at)
+            if 'fallback' not in fired:
+                next_event = min(next_event, fallback_at)
+            wait(pending, timeout=max(0.0, next_event - now), return_when=FIRST_COMPLETED)
+
+        self.breaker.record_failure()
+        if all(f.done() for f in attempts):
+            self._count('failed')
+            raise GenerationFailed(f"all {len(attempts)} attempts failed: {last_error}") from last_error
+        self._count('timeout')
+        raise GenerationTimeout(f"no answer within {deadline - start:.1f}s "
+                                f"({len(attempts)} attempts)") from last_error
+
+    def get_stats(self) -> Dict:
+        """Counts by answering path plus the current hedge delay"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        p95 = self.latency.percentile(95)
+        stats['p95_seconds'] = round(p95, 3) if p95 is not None else None
+        stats['hedge_delay_seconds'] = round(self.hedge_delay(), 3)
+        stats['circuit'] = self.breaker.state
+        return stats
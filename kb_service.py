@@ -0,0 +1,388 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from faq_store import normalize_question
+
+class ReadWriteLock:
+    """Many concurrent readers or one exclusive writer
+
+    Writers are preferred: once a writer is waiting, new readers block until
+    it has finished, so a rebuild cannot be starved by a steady query load.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one
+
+    The first caller for a key runs fn; callers arriving while it runs wait
+    for and share its result (or exception) instead of running fn again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True if another caller's run was reused"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+        try:
+            call['result'] = fn()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        return call['result'], False
+
+class SharedKnowledgeBase:
+    """Process-wide, thread-safe wrapper around one RAG backend
+
+    The backend (e.g. FixedAPEXRAG or GoogleAIRAGPipeline) is built once by
+    `factory` on first use. Queries take the read lock and run in parallel;
+    rebuilds take the write lock and run alone. Backends that support
+    blue/green versions (build_next_version / activate_version) are rebuilt
+    while queries keep running, and the write lock is only held for the swap.
+    Identical questions asked at the same time against the same index
+    version are answered by one backend call.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._backend = None
+        self._init_lock = threading.Lock()
+        self._lock = ReadWriteLock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread = None
+        self._in_flight = SingleFlight()
+        self.index_version = 0
+        self.stats = {'queries': 0, 'coalesced': 0, 'rebuilds': 0, 'active_queries': 0, 'last_rebuild_seconds': 0.0,
+                      'rebuild_in_progress': False, 'last_rebuild_error': None}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        """The underlying RAG system, building it on first access"""
+        if self._backend is None:
+            with self._init_lock:
+                if self._backend is None:
+                    self._backend = self._factory()
+                    self.index_version += 1
+        return self._backend
+
+    def _count(self, key: str, delta: int = 1):
+        with self._stats_lock:
+            self.stats[key] += delta
+
+    def query(self, question: str, *args, **kwargs) -> Dict:
+        """Answer a question; safe to call from many sessions at once
+
+        A caller that finds the same question (after normalisation, with the
+        same options) already in flight waits for that answer; its copy of
+        the result has 'coalesced' set to True.
+        """
+        backend = self.backend
+        key = (normalize_question(question), self.index_version, args, tuple(sorted(kwargs.items())))
+        result, shared = self._in_flight.do(key, lambda: self._query(backend, question, *args, **kwargs))
+        if shared:
+            self._count('coalesced')
+            result = dict(result, coalesced=True)
+        return result
+
+    def _query(self, backend, *args, **kwargs) -> Dict:
+        with self._lock.read_locked():
+            self._count('active_queries')
+            try:
+                return backend.query(*args, **kwargs)
+            finally:
+                self._count('active_queries', -1)
+                self._count('queries')
+
+    def rebuild(self, rebuild_fn: Optional[Callable[[Any], Any]] = None):
+        """Re-ingest the knowledge base
+
+        rebuild_fn(backend) runs under the write lock. Without it, a backend
+        with build_next_version() is rebuilt blue/green: the new version is
+        built and validated while queries continue on the live one, then
+        swapped in under a brief write lock. Other backends fall back to
+        backend.rebuild() (or a fresh backend from the factory) under the lock.
+        """
+        backend = self.backend
+        start = time.time()
+        with self._rebuild_lock:
+            with self._stats_lock:
+                self.stats['rebuild_in_progress'] = True
+            try:
+                if rebuild_fn is None and hasattr(backend, 'build_next_version'):
+                    version = result = backend.build_next_version()
+                    with self._lock.write_locked():
+                        backend.activate_version(version)
+                        self.index_version += 1
+                    backend.collect_garbage()
+                    if hasattr(backend, 'refresh_precomputed'):
+                        # e.g. FAQ answers whose source chunks changed
+                        backend.refresh_precomputed()
+                else:
+                    with self._lock.write_locked():
+                        if rebuild_fn is not None:
+                            result = rebuild_fn(backend)
+                        elif hasattr(backend, 'rebuild'):
+                            result = backend.rebuild()
+                        else:
+                            self._backend = result = self._factory()
+                        self.index_version += 1
+            except Exception as e:
+                with self._stats_lock:
+                    self.stats['last_rebuild_error'] = str(e)
+                raise
+            finally:
+                with self._stats_lock:
+                    self.stats['rebuild_in_progress'] = False
+        with self._stats_lock:
+            self.stats['rebuilds'] += 1
+            self.stats['last_rebuild_seconds'] = round(time.time() - start, 2)
+            self.stats['last_rebuild_error'] = None
+        return result
+
+    def rebuild_in_background(self) -> bool:
+        """Start rebuild() on a daemon thread; False if one is already running"""
+        with self._init_lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return False
+
+            def run():
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    print(f"❌ Background rebuild failed: {e}")
+
+            self._rebuild_thread = threading.Thread(target=run, name="kb-rebuild", daemon=True)
+            self._rebuild_thread.start()
+            return True
+
+    def get_stats(self) -> Dict:
+        """Backend stats plus service counters"""
+        backend = self.backend
+        # FixedAPEXRAG has get_stats(), GoogleAIRAGPipeline get_collection_stats()
+        stats_fn = getattr(backend, 'get_stats', None) or getattr(backend, 'get_collection_stats', None)
+        with self._lock.read_locked():
+            stats = dict(stats_fn()) if stats_fn else {}
+        with self._stats_lock:
+            stats.update(self.stats)
+        stats['index_version'] = self.index_version
+        return stats
+
+class CollectionVersions:
+    """Blue/green versions of one logical collection behind an alias
+
+    Each rebuild writes a fresh Chroma collection named "<alias>__v<N>".
+    A small JSON pointer file next to the database records which version is
+    live; switching it is a single atomic file replace, so readers only ever
+    see a complete index.
+    """
+
+    POINTER_FILE = "collection_aliases.json"
+
+    def __init__(self, client, alias: str, path: str = "./chroma_db"):
+        self.client = client
+        self.alias = alias
+        self.pointer_path = os.path.join(path, self.POINTER_FILE)
+        self._lock = threading.Lock()
+
+    def _read_pointers(self) -> Dict:
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_pointers(self, pointers: Dict):
+        os.makedirs(os.path.dirname(self.pointer_path) or '.', exist_ok=True)
+        tmp_path = self.pointer_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(pointers, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+
+    def active(self) -> Optional[Dict]:
+        """Info about the live version ({'name', 'count', 'fingerprint', ...}) or None"""
+        return self._read_pointers().get(self.alias)
+
+    def get_active_collection(self):
+        """The live collection, or None if no version has been activated"""
+        info = self.active()
+        if not info:
+            return None
+        try:
+            return self.client.get_collection(name=info['name'])
+        except Exception:
+            return None
+
+    def _collection_names(self) -> List[str]:
+        # list_collections returns names in newer chromadb, objects in older
+        return [getattr(collection, 'name', collection) for collection in self.client.list_collections()]
+
+    def version_names(self) -> List[str]:
+        """Existing version collections for this alias, oldest first"""
+        prefix = f"{self.alias}__v"
+        names = [name for name in self._collection_names()
+                 if name.startswith(prefix) and name[len(prefix):].isdigit()]
+        return sorted(names, key=lambda name: int(name[len(prefix):]))
+
+    def create(self, metadata: Optional[Dict] = None):
+        """Create an empty collection for the next version; returns (name, collection)
+
+        metadata is passed to Chroma, e.g. HNSW settings from retrieval.hnsw_metadata.
+        """
+        with self._lock:
+            existing = [int(name.rsplit('__v', 1)[1]) for name in self.version_names()]
+            active = self.active()
+            if active:
+                existing.append(int(active['name'].rsplit('__v', 1)[1]))
+            name = f"{self.alias}__v{max(existing, default=0) + 1}"
+            return name, self.client.create_collection(name=name, metadata=metadata)
+
+    def activate(self, name: str, **info):
+        """Atomically point the alias at a built and validated version"""
+        with self._lock:
+            pointers = self._read_pointers()
+            pointers[self.alias] = {'name': name, 'activated': time.time(), **info}
+            self._write_pointers(pointers)
+
+    def discard(self, name: str):
+        """Drop a version that failed to build or validate"""
+        try:
+            self.client.delete_collection(name=name)
+        except Exception as e:
+            print(f"⚠️ Could not delete collection {name}: {e}")
+
+    def collect_garbage(self, keep_previous: int = 1) -> List[str]:
+        """Delete old versions, keeping the live one and the newest few before it
+
+        Keeping the previous version means queries that started just before a
+        swap can still finish against it. The unversioned collection named
+        after the alias (from before versioning) is dropped too.
+        """
+        active = self.active()
+        if not active:
+            return []
+        names = self.version_names()
+        if active['name'] not in names:
+            return []
+        older = names[:names.index(active['name'])]
+        doomed = older[:max(0, len(older) - keep_previous)]
+        if self.alias in self._collection_names():
+            doomed.insert(0, self.alias)
+        for name in doomed:
+            self.discard(name)
+        return doomed
+
+def validate_collection(collection, expected_count: int, probe_embedding: Optional[List[float]] = None,
+                        placeholder_embeddings: int = 0):
+    """Check a freshly built version before it goes live
+
+    Raises ValueError if the chunk count is off, a smoke query with
+    probe_embedding returns nothing, or placeholder_embeddings chunks were
+    stored with dummy vectors because the embedding API failed.
+    """
+    if placeholder_embeddings:
+        raise ValueError(f"{placeholder_embeddings} chunks have placeholder embeddings (embedding API failed)")
+    count = collection.count()
+    if count != expected_count:
+        raise ValueError(f"expected {expected_count} chunks, found {count}")
+    if probe_embedding is not None:
+        results = collection.query(query_embeddings=[probe_embedding], n_results=1, include=['documents'])
+        if not results['documents'] or not results['documents'][0]:
+            raise ValueError("smoke query returned no results")
+
+def fingerprint_data(data: Any) -> str:
+    """Stable hash of JSON-serialisable source data"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+_registry: Dict[str, SharedKnowledgeBase] = {}
+_registry_lock = threading.Lock()
+
+def get_shared_knowledge_base(name: str, factory: Callable[[], Any], lazy: bool = False) -> SharedKnowledgeBase:
+    """Return the process-wide knowledge base registered under name
+
+    The first caller's factory wins; later callers (other sessions, server
+    threads) get the same instance, so ingestion runs once per process.
+    With lazy on, the backend is built on first use instead of here.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = SharedKnowledgeBase(factory)
+        kb = _registry[name]
+    if not lazy:
+        kb.backend  # build outside the registry lock
+    return kb
+
+def reset_shared_knowledge_base(name: str):
+    """Forget a registered knowledge base so the next caller builds it again"""
+    with _registry_lock:
+        _registry.pop(name, None)
@@ -0,0 +1,120 @@
+import contextvars
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# APEX_PROFILE=1 profiles every wrapped call in the process; the chatbot
+# sidebar can also switch it on for one session only
+PROFILE_DIR = os.getenv("APEX_PROFILE_DIR", "./profiles")
+PROFILE_KEEP = int(os.getenv("APEX_PROFILE_KEEP", "50"))
+PROFILE_TOP = int(os.getenv("APEX_PROFILE_TOP", "25"))
+
+_enabled = os.getenv("APEX_PROFILE", "").lower() in ("1", "true", "yes", "on")
+_session = contextvars.ContextVar('apex_profile_session', default=False)
+# cProfile can only run one profiler at a time per process (enforced on 3.12+)
+_profile_lock = threading.Lock()
+_sequence = itertools.count()
+_rotate_lock = threading.Lock()
+
+def set_enabled(enabled: bool):
+    """Profile every wrapped call in this process"""
+    global _enabled
+    _enabled = enabled
+
+def set_session_profiling(enabled: bool):
+    """Profile wrapped calls made from the current context (e.g. one Streamlit session's run)"""
+    _session.set(enabled)
+
+def is_enabled() -> bool:
+    return _enabled or _session.get()
+
+def _rotate(directory: str, keep: int):
+    """Delete the oldest profiles beyond the newest `keep` requests"""
+    with _rotate_lock:
+        stems = sorted({name.rsplit('.', 1)[0] for name in os.listdir(directory)
+                        if name.endswith(('.prof', '.txt'))})
+        for stem in stems[:-keep] if keep > 0 else []:
+            for ext in ('.prof', '.txt'):
+                try:
+                    os.remove(os.path.join(directory, stem + ext))
+                except FileNotFoundError:
+                    pass
+
+def _write(profiler: cProfile.Profile, label: str, wall_seconds: float) -> str:
+    """Dump the raw stats (.prof, for snakeviz/pstats) and a top-N summary (.txt)"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}_{next(_sequence):06d}_{os.getpid()}_{label}"
+    path = os.path.join(PROFILE_DIR, stem)
+    profiler.dump_stats(path + '.prof')
+
+    summary = io.StringIO()
+    summary.write(f"{label}: {wall_seconds * 1000:.1f} ms wall, thread {threading.current_thread().name}\n\n")
+    stats = pstats.Stats(profiler, stream=summary).strip_dirs()
+    summary.write(f"Top {PROFILE_TOP} by cumulative time:\n")
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+    summary.write(f"Top {PROFILE_TOP} by own time:\n")
+    stats.sort_stats('tottime').print_stats(PROFILE_TOP)
+    with open(path + '.txt', 'w', encoding='utf-8') as f:
+        f.write(summary.getvalue())
+
+    _rotate(PROFILE_DIR, PROFILE_KEEP)
+    return path + '.txt'
+
+@contextmanager
+def profile(label: str):
+    """Profile the enclosed block if profiling is on; yields a dict that receives 'path'
+
+    Only the calling thread is profiled (work handed to thread pools, such
+    as hedged Gemini calls, shows up as time spent waiting). One block is
+    profiled at a time: nested profiled calls are folded into the outermost
+    profile, and calls that overlap one already being profiled in another
+    thread run unprofiled.
+    """
+    info = {'path': None}
+    if not is_enabled() or not _profile_lock.acquire(blocking=False):
+        yield info
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool (e.g. a debugger or coverage) already holds the hook
+        profiler = None
+        _profile_lock.release()
+    if profiler is None:
+        yield info
+        return
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        try:
+            info['path'] = _write(profiler, label, time.perf_counter() - start)
+        except OSError as e:
+            print(f"⚠️ Could not write profile: {e}")
+
+def profiled(label: Optional[str] = None):
+    """Decorator: profile each call when profiling is on; dict results get a 'profile' path"""
+    def decorate(fn):
+        name = label or fn.__qualname__.replace('.', '-')
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not (_enabled or _session.get()):
+                return fn(*args, **kwargs)
+            with profile(name) as info:
+                result = fn(*args, **kwargs)
+            if isinstance(result, dict) and info['path']:
+                result = dict(result, profile=info['path'])
+            return result
+        return wrapper
+    return decorate
@@ -0,0 +1,383 @@
+"""Headless HTTP/JSON query service over the shared RAG pipeline
+
+    python query_server.py --fake-gemini --port 8080
+    curl -s localhost:8080/query -d '{"question": "What are the hostel fees?"}'
+
+Endpoints:
+    POST /query   {"question": "...", "n_results": 5, "extractive": false, "budget_seconds": 10}
+    POST /batch   {"questions": ["...", "..."], ...same options}
+    POST /stream  same body as /query; newline-delimited JSON events
+    GET  /health  liveness/readiness
+    GET  /metrics server counters, latency percentiles and knowledge base stats
+
+At most max_concurrency queries run at once (in a thread pool, since the
+pipeline blocks). Up to max_queue more wait for a slot; beyond that the
+server answers 503 with Retry-After instead of queueing without bound.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+KB_NAME = "apex_query_server"
+
+MAX_BODY_BYTES = 1024 * 1024
+
+# Query options accepted from clients, with their types
+QUERY_OPTIONS = {'n_results': int, 'extractive': bool, 'use_faq': bool, 'budget_seconds': (int, float)}
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               408: 'Request Timeout', 413: 'Payload Too Large', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+def _json_default(value):
+    """numpy scalars and anything else json can't encode"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+def parse_options(body: Dict) -> Dict:
+    """Whitelisted query options from a request body"""
+    options = {}
+    for key, expected in QUERY_OPTIONS.items():
+        if key in body:
+            value = body[key]
+            if isinstance(value, bool) and expected is not bool:
+                raise HTTPError(400, f"{key} must be a number")
+            if not isinstance(value, expected):
+                raise HTTPError(400, f"{key} has the wrong type")
+            options[key] = value
+    return options
+
+def _question(value) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(400, "question must be a non-empty string")
+    return value.strip()
+
+class QueryServer:
+    """asyncio HTTP/1.1 server; kb is anything with query() and get_stats() (e.g. SharedKnowledgeBase)"""
+
+    def __init__(self, kb, max_concurrency: int = 8, max_queue: int = 64, max_batch: int = 20,
+                 read_timeout: float = 30.0):
+        self.kb = kb
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.read_timeout = read_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="query")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.ready = False
+        self.startup_error = None
+        self.started = time.time()
+        self.stats = {'requests': 0, 'queries': 0, 'errors': 0, 'rejected': 0, 'streams': 0}
+        self._latencies = deque(maxlen=2000)
+        self._queue_waits = deque(maxlen=2000)
+
+    async def warm_up(self, prepare=None):
+        """Build the backend (and run prepare(kb), e.g. indexing) before reporting ready"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, lambda: self.kb.backend)
+            if prepare is not None:
+                await loop.run_in_executor(self._executor, prepare, self.kb)
+        except Exception as e:
+            self.startup_error = str(e)
+            print(f"❌ Knowledge base failed to load: {e}")
+            return
+        self.ready = True
+        print("✅ Knowledge base ready")
+
+    async def run_query(self, question: str, options: Dict) -> Dict:
+        """Run one query in the pool, waiting for a slot (503 if the queue is full)"""
+        if self.waiting >= self.max_queue:
+            self.stats['rejected'] += 1
+            raise HTTPError(503, "server busy, retry shortly", {'Retry-After': '1'})
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self._queue_waits.append(started - queued_at)
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, lambda: self.kb.query(question, **options))
+            self.stats['queries'] += 1
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self._latencies.append(time.perf_counter() - queued_at)
+        return dict(result, server_ms=round((time.perf_counter() - queued_at) * 1000, 1))
+
+    # Endpoints
+
+    async def handle_query(self, body: Dict) -> Dict:
+        return await self.run_query(_question(body.get('question')), parse_options(body))
+
+    async def handle_batch(self, body: Dict) -> Dict:
+        questions = body.get('questions')
+        if not isinstance(questions, list) or not questions:
+            raise HTTPError(400, "questions must be a non-empty list")
+        if len(questions) > self.max_batch:
+            raise HTTPError(413, f"at most {self.max_batch} questions per batch")
+        questions = [_question(q) for q in questions]
+        options = parse_options(body)
+        outcomes = await asyncio.gather(*(self.run_query(q, options) for q in questions), return_exceptions=True)
+        results = []
+        for question, outcome in zip(questions, outcomes):
+            if isinstance(outcome, Exception):
+                status = outcome.status if isinstance(outcome, HTTPError) else 500
+                results.append({'question': question, 'error': str(outcome), 'status': status})
+            else:
+                results.append(dict(outcome, question=question))
+        return {'results': results}
+
+    async def handle_stream(self, body: Dict, writer: asyncio.StreamWriter):
+        """Stream events: accepted, then the answer in sentence pieces, then done
+
+        Hedged generation returns complete answers, so pieces are sent as soon
+        as the query finishes; "accepted" goes out before the query runs so
+        clients see the first byte immediately.
+        """
+        question = _question(body.get('question'))
+        options = parse_options(body)
+        self.stats['streams'] += 1
+        writer.write(self._head(200, {'Content-Type': 'application/x-ndjson',
+                                      'Transfer-Encoding': 'chunked'}))
+
+        async def send(event: Dict):
+            data = _dumps(event) + b'\n'
+            writer.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+            await writer.drain()
+
+        await send({'event': 'accepted', 'queued': self.waiting, 'active': self.active})
+        try:
+            result = await self.run_query(question, options)
+        except HTTPError as e:
+            await send({'event': 'error', 'status': e.status, 'error': str(e)})
+        except Exception as e:
+            await send({'event': 'error', 'status': 500, 'error': str(e)})
+        else:
+            for piece in re.split(r'(?<=[.!?\n])\s+', result.get('answer', '')):
+                if piece:
+                    await send({'event': 'delta', 'text': piece + ' '})
+            await send(dict({key: value for key, value in result.items() if key != 'answer'}, event='done'))
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def handle_health(self) -> Tuple[int, Dict]:
+        if self.ready:
+            return 200, {'status': 'ok', 'uptime_s': round(time.time() - self.started, 1)}
+        if self.startup_error:
+            return 503, {'status': 'failed', 'error': self.startup_error}
+        return 503, {'status': 'starting', 'uptime_s': round(time.time() - self.started, 1)}
+
+    async def handle_metrics(self) -> Dict:
+        def percentiles(samples) -> Dict:
+            ordered = sorted(samples)
+            if not ordered:
+                return {}
+            pick = lambda p: round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+            return {'p50_ms': pick(50), 'p95_ms': pick(95), 'p99_ms': pick(99)}
+
+        metrics = dict(self.stats, active=self.active, waiting=self.waiting,
+                       max_concurrency=self.max_concurrency, max_queue=self.max_queue,
+                       latency=percentiles(self._latencies), queue_wait=percentiles(self._queue_waits))
+        if self.ready:
+            # get_stats takes the index read lock, so keep it off the event loop
+            metrics['knowledge_base'] = await asyncio.get_running_loop().run_in_executor(None, self.kb.get_stats)
+        return metrics
+
+    # HTTP plumbing
+
+    def _head(self, status: int, headers: Dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    def _response(self, status: int, data, extra: Optional[Dict[str, str]] = None, keep_alive: bool = True) -> bytes:
+        body = _dumps(data)
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)),
+                   'Connection': 'keep-alive' if keep_alive else 'close'}
+        headers.update(extra or {})
+        return self._head(status, headers) + body
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict, bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b''
+        headers[':version'] = version
+        return method, target.split('?', 1)[0], headers, body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    writer.write(self._response(e.status, {'error': str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, path, headers, raw = request
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and headers[':version'] != 'HTTP/1.0')
+                self.stats['requests'] += 1
+                try:
+                    if path == '/stream':
+                        if method != 'POST':
+                            raise HTTPError(405, "use POST")
+                        self._require_ready()
+                        await self.handle_stream(self._body(raw), writer)
+                    else:
+                        status, data = await self._dispatch(method, path, raw)
+                        writer.write(self._response(status, data, keep_alive=keep_alive))
+                except HTTPError as e:
+                    writer.write(self._response(e.status, {'error': str(e)}, e.headers, keep_alive))
+                except Exception as e:
+                    writer.write(self._response(500, {'error': str(e)}, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _body(self, raw: bytes) -> Dict:
+        try:
+            body = json.loads(raw or b'{}')
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        return body
+
+    def _require_ready(self):
+        if self.startup_error:
+            raise HTTPError(503, f"knowledge base failed to load: {self.startup_error}")
+        if not self.ready:
+            raise HTTPError(503, "knowledge base is still loading", {'Retry-After': '5'})
+
+    async def _dispatch(self, method: str, path: str, raw: bytes) -> Tuple[int, Dict]:
+        if path == '/health':
+            return self.handle_health()
+        if path == '/metrics':
+            return 200, await self.handle_metrics()
+        handlers = {'/query': self.handle_query, '/batch': self.handle_batch}
+        if path not in handlers:
+            raise HTTPError(404, f"no endpoint {path}")
+        if method != 'POST':
+            raise HTTPError(405, "use POST")
+        self._require_ready()
+        return 200, await handlers[path](self._body(raw))
+
+    async def serve(self, host: str, port: int, prepare=None):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_BODY_BYTES)
+        print(f"🌐 Query server listening on http://{host}:{port} "
+              f"(concurrency {self.max_concurrency}, queue {self.max_queue})")
+        asyncio.get_running_loop().create_task(self.warm_up(prepare))
+        async with server:
+            await server.serve_forever()
+
+def build_pipeline(api_key: str, collection_name: str):
+    """Factory for the shared knowledge base (imported late so --fake-gemini can install first)"""
+    from rag_pipeline import GoogleAIRAGPipeline
+    return GoogleAIRAGPipeline(api_key, collection_name=collection_name,
+                               chunk_mode=os.getenv("APEX_CHUNK_MODE", "fixed"),
+                               n_sections=int(os.getenv("APEX_COARSE_SECTIONS", "0")))
+
+def index_if_empty(data_file: str, fallback_documents: Optional[List[Dict]] = None):
+    """prepare() hook: index the data file (or the fallback documents) into an empty collection"""
+    def prepare(kb):
+        from rag_pipeline import iter_scraped_data, load_scraped_data
+        from corpus_io import is_jsonl
+        if kb.backend.collection.count() > 0:
+            return
+        if os.path.exists(data_file):
+            documents = iter_scraped_data(data_file) if is_jsonl(data_file) else load_scraped_data(data_file)
+        else:
+            documents = fallback_documents
+        if documents:
+            kb.rebuild(lambda backend: backend.process_documents(documents))
+    return prepare
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON query server for the APEX RAG pipeline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Queries run at once")
+    parser.add_argument("--max-queue", type=int, default=64, help="Queries waiting before 503s")
+    parser.add_argument("--max-batch", type=int, default=20)
+    parser.add_argument("--data", default=os.getenv("APEX_DATA_FILE", "apex_college_data.json"),
+                        help="Indexed on startup if the collection is empty")
+    parser.add_argument("--fake-gemini", action="store_true", help="Use the offline fake_gemini stand-in")
+    parser.add_argument("--fake-generate-ms", type=float, default=800.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fallback_documents = None
+    collection_name = "apex_knowledge_base"
+    if args.fake_gemini:
+        import fake_gemini
+        fake_gemini.install(generate_ms=args.fake_generate_ms, error_rate=args.fake_error_rate)
+        fallback_documents = fake_gemini.DEMO_DOCUMENTS
+        collection_name = "apex_fake_kb"  # fake embeddings must not mix with real ones
+        api_key = "fake"
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.getenv("GOOGLE_AI_API_KEY")
+        if not api_key:
+            parser.error("set GOOGLE_AI_API_KEY or use --fake-gemini")
+
+    # Lazy, so the server listens (and /health says "starting") while warm_up builds it
+    from kb_service import get_shared_knowledge_base
+    kb = get_shared_knowledge_base(KB_NAME, lambda: build_pipeline(api_key, collection_name), lazy=True)
+    server = QueryServer(kb, args.max_concurrency, args.max_queue, args.max_batch)
+    try:
+        asyncio.run(server.serve(args.host, args.port, index_if_empty(args.data, fallback_documents)))
+    except KeyboardInterrupt:
+        print("👋 Query server stopped")
+
+if __name__ == "__main__":
+    main()
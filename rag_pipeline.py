@@ -1,18 +1,52 @@
 import json
 import os
-from typing import List, Dict, Tuple
+import re
+import zlib
+import hashlib
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional
 import google.generativeai as genai
 import chromadb
 import numpy as np
 import pandas as pd
+from corpus_io import is_jsonl, iter_records
+from kb_service import CollectionVersions, validate_collection
+from faq_store import CURATED_QUESTIONS, FAQStore, TEST_QUERIES
+from extractive import extractive_answer
+from generation import CircuitOpen, GenerationTimeout, HedgedGenerator
+import profiling
+import rate_limiter
+from retrieval import (SectionCentroidIndex, adaptive_params, candidate_count, collection_space,
+                       distance_to_similarity, estimate_tokens, hnsw_metadata, index_params, select_adaptive)
 
 class GoogleAIRAGPipeline:
     """RAG Pipeline using Google AI for both embeddings and generation"""
     
-    def __init__(self, api_key: str, collection_name: str = "apex_knowledge_base"):
-        """Initialize RAG pipeline with Google AI"""
+    def __init__(self, api_key: str, collection_name: str = "apex_knowledge_base",
+                 chunk_mode: str = "fixed", index_config: Optional[Dict] = None, n_sections: int = 0,
+                 adaptive_config: Optional[Dict] = None, generation_config: Optional[Dict] = None):
+        """Initialize RAG pipeline with Google AI
+
+        chunk_mode is "fixed" (1000-char windows over the whole page),
+        "sections" (one chunk per scraped section, tagged with its heading path)
+        or "cdc" (content-defined boundaries that survive edits elsewhere in the page).
+        index_config overrides the HNSW settings (space, M, ef_construction,
+        ef_search) used for new index versions; see retrieval.DEFAULT_INDEX_PARAMS.
+        n_sections > 0 enables two-level retrieval: queries first pick the
+        n_sections documents with the closest centroid embedding, then search
+        only their chunks. adaptive_config tunes adaptive k (see
+        retrieval.DEFAULT_ADAPTIVE_PARAMS; {'enabled': False} sends n_results).
+        generation_config sets the per-query latency budget and the
+        hedge/fallback schedule (see generation.DEFAULT_GENERATION_PARAMS).
+        """
+        if chunk_mode not in ("fixed", "sections", "cdc"):
+            raise ValueError(f"Unknown chunk_mode: {chunk_mode}")
+        self.index_params = index_params(index_config)
+        self.n_sections = n_sections
+        self.adaptive = adaptive_params(adaptive_config)
+        self._coarse_index = None
         self.api_key = api_key
         self.collection_name = collection_name
+        self.chunk_mode = chunk_mode
         
         # Configure Google AI
         genai.configure(api_key=api_key)
@@ -29,64 +63,103 @@ class GoogleAIRAGPipeline:
         # Initialize embedding model
         self.embedding_model = "models/text-embedding-004"
         
-        # Initialize generation model
-        self.generation_model = genai.GenerativeModel("gemini-1.5-flash")
+        # Initialize generation model - hedged, falling back to the smaller flash-8b near the deadline
+        self.generator = HedgedGenerator("gemini-1.5-flash", temperature=0.3, max_output_tokens=1024,
+                                         params={'fallback_model': "gemini-1.5-flash-8b", **(generation_config or {})})
+        self.generation_model = self.generator.model
         
-        # Create or get collection
+        # Create or get collection - collection_name is an alias for the live version
         try:
-            self.collection = self.chroma_client.get_or_create_collection(
-                name=collection_name
-            )
-            print(f"✅ Collection '{collection_name}' ready!")
+            self.versions = CollectionVersions(self.chroma_client, collection_name)
+            self.collection = self.versions.get_active_collection()
+            if self.collection is None:
+                name, self.collection = self.versions.create(hnsw_metadata(self.index_params))
+                self.versions.activate(name, count=0)
+            print(f"✅ Collection '{collection_name}' ready ({self.collection.name})!")
         except Exception as e:
             print(f"❌ Error with collection: {e}")
             raise
+        
+        # Precomputed answers for curated questions, checked before the RAG path
+        self.faq = FAQStore(os.path.join("./chroma_db", f"faq_{collection_name}.json"))
+        self.faq.set_live_hashes(chunk_hash(doc) for doc in self.collection.get(include=['documents'])['documents'])
     
     def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
         """Split text into overlapping chunks for better retrieval"""
-        if len(text) <= chunk_size:
-            return [text]
+        return fixed_size_chunks(text, chunk_size, overlap)
+    
+    def chunk_by_sections(self, doc: Dict, chunk_size: int = 1000) -> List[Dict]:
+        """Chunk a scraped page along its sections, carrying heading paths
+
+        Consecutive small sections are packed together up to chunk_size and
+        only sections larger than chunk_size are split further.
+        """
+        title = doc.get('title', 'Untitled')
+        content = doc.get('content', '')
+        sections = [section for section in doc.get('sections') or [] if section.get('content')]
+        
+        # Text before the first heading isn't part of any section
+        units = []
+        start = content.find(sections[0]['content'][:80]) if sections else -1
+        if start > 0 and content[:start].strip():
+            units.append(('', content[:start].strip()))
+        units.extend((section.get('heading', ''), section['content']) for section in sections)
+        
+        # Pages whose sections don't cover the content (e.g. hand-written data) chunk as before
+        if sum(len(text) for _, text in units) < 0.8 * len(content):
+            return [{'text': chunk, 'heading': '', 'heading_path': title}
+                    for chunk in self.chunk_text(f"Title: {title}\n\nContent: {content}", chunk_size)]
         
         chunks = []
-        start = 0
+        pending = []  # (heading, text) of small sections waiting to be packed
         
-        while start < len(text):
-            # Find end position
-            end = start + chunk_size
-            
-            if end >= len(text):
-                chunks.append(text[start:])
-                break
-            
-            # Try to break at sentence boundary
-            chunk = text[start:end]
-            
-            # Look for sentence endings
-            sentence_endings = ['. ', '! ', '? ', '.\n', '!\n', '?\n']
-            best_break = -1
-            
-            for ending in sentence_endings:
-                pos = chunk.rfind(ending)
-                if pos > len(chunk) * 0.7:  # Don't break too early
-                    best_break = max(best_break, pos + len(ending))
+        def render(sections: List[tuple]) -> Dict:
+            # Repeated headings (e.g. one per table row) appear once in the path
+            headings = list(dict.fromkeys(heading for heading, _ in sections if heading))
+            path = f"{title} > {' | '.join(headings)}" if headings else title
+            # The first section's heading is already in the path
+            body = [sections[0][1]] + [f"{heading}: {text}" if heading else text for heading, text in sections[1:]]
+            return {
+                'text': f"{path}\n\n" + "\n\n".join(body),
+                'heading': headings[0] if headings else '',
+                'heading_path': path
+            }
+        
+        def flush():
+            if pending:
+                chunks.append(render(pending))
+                pending.clear()
+        
+        for heading, text in units:
+            path = f"{title} > {heading}" if heading else title
             
-            if best_break > 0:
-                chunks.append(text[start:start + best_break].strip())
-                start = start + best_break - overlap
-            else:
-                # Fallback to word boundary
-                space_pos = chunk.rfind(' ')
-                if space_pos > len(chunk) * 0.8:
-                    chunks.append(text[start:start + space_pos].strip())
-                    start = start + space_pos - overlap
-                else:
-                    chunks.append(chunk)
-                    start = end - overlap
+            if len(path) + len(text) + 2 > chunk_size:
+                # Oversized section: split it on its own, repeating the heading path
+                flush()
+                for piece in self.chunk_text(text, chunk_size - len(path) - 2):
+                    chunks.append({'text': f"{path}\n\n{piece}", 'heading': heading, 'heading_path': path})
+                continue
             
-            # Ensure we don't go backwards
-            start = max(start, len(chunks[-1]) if chunks else 0)
+            # Measure the chunk as it would be written, heading path included
+            if pending and len(render(pending + [(heading, text)])['text']) > chunk_size:
+                flush()
+            pending.append((heading, text))
         
-        return [chunk for chunk in chunks if chunk.strip()]
+        flush()
+        return chunks
+    
+    def chunk_document(self, doc: Dict) -> List[Dict]:
+        """Split a document into chunks with heading metadata, per self.chunk_mode"""
+        if self.chunk_mode == "sections":
+            return self.chunk_by_sections(doc)
+        
+        title = doc.get('title', 'Untitled')
+        full_content = f"Title: {title}\n\nContent: {doc.get('content', '')}"
+        if self.chunk_mode == "cdc":
+            chunks = content_defined_chunks(full_content)
+        else:
+            chunks = self.chunk_text(full_content)
+        return [{'text': chunk, 'heading': '', 'heading_path': title} for chunk in chunks]
     
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using Google AI embedding model"""
@@ -101,6 +174,7 @@ class GoogleAIRAGPipeline:
                 print(f"🔄 Processing embedding batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1}")
                 
                 # Call Google AI embedding API
+                rate_limiter.acquire('embed', sum(estimate_tokens(text) for text in batch))
                 response = genai.embed_content(
                     model=self.embedding_model,
                     content=batch,
@@ -110,7 +184,8 @@ class GoogleAIRAGPipeline:
                 # Handle single text vs batch response
                 if isinstance(response['embedding'], list):
                     # Batch response
-                    batch_embeddings = [emb['embedding'] for emb in response['embedding']]
+                    batch_embeddings = [emb['embedding'] if isinstance(emb, dict) else emb
+                                        for emb in response['embedding']]
                 else:
                     # Single response
                     batch_embeddings = [response['embedding']['embedding']]
@@ -124,88 +199,189 @@ class GoogleAIRAGPipeline:
             print(f"❌ Error generating embeddings: {e}")
             # Fallback: create dummy embeddings for testing
             print("🔄 Using dummy embeddings for testing...")
+            self.embedding_failed = True
             return [[0.1] * 768 for _ in texts]
     
-    def process_documents(self, documents: List[Dict]):
-        """Process and index documents into ChromaDB"""
-        print(f"🔄 Processing {len(documents)} documents...")
-        
-        # Clear existing data
-        try:
-            existing_count = self.collection.count()
-            if existing_count > 0:
-                print(f"🗑️ Clearing {existing_count} existing documents...")
-                # Get all IDs and delete them
-                all_data = self.collection.get()
-                if all_data['ids']:
-                    self.collection.delete(ids=all_data['ids'])
-        except Exception as e:
-            print(f"⚠️ Warning clearing collection: {e}")
+    @profiling.profiled()
+    @rate_limiter.background
+    def process_documents(self, documents: Iterable[Dict]) -> Dict:
+        """Process and index documents into ChromaDB
+
+        documents may be a list or a lazy iterator such as iter_scraped_data().
+        Each run builds a new collection version while queries keep using the
+        live one; it is validated (chunk count, no placeholder embeddings and
+        a smoke query) before the alias is switched over, and discarded with a
+        ValueError if it fails. Chunk IDs are content hashes, so only chunks
+        whose text changed are embedded - the rest copy their stored
+        embeddings from the live version. Returns embedded/reused counts.
+        """
+        if isinstance(documents, list):
+            print(f"🔄 Processing {len(documents)} documents...")
+        else:
+            print("🔄 Processing streamed documents...")
         
         all_chunks = []
         all_metadata = []
         all_ids = []
+        seen_ids = set()
         
         for doc_id, doc in enumerate(documents):
             title = doc.get('title', 'Untitled')
-            content = doc.get('content', '')
             url = doc.get('url', '')
-            
-            # Create comprehensive content for chunking
-            full_content = f"Title: {title}\n\nContent: {content}"
+            doc_key = hashlib.sha1((url or title).encode('utf-8')).hexdigest()[:12]
             
             # Chunk the document
-            chunks = self.chunk_text(full_content)
+            chunks = self.chunk_document(doc)
             
-            for chunk_id, chunk in enumerate(chunks):
+            for chunk_id, piece in enumerate(chunks):
+                chunk = piece['text']
+                content_hash = chunk_hash(chunk)
+                chunk_key = f"{doc_key}_{content_hash}"
+                if chunk_key in seen_ids:
+                    continue
+                seen_ids.add(chunk_key)
+                
                 chunk_metadata = {
                     'doc_id': str(doc_id),
+                    'group': doc_key,
                     'chunk_id': str(chunk_id),
                     'title': title,
                     'url': url,
+                    'heading': piece['heading'],
+                    'heading_path': piece['heading_path'],
+                    'chunk_hash': content_hash,
                     'word_count': str(len(chunk.split())),
                     'source': 'apex_website'
                 }
                 
                 all_chunks.append(chunk)
                 all_metadata.append(chunk_metadata)
-                all_ids.append(f"doc_{doc_id}_chunk_{chunk_id}")
+                all_ids.append(chunk_key)
+        
+        print(f"📝 Created {len(all_chunks)} chunks from {len(set(m['doc_id'] for m in all_metadata))} documents "
+              f"({self.chunk_mode} chunking)")
         
-        print(f"📝 Created {len(all_chunks)} chunks from documents")
+        # Find chunks that are already embedded (skipping dummy fallback vectors)
+        live = self.collection
+        existing_ids = set()
+        try:
+            existing = live.get(include=['metadatas'])
+            existing_ids = {chunk_id for chunk_id, metadata in zip(existing['ids'], existing['metadatas'])
+                            if not (metadata or {}).get('dummy_embedding')}
+            stale_count = sum(1 for chunk_id in existing['ids'] if chunk_id not in seen_ids)
+        except Exception as e:
+            print(f"⚠️ Warning reading existing collection: {e}")
+            stale_count = 0
+        
+        new_rows = [i for i, chunk_id in enumerate(all_ids) if chunk_id not in existing_ids]
+        reused_rows = [i for i, chunk_id in enumerate(all_ids) if chunk_id in existing_ids]
+        
+        version_name, target = self.versions.create(hnsw_metadata(self.index_params))
+        print(f"🆕 Building index version {version_name} (live: {live.name})")
+        
+        # Reused chunks keep their embeddings; copy them into the new version
+        batch_size = 50  # Add in smaller batches
+        probe_embedding = None
+        coarse_index = SectionCentroidIndex('group')
+        for i in range(0, len(reused_rows), batch_size):
+            rows = reused_rows[i:i + batch_size]
+            try:
+                stored = live.get(ids=[all_ids[r] for r in rows], include=['embeddings'])
+                stored_embeddings = dict(zip(stored['ids'], stored['embeddings']))
+                embeddings = [list(stored_embeddings[all_ids[r]]) for r in rows]
+                target.add(
+                    documents=[all_chunks[r] for r in rows],
+                    embeddings=embeddings,
+                    metadatas=[all_metadata[r] for r in rows],
+                    ids=[all_ids[r] for r in rows]
+                )
+                for r, embedding in zip(rows, embeddings):
+                    coarse_index.add(all_metadata[r]['group'], embedding)
+                if probe_embedding is None:
+                    probe_embedding = embeddings[0]
+            except Exception as e:
+                print(f"❌ Error copying stored embeddings: {e}")
         
         # Generate embeddings
-        print("🔄 Generating embeddings...")
-        embeddings = self.generate_embeddings(all_chunks)
+        print(f"🔄 Generating embeddings for {len(new_rows)} new or changed chunks...")
+        self.embedding_failed = False
+        embeddings = self.generate_embeddings([all_chunks[r] for r in new_rows]) if new_rows else []
+        if self.embedding_failed:
+            for r in new_rows:
+                all_metadata[r]['dummy_embedding'] = 'true'
+        if probe_embedding is None and embeddings:
+            probe_embedding = embeddings[0]
         
         # Add to ChromaDB in smaller batches
         print("💾 Adding to vector database...")
-        batch_size = 50  # Add in smaller batches
         
-        for i in range(0, len(all_chunks), batch_size):
-            end_idx = min(i + batch_size, len(all_chunks))
-            batch_chunks = all_chunks[i:end_idx]
-            batch_embeddings = embeddings[i:end_idx]
-            batch_metadata = all_metadata[i:end_idx]
-            batch_ids = all_ids[i:end_idx]
+        for i in range(0, len(new_rows), batch_size):
+            rows = new_rows[i:i + batch_size]
             
             try:
-                self.collection.add(
-                    documents=batch_chunks,
-                    embeddings=batch_embeddings,
-                    metadatas=batch_metadata,
-                    ids=batch_ids
+                target.add(
+                    documents=[all_chunks[r] for r in rows],
+                    embeddings=embeddings[i:i + batch_size],
+                    metadatas=[all_metadata[r] for r in rows],
+                    ids=[all_ids[r] for r in rows]
                 )
-                print(f"✅ Added batch {i//batch_size + 1}/{(len(all_chunks)-1)//batch_size + 1}")
+                for r, embedding in zip(rows, embeddings[i:i + batch_size]):
+                    coarse_index.add(all_metadata[r]['group'], embedding)
+                print(f"✅ Added batch {i//batch_size + 1}/{(len(new_rows)-1)//batch_size + 1}")
             except Exception as e:
                 print(f"❌ Error adding batch: {e}")
         
-        final_count = self.collection.count()
-        print(f"✅ Successfully indexed {final_count} chunks!")
+        stats = {
+            'chunks': len(all_ids),
+            'embedded': len(new_rows),
+            'reused': len(reused_rows),
+            'deleted': stale_count,
+            'version': live.name,
+        }
+        self.last_index_stats = stats
+        
+        # Only switch the alias once the new version is complete
+        try:
+            validate_collection(target, len(all_ids), probe_embedding,
+                                placeholder_embeddings=len(new_rows) if self.embedding_failed else 0)
+        except ValueError as e:
+            print(f"❌ Index version {version_name} failed validation ({e}); still serving {live.name}")
+            self.versions.discard(version_name)
+            raise
+        
+        self.versions.activate(version_name, count=len(all_ids), chunk_mode=self.chunk_mode,
+                               index_params=self.index_params)
+        self.collection = target
+        self._coarse_index = coarse_index.finalize()
+        self.faq.set_live_hashes(chunk_hash(chunk) for chunk in all_chunks)
+        stats['version'] = version_name
+        for name in self.versions.collect_garbage():
+            print(f"🗑️ Removed old index version {name}")
+        
+        print(f"♻️ Reused {stats['reused']} embeddings, embedded {stats['embedded']} chunks "
+              f"({stats['reused']} embed calls saved)")
+        print(f"✅ Successfully indexed {target.count()} chunks in {version_name}!")
+        return stats
     
-    def retrieve_relevant_chunks(self, query: str, n_results: int = 5) -> List[Dict]:
-        """Retrieve relevant chunks for a query"""
+    def coarse_index(self) -> SectionCentroidIndex:
+        """Per-document centroid index of the live version, built on first use"""
+        collection = self.collection
+        if self._coarse_index is None:
+            self._coarse_index = SectionCentroidIndex.from_collection(collection, 'group')
+        return self._coarse_index
+    
+    def retrieve_relevant_chunks(self, query: str, n_results: int = 5, heading: Optional[str] = None,
+                                 heading_boost: float = 0.0, n_sections: Optional[int] = None) -> List[Dict]:
+        """Retrieve relevant chunks for a query
+
+        heading restricts the search to chunks under that section heading.
+        heading_boost adds up to that much similarity to chunks whose heading
+        path shares words with the query (needs "sections" chunking).
+        n_sections overrides the instance setting for two-level retrieval.
+        """
         try:
             # Generate query embedding
+            rate_limiter.acquire('embed', estimate_tokens(query))
             query_response = genai.embed_content(
                 model=self.embedding_model,
                 content=query,
@@ -221,23 +397,40 @@ class GoogleAIRAGPipeline:
             else:
                 raise ValueError("No embedding in response")
             
-            # Search in ChromaDB
-            results = self.collection.query(
+            # Search in ChromaDB - pin the live version in case a rebuild swaps it
+            collection = self.collection
+            where = {'heading': heading} if heading else None
+            n_sections = self.n_sections if n_sections is None else n_sections
+            if n_sections and where is None:
+                # Two-level: only search chunks of the closest documents
+                where = self.coarse_index().where_filter(query_embedding, n_sections)
+            results = collection.query(
                 query_embeddings=[query_embedding],
-                n_results=min(n_results, self.collection.count()),
+                n_results=min(n_results, collection.count()),
+                where=where,
                 include=['documents', 'metadatas', 'distances']
             )
             
             # Format results
+            space = collection_space(collection)
             relevant_chunks = []
             if results['documents'] and results['documents'][0]:
                 for i, doc in enumerate(results['documents'][0]):
                     relevant_chunks.append({
                         'content': doc,
                         'metadata': results['metadatas'][0][i],
-                        'similarity_score': 1 - results['distances'][0][i],  # Convert distance to similarity
+                        'similarity_score': distance_to_similarity(results['distances'][0][i], space),
                     })
             
+            if heading_boost:
+                query_words = set(re.findall(r'\w+', query.lower()))
+                for chunk in relevant_chunks:
+                    heading_words = set(re.findall(r'\w+', chunk['metadata'].get('heading', '').lower()))
+                    if heading_words:
+                        overlap = len(query_words & heading_words) / len(heading_words)
+                        chunk['similarity_score'] += heading_boost * overlap
+                relevant_chunks.sort(key=lambda chunk: chunk['similarity_score'], reverse=True)
+            
             return relevant_chunks
             
         except Exception as e:
@@ -277,42 +470,81 @@ ANSWER:"""
         
         return prompt
     
-    def generate_answer(self, prompt: str) -> str:
-        """Generate answer using Gemini model"""
+    def generate_answer(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """Generate answer using Gemini model within the latency budget"""
+        return self._generate(prompt, deadline)['answer']
+    
+    def _generate(self, prompt: str, deadline: Optional[float] = None) -> Dict:
+        """Hedged generation; returns the answer and which path produced it"""
+        if deadline is None:
+            deadline = self.generator.deadline()
         try:
-            response = self.generation_model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,
-                    top_p=0.9,
-                    max_output_tokens=1024,
-                )
-            )
-            
-            return response.text.strip()
-            
+            result = self.generator.generate(prompt, deadline)
+            return {'answer': result['text'], 'generation_path': result['path'],
+                    'generation_seconds': round(result['latency'], 3)}
+        except CircuitOpen as e:
+            print(f"🔌 {e}")
+            return {'answer': "I apologize, but I'm having trouble generating a response right now. Please try again shortly or contact APEX College directly at +91-7351408009 for immediate assistance.",
+                    'generation_path': 'circuit_open'}
+        except GenerationTimeout as e:
+            print(f"⏱️ Generation missed its deadline: {e}")
+            return {'answer': "I'm sorry, this is taking longer than expected. Please try again or contact APEX College directly at +91-7351408009 for immediate assistance.",
+                    'generation_path': 'timeout'}
         except Exception as e:
+            # Includes GenerationFailed: every attempt errored before the deadline
             print(f"❌ Error generating answer: {e}")
-            return f"I apologize, but I'm having trouble generating a response right now. Please try again or contact APEX College directly at +91-7351408009 for immediate assistance."
+            return {'answer': f"I apologize, but I'm having trouble generating a response right now. Please try again or contact APEX College directly at +91-7351408009 for immediate assistance.",
+                    'generation_path': 'error'}
     
-    def query(self, user_question: str, n_results: int = 5) -> Dict:
-        """Main query function - retrieve relevant content and generate answer"""
+    def _extractive(self, question: str, chunks: List[Dict], reason: str) -> Dict:
+        """Local sentence-ranking answer used when Gemini is skipped or unavailable"""
+        result = extractive_answer(question, chunks, source_field='title')
+        return {'answer': result['answer'], 'generation_path': 'extractive',
+                'generation_seconds': round(result['seconds'], 4), 'fallback_reason': reason}
+    
+    @profiling.profiled()
+    def query(self, user_question: str, n_results: int = 5, heading: Optional[str] = None,
+              heading_boost: float = 0.0, use_faq: bool = True, budget_seconds: Optional[float] = None,
+              extractive: bool = False) -> Dict:
+        """Main query function - retrieve relevant content and generate answer
+
+        Curated questions with a fresh precomputed answer are served from the
+        FAQ store without any API calls (result 'path' is "faq", else "rag").
+        budget_seconds bounds the whole query (default from generation_config);
+        'generation_path' records whether the primary, hedge or fallback
+        request answered. extractive=True skips Gemini and quotes the best
+        retrieved sentences instead; the same extractive answer replaces a
+        timeout, error or open circuit ('fallback_reason' says which).
+        """
+        deadline = self.generator.deadline(budget_seconds)
+        if use_faq and heading is None:
+            cached = self.faq.lookup(user_question)
+            if cached:
+                return cached
         
-        # Retrieve relevant chunks
-        relevant_chunks = self.retrieve_relevant_chunks(user_question, n_results)
+        # Retrieve a wider candidate set, then keep only the strong matches
+        candidates = self.retrieve_relevant_chunks(user_question, candidate_count(self.adaptive, n_results),
+                                                   heading, heading_boost)
+        relevant_chunks = select_adaptive(candidates, self.adaptive, n_results)
         
         if not relevant_chunks:
             return {
                 'answer': "I don't have specific information about that topic in my knowledge base. Please contact APEX College at +91-7351408009 or admissions@apex.ac.in for detailed information.",
                 'sources': [],
-                'confidence': 0.0
+                'confidence': 0.0,
+                'path': 'rag'
             }
         
         # Generate context-aware prompt
         prompt = self.generate_context_prompt(user_question, relevant_chunks)
         
-        # Generate answer
-        answer = self.generate_answer(prompt)
+        # Generate answer with whatever is left of the budget
+        if extractive:
+            generated = self._extractive(user_question, relevant_chunks, 'requested')
+        else:
+            generated = self._generate(prompt, deadline)
+            if generated['generation_path'] in ('timeout', 'error', 'circuit_open'):
+                generated = self._extractive(user_question, relevant_chunks, generated['generation_path'])
         
         # Extract source information
         sources = []
@@ -328,12 +560,29 @@ ANSWER:"""
         avg_confidence = np.mean([chunk['similarity_score'] for chunk in relevant_chunks]) if relevant_chunks else 0.0
         
         return {
-            'answer': answer,
+            'answer': generated['answer'],
             'sources': sources[:3],  # Limit to top 3 sources
             'confidence': float(avg_confidence),
-            'retrieved_chunks': len(relevant_chunks)
+            'retrieved_chunks': len(relevant_chunks),
+            'candidates': len(candidates),
+            'context_tokens': sum(estimate_tokens(chunk['content']) for chunk in relevant_chunks),
+            'prompt_tokens': estimate_tokens(prompt),
+            'chunk_hashes': [chunk_hash(chunk['content']) for chunk in relevant_chunks],
+            'path': 'rag',
+            'generation_path': generated['generation_path'],
+            'generation_seconds': generated.get('generation_seconds'),
+            'fallback_reason': generated.get('fallback_reason')
         }
     
+    @profiling.profiled()
+    @rate_limiter.background
+    def refresh_faq(self, questions: Optional[List[str]] = None) -> Dict:
+        """Precompute answers for curated questions against the live index
+
+        Entries whose source chunks are unchanged are kept as they are.
+        """
+        return self.faq.refresh(questions or CURATED_QUESTIONS, lambda q: self.query(q, use_faq=False))
+    
     def get_collection_stats(self) -> Dict:
         """Get statistics about the knowledge base"""
         try:
@@ -341,17 +590,121 @@ ANSWER:"""
             return {
                 'total_chunks': count,
                 'collection_name': self.collection_name,
+                'active_version': self.collection.name,
+                'distance_space': collection_space(self.collection),
+                'faq': self.faq.get_stats(),
+                'generation': self.generator.get_stats(),
+                'rate_limits': rate_limiter.get_stats(),
                 'embedding_model': self.embedding_model,
                 'status': 'ready'
             }
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
 
+def fixed_size_chunks(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """Split text into overlapping chunks for better retrieval"""
+    if len(text) <= chunk_size:
+        return [text]
+    
+    chunks = []
+    start = 0
+    
+    while start < len(text):
+        # Find end position
+        end = start + chunk_size
+        
+        if end >= len(text):
+            chunks.append(text[start:])
+            break
+        
+        # Try to break at sentence boundary
+        chunk = text[start:end]
+        
+        # Look for sentence endings
+        sentence_endings = ['. ', '! ', '? ', '.\n', '!\n', '?\n']
+        best_break = -1
+        
+        for ending in sentence_endings:
+            pos = chunk.rfind(ending)
+            if pos > len(chunk) * 0.7:  # Don't break too early
+                best_break = max(best_break, pos + len(ending))
+        
+        if best_break > 0:
+            chunks.append(text[start:start + best_break].strip())
+            start = start + best_break - overlap
+        else:
+            # Fallback to word boundary
+            space_pos = chunk.rfind(' ')
+            if space_pos > len(chunk) * 0.8:
+                chunks.append(text[start:start + space_pos].strip())
+                start = start + space_pos - overlap
+            else:
+                chunks.append(chunk)
+                start = end - overlap
+        
+        # Ensure we don't go backwards
+        start = max(start, len(chunks[-1]) if chunks else 0)
+    
+    return [chunk for chunk in chunks if chunk.strip()]
+
+def split_sentences(text: str) -> List[str]:
+    """Split text after sentence-ending punctuation"""
+    return [sentence for sentence in re.split(r'(?<=[.!?])\s+', text) if sentence.strip()]
+
+def content_defined_chunks(text: str, min_size: int = 300, max_size: int = 1000,
+                           window: int = 2, divisor: int = 4) -> List[str]:
+    """Chunk text at boundaries chosen by the content itself
+
+    A rolling hash over the last `window` sentences decides where chunks end:
+    once a chunk has min_size characters, it ends after any sentence whose
+    window hash is divisible by `divisor` (or when it would pass max_size).
+    Boundaries depend only on nearby sentences, so inserting a sentence near
+    the top of a page changes one or two chunks instead of shifting them all.
+    """
+    chunks = []
+    current = []
+    current_size = 0
+    recent = []
+    
+    for sentence in split_sentences(text):
+        if current and current_size + len(sentence) + 1 > max_size:
+            chunks.append(' '.join(current))
+            current, current_size = [], 0
+        
+        if len(sentence) > max_size:
+            # A single huge "sentence" (lists, tables) is cut into fixed pieces
+            chunks.extend(fixed_size_chunks(sentence, max_size, 0))
+            recent = [sentence]
+            continue
+        
+        current.append(sentence)
+        current_size += len(sentence) + 1
+        recent = (recent + [sentence])[-window:]
+        
+        if current_size >= min_size and zlib.crc32(' '.join(recent).encode('utf-8')) % divisor == 0:
+            chunks.append(' '.join(current))
+            current, current_size = [], 0
+    
+    if current:
+        chunks.append(' '.join(current))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+def chunk_hash(text: str) -> str:
+    """Stable content hash used in chunk IDs"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def iter_scraped_data(file_path: str = "apex_college_data.jsonl") -> Iterator[Dict]:
+    """Lazily yield scraped documents from a JSON Lines file (.jsonl, .jsonl.gz, .jsonl.zst)"""
+    return iter_records(file_path)
+
 def load_scraped_data(file_path: str = "apex_college_data.json") -> List[Dict]:
-    """Load scraped college data from JSON file"""
+    """Load scraped college data from a JSON or JSON Lines file"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if is_jsonl(file_path):
+            data = list(iter_records(file_path))
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         print(f"✅ Loaded {len(data)} documents from {file_path}")
         return data
     except FileNotFoundError:
@@ -371,27 +724,33 @@ if __name__ == "__main__":
     else:
         # Initialize RAG pipeline
         try:
-            rag = GoogleAIRAGPipeline(API_KEY)
+            rag = GoogleAIRAGPipeline(API_KEY, chunk_mode=os.getenv("APEX_CHUNK_MODE", "fixed"),
+                                      index_config={'space': os.getenv("APEX_HNSW_SPACE", "cosine")},
+                                      n_sections=int(os.getenv("APEX_COARSE_SECTIONS", "0")))
             
-            # Load and process documents
-            documents = load_scraped_data()
+            # Load and process documents - JSON Lines output is streamed lazily
+            data_file = os.getenv("APEX_DATA_FILE", "apex_college_data.json")
+            if is_jsonl(data_file) and os.path.exists(data_file):
+                documents = iter_scraped_data(data_file)
+            else:
+                documents = load_scraped_data(data_file)
             if documents:
                 rag.process_documents(documents)
                 
-                # Test queries
-                test_queries = [
-                    "What B.Tech programs does APEX offer?",
-                    "How can I apply for admission to APEX?",
-                    "What are the placement opportunities?",
-                ]
+                # Precompute answers for the curated questions
+                faq_result = rag.refresh_faq()
+                print(f"💡 FAQ store: {faq_result['computed']} answers computed, {faq_result['kept']} still fresh")
                 
                 print("\n🧪 Testing RAG Pipeline:")
-                for query in test_queries:
+                for query in TEST_QUERIES:
                     print(f"\n❓ Query: {query}")
                     result = rag.query(query)
                     print(f"📝 Answer: {result['answer'][:200]}...")
                     print(f"🎯 Confidence: {result['confidence']:.3f}")
                     print(f"📚 Sources: {len(result['sources'])}")
+                    if 'prompt_tokens' in result:
+                        print(f"🧮 Sent {result['retrieved_chunks']}/{result['candidates']} chunks, "
+                              f"~{result['prompt_tokens']} prompt tokens")
             else:
                 print("❌ No documents to process!")
         except Exception as e:
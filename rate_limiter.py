@@ -0,0 +1,196 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Highest priority first: live user questions go ahead of index builds
+PRIORITIES = ('interactive', 'background')
+
+# Per-minute budgets for each API family sharing the key; set them to the
+# key's quota (env vars override the defaults, 0 = unlimited)
+DEFAULT_LIMITS = {
+    'embed': {
+        'rpm': int(os.getenv('APEX_EMBED_RPM', '1500')),
+        'tpm': int(os.getenv('APEX_EMBED_TPM', '0')),
+    },
+    'generate': {
+        'rpm': int(os.getenv('APEX_GENERATE_RPM', '1000')),
+        'tpm': int(os.getenv('APEX_GENERATE_TPM', '1000000')),
+    },
+}
+
+_priority = contextvars.ContextVar('gemini_priority', default='interactive')
+
+class RateLimitTimeout(Exception):
+    """A call could not get through the rate limiter before its timeout"""
+
+@contextmanager
+def priority(name: str):
+    """Run the enclosed API calls in the given priority class"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name} (use one of {', '.join(PRIORITIES)})")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def background(fn):
+    """Decorator: API calls made inside fn (index builds, precomputation) yield to interactive ones"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with priority('background'):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def current_priority() -> str:
+    """Priority class of API calls made from this context"""
+    return _priority.get()
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second, up to one minute's worth"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount is available (call refill first)"""
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with priority queueing
+
+    Callers queue in (priority, arrival) order and only the head of the queue
+    may take from the buckets, so a queued interactive call always goes
+    before background calls, however many of those are waiting.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int = 0):
+        if rpm < 0 or tpm < 0:
+            raise ValueError(f"{name}: rpm and tpm must be >= 0 (0 = unlimited), got rpm={rpm} tpm={tpm}")
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._cond = threading.Condition()
+        self._queue = []
+        self._arrivals = itertools.count()
+        self._metrics = {cls: {'calls': 0, 'tokens': 0, 'waited': 0, 'wait_total_s': 0.0, 'wait_max_s': 0.0,
+                               'timeouts': 0, '_recent': deque(maxlen=500)} for cls in PRIORITIES}
+
+    def _time_until(self, tokens: int, now: float) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            self.requests.refill(now)
+            wait = self.requests.time_until(1)
+        if self.tokens is not None:
+            self.tokens.refill(now)
+            wait = max(wait, self.tokens.time_until(tokens))
+        return wait
+
+    def acquire(self, tokens: int = 0, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """Block until the call fits the budgets; returns the seconds spent waiting
+
+        Raises RateLimitTimeout if that would take longer than timeout.
+        """
+        priority = priority or current_priority()
+        ticket = (PRIORITIES.index(priority), next(self._arrivals))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] == ticket:
+                        wait = self._time_until(tokens, now)
+                        if wait <= 0:
+                            if self.requests is not None:
+                                self.requests.take(1)
+                            if self.tokens is not None:
+                                self.tokens.take(tokens)
+                            break
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0 or (wait is not None and wait > remaining):
+                            self._metrics[priority]['timeouts'] += 1
+                            raise RateLimitTimeout(f"{self.name}: no {priority} capacity within {timeout:.1f}s")
+                        wait = remaining if wait is None else wait
+                    self._cond.wait(wait)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            metrics = self._metrics[priority]
+            metrics['calls'] += 1
+            metrics['tokens'] += tokens
+            metrics['_recent'].append(waited)
+            if waited > 0.001:
+                metrics['waited'] += 1
+                metrics['wait_total_s'] += waited
+                metrics['wait_max_s'] = max(metrics['wait_max_s'], waited)
+        return waited
+
+    def get_stats(self) -> Dict:
+        """Queue length plus per-priority call counts and queue-wait times"""
+        with self._cond:
+            stats = {'queued': len(self._queue)}
+            for name, metrics in self._metrics.items():
+                recent = sorted(metrics['_recent'])
+                entry = {key: value for key, value in metrics.items() if not key.startswith('_')}
+                entry['wait_total_s'] = round(entry['wait_total_s'], 3)
+                entry['wait_max_s'] = round(entry['wait_max_s'], 3)
+                entry['wait_p95_s'] = round(recent[int(0.95 * (len(recent) - 1))], 3) if recent else 0.0
+                stats[name] = entry
+        return stats
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Process-wide limiter for one API family ("embed" or "generate")"""
+    with _limiters_lock:
+        if name not in _limiters:
+            limits = DEFAULT_LIMITS[name]
+            _limiters[name] = RateLimiter(name, limits['rpm'], limits['tpm'])
+        return _limiters[name]
+
+def configure_limits(name: str, rpm: Optional[int] = None, tpm: Optional[int] = None):
+    """Change a family's budgets for calls made from now on (0 = unlimited)"""
+    for label, value in (('rpm', rpm), ('tpm', tpm)):
+        if value is not None and value < 0:
+            raise ValueError(f"{name}: {label} must be >= 0 (0 = unlimited), got {value}")
+    with _limiters_lock:
+        limits = DEFAULT_LIMITS[name]
+        if rpm is not None:
+            limits['rpm'] = rpm
+        if tpm is not None:
+            limits['tpm'] = tpm
+        _limiters.pop(name, None)
+
+def acquire(name: str, tokens: int = 0, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+    """Wait for room in the named budget before making one API call"""
+    return get_rate_limiter(name).acquire(tokens, priority, timeout)
+
+def get_stats() -> Dict:
+    """Stats for every limiter in use"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.get_stats() for name, limiter in limiters.items()}
@@ -0,0 +1,176 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SPACES = ('cosine', 'ip', 'l2')
+
+# Index settings applied when a collection version is created
+DEFAULT_INDEX_PARAMS = {
+    'space': 'cosine',
+    'M': 16,
+    'ef_construction': 100,
+    'ef_search': 50,
+}
+
+def index_params(overrides: Optional[Dict] = None) -> Dict:
+    """Defaults merged with overrides, validated"""
+    params = dict(DEFAULT_INDEX_PARAMS)
+    params.update(overrides or {})
+    if params['space'] not in SPACES:
+        raise ValueError(f"Unknown distance space: {params['space']} (use one of {', '.join(SPACES)})")
+    for key in ('M', 'ef_construction', 'ef_search'):
+        if int(params[key]) < 1:
+            raise ValueError(f"{key} must be positive")
+        params[key] = int(params[key])
+    return params
+
+def hnsw_metadata(params: Dict) -> Dict:
+    """Chroma collection metadata for the given index params"""
+    return {
+        'hnsw:space': params['space'],
+        'hnsw:M': params['M'],
+        'hnsw:construction_ef': params['ef_construction'],
+        'hnsw:search_ef': params['ef_search'],
+    }
+
+def collection_space(collection) -> str:
+    """Distance space a collection was built with (Chroma defaults to l2)"""
+    metadata = getattr(collection, 'metadata', None) or {}
+    return metadata.get('hnsw:space', 'l2')
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    """Convert a Chroma distance into a cosine-style similarity (1 = identical)
+
+    cosine: distance is 1 - cos, so similarity = 1 - distance.
+    ip:     distance is 1 - dot; for unit-length embeddings (as returned by
+            text-embedding-004) the dot product is the cosine.
+    l2:     distance is the squared euclidean distance; for unit vectors
+            ||a - b||^2 = 2 - 2cos, so similarity = 1 - distance / 2.
+    """
+    if space == 'l2':
+        return 1.0 - distance / 2.0
+    if space in ('cosine', 'ip'):
+        return 1.0 - distance
+    raise ValueError(f"Unknown distance space: {space}")
+
+class SectionCentroidIndex:
+    """Coarse index of one mean embedding per section/document
+
+    Used for two-level retrieval: rank the centroids first, then search only
+    the chunks of the best few groups (Chroma `where` filter on group_field).
+    """
+
+    def __init__(self, group_field: str):
+        self.group_field = group_field
+        self._sums = {}
+        self._counts = {}
+        self.groups: List[str] = []
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+
+    def add(self, group: str, embedding: List[float]):
+        """Accumulate one chunk embedding into its group"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if group in self._sums:
+            self._sums[group] += vector
+            self._counts[group] += 1
+        else:
+            self._sums[group] = vector.copy()
+            self._counts[group] = 1
+
+    def finalize(self) -> 'SectionCentroidIndex':
+        """Turn accumulated sums into a normalised centroid matrix"""
+        self.groups = list(self._sums)
+        if self.groups:
+            centroids = np.stack([self._sums[g] / self._counts[g] for g in self.groups])
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            self.centroids = centroids / np.where(norms == 0, 1, norms)
+        return self
+
+    @classmethod
+    def from_collection(cls, collection, group_field: str, batch_size: int = 1000) -> 'SectionCentroidIndex':
+        """Build from the embeddings already stored in a collection"""
+        index = cls(group_field)
+        offset = 0
+        while True:
+            batch = collection.get(include=['embeddings', 'metadatas'], limit=batch_size, offset=offset)
+            if not len(batch['ids']):
+                break
+            for embedding, metadata in zip(batch['embeddings'], batch['metadatas']):
+                group = (metadata or {}).get(group_field)
+                if group:
+                    index.add(group, embedding)
+            offset += len(batch['ids'])
+        return index.finalize()
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def top_groups(self, query_embedding: List[float], n_groups: int) -> List[str]:
+        """Groups whose centroid is closest (by cosine) to the query"""
+        if not self.groups:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = self.centroids @ (query / (np.linalg.norm(query) or 1.0))
+        n_groups = min(n_groups, len(self.groups))
+        best = np.argpartition(-scores, n_groups - 1)[:n_groups]
+        return [self.groups[i] for i in best[np.argsort(-scores[best])]]
+
+    def where_filter(self, query_embedding: List[float], n_groups: int) -> Optional[Dict]:
+        """Chroma `where` clause restricting a search to the top groups (None = no restriction)"""
+        if n_groups <= 0 or len(self.groups) <= n_groups:
+            return None
+        return {self.group_field: {'$in': self.top_groups(query_embedding, n_groups)}}
+
+# Adaptive k: fetch a wider candidate set, send only the strong matches
+DEFAULT_ADAPTIVE_PARAMS = {
+    'enabled': True,
+    'min_k': 2,          # always send at least this many chunks
+    'max_k': None,       # at most this many (None = the query's n_results)
+    'candidates': None,  # how many to fetch (None = 2 * max_k)
+    'min_score': None,   # absolute similarity floor
+    'max_gap': 0.1,      # drop chunks scoring this far below the best match
+}
+
+def adaptive_params(overrides: Optional[Dict] = None) -> Dict:
+    """Defaults merged with overrides"""
+    params = dict(DEFAULT_ADAPTIVE_PARAMS)
+    params.update(overrides or {})
+    if params['min_k'] < 1:
+        raise ValueError("min_k must be at least 1")
+    return params
+
+def candidate_count(params: Dict, n_results: int) -> int:
+    """How many chunks to fetch before the adaptive cutoff"""
+    if not params['enabled']:
+        return n_results
+    max_k = params['max_k'] or n_results
+    return max(params['candidates'] or 2 * max_k, max_k)
+
+def select_adaptive(chunks: List[Dict], params: Dict, n_results: int) -> List[Dict]:
+    """Keep the leading chunks whose score is close enough to the best one
+
+    chunks must be sorted by 'similarity_score', best first. The first
+    min_k are always kept; after that a chunk is dropped (along with
+    everything below it) once it falls under min_score or more than
+    max_gap below the top score, or when max_k chunks have been kept.
+    """
+    if not params['enabled']:
+        return chunks[:n_results]
+    max_k = params['max_k'] or n_results
+    if not chunks:
+        return []
+    top = chunks[0]['similarity_score']
+    selected = []
+    for chunk in chunks[:max_k]:
+        score = chunk['similarity_score']
+        if len(selected) >= params['min_k']:
+            if params['min_score'] is not None and score < params['min_score']:
+                break
+            if params['max_gap'] is not None and top - score > params['max_gap']:
+                break
+        selected.append(chunk)
+    return selected
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (about 4 characters per token)"""
+    return (len(text) + 3) // 4
@@ -0,0 +1,65 @@
+import ast
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fact_store import FactStore
+
+def load_college_data():
+    """APEX_COLLEGE_DATA from the chatbot module, without importing streamlit/chromadb"""
+    with open(os.path.join(ROOT, 'final_apex_chatbot.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], 'id', None) == 'APEX_COLLEGE_DATA':
+            return ast.literal_eval(node.value)
+    raise AssertionError("APEX_COLLEGE_DATA not found")
+
+@pytest.fixture(scope='module')
+def store():
+    return FactStore(load_college_data())
+
+@pytest.mark.parametrize('question', [
+    "CSE fee and hostel fee?",
+    "What is the annual fee for CSE with hostel?",
+    "What is the hostel fee for CSE students?",
+    "fee for lateral entry B.Tech",
+    "Is the fee for CSE more than AI?",
+    "CSE vs AI fee",
+    "What is the eligibility for PhD?",
+    "eligibility for B.Ed",
+    "diploma eligibility",
+])
+def test_questions_the_table_cannot_answer_go_to_rag(store, question):
+    assert store.match(question) is None
+
+@pytest.mark.parametrize('question, expected', [
+    ("What is the CSE fee?", "₹1,85,000"),
+    ("computer science engineering fee", "₹1,85,000"),
+    ("hostel fee", "₹65,000-₹1,05,000"),
+    ("MBA fees", "₹2,00,000"),
+    ("admissions email?", "admissions@apex.ac.in"),
+    ("What is the eligibility for B.Tech?", "Minimum 45% marks"),
+])
+def test_single_subject_lookups(store, question, expected):
+    result = store.match(question)
+    assert result is not None and result['path'] == 'facts'
+    assert expected in result['answer']
+
+def test_single_subject_fee_answers_only_that_subject(store):
+    answer = store.match("What is the CSE fee?")['answer']
+    assert 'Hostel' not in answer and 'AI & Machine Learning' not in answer
+
+def test_plain_btech_fee_lists_every_branch(store):
+    answer = store.match("What is the fee structure for engineering programs?")['answer']
+    for program in ("Computer Science Engineering", "AI & Machine Learning", "Data Science",
+                    "Cloud Technology & Security"):
+        assert program in answer
+
+def test_alias_inside_longer_mention_is_not_a_second_subject(store):
+    # "computer science" is part of "computer science engineering", not another program
+    facts = store._match_subjects("computer science engineering fee", store._by_attribute['annual_fee'])
+    assert {fact['subject'] for fact in facts} == {'Computer Science Engineering'}
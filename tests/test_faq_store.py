@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faq_store import FAQStore, is_negated, normalize_question, question_terms
+
+CURATED = ["What B.Tech programs does APEX offer?", "What is the hostel and accommodation like?"]
+
+def answer(question):
+    return {'answer': f"answer to {question}", 'sources': [], 'confidence': 0.9,
+            'chunk_hashes': ['h1'], 'generation_path': 'primary'}
+
+@pytest.fixture
+def store(tmp_path):
+    store = FAQStore(str(tmp_path / 'faq.json'))
+    store.set_live_hashes(['h1'])
+    store.refresh(CURATED, answer)
+    return store
+
+def test_exact_match_after_normalisation(store):
+    result = store.lookup("what b.tech PROGRAMS does apex offer")
+    assert result['path'] == 'faq'
+    assert result['matched_question'] == CURATED[0]
+    assert store.stats['hits'] == 1
+
+def test_close_rephrasing_is_a_fuzzy_hit(store):
+    # 4 of 5 content words shared: Jaccard 0.8, the default threshold
+    result = store.lookup("What B.Tech programs does APEX offer students?")
+    assert result['matched_question'] == CURATED[0]
+    assert result['match_similarity'] == pytest.approx(0.8)
+    assert store.stats['fuzzy_hits'] == 1
+
+@pytest.mark.parametrize('question', [
+    "What B.Tech programs does APEX not offer?",
+    "Which B.Tech programs doesn't APEX offer?",
+    "What B.Tech programs does APEX offer without hostel?",
+])
+def test_negated_question_does_not_match_the_positive_one(store, question):
+    assert store.lookup(question) is None
+
+def test_below_threshold_is_a_miss(store):
+    assert store.lookup("What B.Tech programs have the best placements?") is None
+    assert store.stats['misses'] == 1
+
+def test_stale_entries_are_not_served(store):
+    store.set_live_hashes(['h2'])
+    assert store.lookup(CURATED[0]) is None
+    assert store.stats['stale'] == 1
+
+def test_degraded_answers_are_not_stored(tmp_path):
+    store = FAQStore(str(tmp_path / 'faq.json'))
+    store.set_live_hashes(['h1'])
+    result = store.refresh(CURATED, lambda q: dict(answer(q), generation_path='extractive'))
+    assert result['skipped'] == len(CURATED) and store.entries == []
+
+@pytest.mark.parametrize('question, negated', [
+    ("Is there no hostel?", True),
+    ("Which programs don’t they offer", True),
+    ("Tell me about notices", False),
+    ("What is the knowledge base?", False),
+])
+def test_is_negated(question, negated):
+    assert is_negated(question) is negated
+
+def test_question_terms_drop_stopwords_and_plurals():
+    assert normalize_question("What's the FEE?") == "what s the fee"
+    assert question_terms("What are the hostel fees at APEX?") == {'hostel', 'fee'}
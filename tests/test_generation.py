@@ -0,0 +1,120 @@
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_gemini
+
+fake_gemini.install(generate_ms=0, embed_ms=0)
+
+from generation import (CircuitBreaker, CircuitOpen, GenerationFailed, GenerationTimeout, GenerationUnavailable,
+                        HedgedGenerator)
+
+class ScriptedModel:
+    """generate_content stand-in: each call pops (delay_seconds, text or exception)"""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None):
+        with self._lock:
+            self.calls += 1
+            delay, outcome = self.steps.pop(0) if self.steps else (0.0, 'ok')
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return types.SimpleNamespace(text=outcome)
+
+def make_generator(primary, fallback=None, **params):
+    params = dict({'hedge_delay': 0.1, 'fallback_reserve': 0.5, 'breaker_failures': 3}, **params)
+    generator = HedgedGenerator("test-model", temperature=0.2, max_output_tokens=100, params=params)
+    generator.model = primary
+    generator.fallback_model = fallback if fallback is not None else primary
+    return generator
+
+def test_fast_primary_answers_without_hedging():
+    model = ScriptedModel((0.0, 'primary answer'))
+    result = make_generator(model).generate("prompt", time.monotonic() + 5)
+    assert (result['text'], result['path'], result['attempts']) == ('primary answer', 'primary', 1)
+    assert model.calls == 1
+
+def test_slow_primary_is_hedged():
+    model = ScriptedModel((1.0, 'slow'), (0.0, 'hedged'))
+    result = make_generator(model).generate("prompt", time.monotonic() + 5)
+    assert (result['text'], result['path']) == ('hedged', 'hedge')
+
+def test_failed_primary_is_not_hedged_but_falls_back():
+    primary = ScriptedModel((0.0, RuntimeError("429 Resource has been exhausted")))
+    fallback = ScriptedModel((0.0, 'short answer'))
+    generator = make_generator(primary, fallback)
+    result = generator.generate("prompt", time.monotonic() + 5)
+    assert (result['text'], result['path']) == ('short answer', 'fallback')
+    assert primary.calls == 1 and fallback.calls == 1
+    assert generator.get_stats()['hedges_fired'] == 0
+
+def test_quota_error_costs_two_calls_at_most():
+    error = RuntimeError("429 Resource has been exhausted")
+    primary, fallback = ScriptedModel((0.0, error)), ScriptedModel((0.0, error))
+    with pytest.raises(GenerationUnavailable):
+        make_generator(primary, fallback).generate("prompt", time.monotonic() + 5)
+    assert primary.calls + fallback.calls == 2
+
+def test_errors_are_reported_as_failures_not_timeouts():
+    error = PermissionError("403 API key not valid")
+    generator = make_generator(ScriptedModel((0.0, error)), ScriptedModel((0.0, error)))
+    with pytest.raises(GenerationFailed) as caught:
+        generator.generate("prompt", time.monotonic() + 5)
+    assert not isinstance(caught.value, GenerationTimeout)
+    assert caught.value.__cause__ is error
+    stats = generator.get_stats()
+    assert (stats['failed'], stats['timeout']) == (1, 0)
+
+def test_fallback_fires_near_the_deadline():
+    primary = ScriptedModel((2.0, 'too late'), (2.0, 'too late'))
+    fallback = ScriptedModel((0.0, 'short answer'))
+    result = make_generator(primary, fallback, fallback_reserve=0.5).generate("prompt", time.monotonic() + 1.0)
+    assert result['path'] == 'fallback'
+    assert result['latency'] < 1.0
+
+def test_nothing_in_time_raises_timeout():
+    model = ScriptedModel((2.0, 'late'), (2.0, 'late'), (2.0, 'late'))
+    start = time.monotonic()
+    generator = make_generator(model, fallback_reserve=0.2)
+    with pytest.raises(GenerationTimeout):
+        generator.generate("prompt", start + 0.5)
+    assert time.monotonic() - start < 1.0
+    assert generator.get_stats()['timeout'] == 1
+
+def test_circuit_opens_after_repeated_failures():
+    error = RuntimeError("500 internal error")
+    model = ScriptedModel(*[(0.0, error)] * 6)
+    generator = make_generator(model, breaker_failures=3, breaker_reset_seconds=60)
+    for _ in range(3):
+        with pytest.raises(GenerationUnavailable):
+            generator.generate("prompt", time.monotonic() + 5)
+    calls = model.calls
+    with pytest.raises(CircuitOpen):
+        generator.generate("prompt", time.monotonic() + 5)
+    assert model.calls == calls
+    assert generator.get_stats()['circuit'] == 'open'
+
+def test_circuit_breaker_probes_once_after_reset():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == 'half-open'
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
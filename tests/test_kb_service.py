@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_service import SharedKnowledgeBase, SingleFlight, get_shared_knowledge_base
+
+class SlowBackend:
+    """Backend whose query blocks until released, counting calls per question"""
+
+    def __init__(self):
+        self.calls = {}
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def query(self, question, **kwargs):
+        with self._lock:
+            self.calls[question] = self.calls.get(question, 0) + 1
+        self.release.wait(5)
+        return {'answer': f"answer to {question}", 'path': 'rag'}
+
+def run_concurrently(fn, args_list):
+    results, errors = [None] * len(args_list), []
+
+    def worker(index, args):
+        try:
+            results[index] = fn(*args)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def test_single_flight_runs_once_and_shares_the_result():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    threads, results, errors = run_concurrently(lambda: flight.do('key', fn), [()] * 5)
+    started.wait(5)
+    time.sleep(0.05)  # let the followers join the flight
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == [] and len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == 42 for result, _ in results)
+
+def test_single_flight_shares_errors_and_forgets_the_key():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("backend down")
+
+    threads, _, errors = run_concurrently(lambda: flight.do('key', fail), [()] * 3)
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3 and all(str(e) == "backend down" for e in errors)
+    # The next call starts a fresh flight
+    assert flight.do('key', lambda: 'ok') == ('ok', False)
+
+def test_identical_questions_are_coalesced_after_normalisation():
+    backend = SlowBackend()
+    kb = SharedKnowledgeBase(lambda: backend)
+    questions = ["What is the MBA fee?", "what is the mba fee", "WHAT IS THE MBA FEE ?!"]
+    threads, results, errors = run_concurrently(kb.query, [(q,) for q in questions])
+    time.sleep(0.1)
+    backend.release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sum(backend.calls.values()) == 1
+    assert sum(1 for result in results if result.get('coalesced')) == 2
+    assert kb.stats['coalesced'] == 2
+
+def test_different_questions_or_options_are_not_coalesced():
+    backend = SlowBackend()
+    backend.release.set()
+    kb = SharedKnowledgeBase(lambda: backend)
+    kb.query("What is the MBA fee?")
+    kb.query("What is the BBA fee?")
+    kb.query("What is the MBA fee?", use_faq=False)
+    assert sum(backend.calls.values()) == 3
+    assert kb.stats['coalesced'] == 0
+
+def test_lazy_registration_does_not_build_the_backend():
+    built = []
+    kb = get_shared_knowledge_base('test_lazy_kb', lambda: built.append(1) or SlowBackend(), lazy=True)
+    assert built == []
+    kb.backend
+    assert built == [1]
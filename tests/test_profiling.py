@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+
+def test_concurrent_profiled_calls_do_not_fail(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, '_enabled', True)
+    barrier = threading.Barrier(4)
+
+    @profiling.profiled('work')
+    def work():
+        barrier.wait(timeout=5)
+        time.sleep(0.05)
+        return {'answer': 'ok'}
+
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(work())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [r['answer'] for r in results] == ['ok'] * 4
+    # Overlapping calls run unprofiled; exactly one holds the profiler
+    profiled_results = [r for r in results if 'profile' in r]
+    assert len(profiled_results) == 1
+    assert os.path.exists(profiled_results[0]['profile'])
+
+def test_nested_calls_fold_into_outer_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, '_enabled', True)
+
+    @profiling.profiled('inner')
+    def inner():
+        return {'answer': 'inner'}
+
+    @profiling.profiled('outer')
+    def outer():
+        assert 'profile' not in inner()
+        return {'answer': 'outer'}
+
+    assert 'profile' in outer()
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.txt')]) == 1
+
+def test_disabled_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, '_enabled', False)
+
+    @profiling.profiled()
+    def work():
+        return {'answer': 'ok'}
+
+    assert 'profile' not in work()
+    assert os.listdir(tmp_path) == []
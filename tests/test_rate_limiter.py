@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limiter
+from rate_limiter import RateLimiter, RateLimitTimeout, TokenBucket
+
+def test_bucket_refills_at_per_minute_rate():
+    bucket = TokenBucket(60)  # one per second
+    bucket.take(60)
+    bucket.refill(bucket.updated + 0.5)
+    assert bucket.level == pytest.approx(0.5)
+    assert bucket.time_until(1) == pytest.approx(0.5)
+    bucket.refill(bucket.updated + 120)
+    assert bucket.level == 60  # capped at one minute's worth
+
+def test_acquire_waits_for_the_next_request():
+    limiter = RateLimiter('test', rpm=600)  # one every 0.1s once the burst is used
+    limiter.requests.take(600)
+    waited = limiter.acquire()
+    assert 0.05 < waited < 0.5
+
+def test_token_budget_limits_large_calls():
+    limiter = RateLimiter('test', rpm=1000, tpm=600)
+    limiter.acquire(tokens=600)
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(tokens=100, timeout=0.05)
+
+@pytest.mark.parametrize('rpm, tpm', [(0, 0), (0, 1000)])
+def test_zero_means_unlimited(rpm, tpm):
+    limiter = RateLimiter('test', rpm=rpm, tpm=tpm)
+    for _ in range(50):
+        assert limiter.acquire(tokens=10) < 0.05
+
+def test_negative_limits_are_rejected():
+    with pytest.raises(ValueError):
+        RateLimiter('test', rpm=-1)
+    with pytest.raises(ValueError):
+        rate_limiter.configure_limits('generate', rpm=-5)
+
+def test_configure_limits_zero_rpm_does_not_divide_by_zero():
+    saved = dict(rate_limiter.DEFAULT_LIMITS['embed'])
+    try:
+        rate_limiter.configure_limits('embed', rpm=0)
+        assert rate_limiter.acquire('embed') < 0.05
+    finally:
+        rate_limiter.configure_limits('embed', **saved)
+
+def test_interactive_calls_go_before_queued_background_calls():
+    limiter = RateLimiter('test', rpm=600)
+    limiter.requests.take(600)
+    order = []
+
+    def call(priority):
+        limiter.acquire(priority=priority)
+        order.append(priority)
+
+    threads = [threading.Thread(target=call, args=('background',)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)  # background calls are queued first
+    interactive = threading.Thread(target=call, args=('interactive',))
+    interactive.start()
+    for thread in threads + [interactive]:
+        thread.join()
+    assert order[0] == 'interactive'
+
+def test_background_decorator_sets_priority():
+    @rate_limiter.background
+    def build():
+        return rate_limiter.current_priority()
+
+    assert build() == 'background'
+    assert rate_limiter.current_priority() == 'interactive'
@@ -1,19 +1,131 @@
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 import json
 import time
 import os
 import re
-from typing import List, Dict
+import gzip
+import math
+import hashlib
+import argparse
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from threading import Lock
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+from typing import List, Dict, Optional
+from corpus_io import JSONLWriter, is_jsonl, iter_records, save_records
+
+# pypdf is optional - without it PDF links are skipped as before
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
 
 class APEXWebScraper:
-    def __init__(self, base_url: str = "https://www.apex.ac.in", max_pages: int = 100):
-        """Initialize APEX College web scraper"""
+    def __init__(self, base_url: str = "https://www.apex.ac.in", max_pages: int = 100,
+                 fetch_workers: int = 1, parse_workers: int = 0, delay: float = 1.0,
+                 checkpoint_path: Optional[str] = None, checkpoint_every: int = 10,
+                 stream_output: Optional[str] = None, dedup: bool = True,
+                 dedup_distance: int = 3, strip_boilerplate: bool = True,
+                 boilerplate_threshold: float = 0.5, respect_robots: bool = True,
+                 use_sitemaps: bool = True, previous_output: Optional[str] = None,
+                 canonicalize: bool = True, include_pdfs: bool = True,
+                 max_pdf_bytes: int = 20_000_000, max_pdf_pages: int = 200):
+        """Initialize APEX College web scraper
+
+        parse_workers > 0 switches to the two-stage pipeline: fetch_workers threads
+        download pages and hand the raw bytes to a process pool that parses them.
+        With checkpoint_path set, crawl state is saved every checkpoint_every pages.
+        With stream_output set (*.jsonl, *.jsonl.gz, *.jsonl.zst), each page is
+        appended to that file as it is extracted instead of kept in scraped_data.
+        With dedup on, pages whose SimHash is within dedup_distance bits of an
+        already collected page are skipped and recorded in self.duplicates.
+        With strip_boilerplate on, text blocks found on more than
+        boilerplate_threshold of all pages are removed after the crawl.
+        With use_sitemaps on, a fresh crawl is seeded from the site's sitemaps, and
+        pages whose <lastmod> is not newer than their record in previous_output
+        are carried over from that file instead of being fetched again.
+        With canonicalize on, URLs are normalised (see canonicalize_url) before
+        they reach the visited set and the frontier.
+        With include_pdfs on (and pypdf installed), linked PDFs up to max_pdf_bytes
+        are streamed to disk and their first max_pdf_pages pages extracted.
+        """
         self.base_url = base_url
         self.max_pages = max_pages
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = max(0, parse_workers)
+        self.delay = delay
         self.visited_urls = set()
+        self.urls_to_visit = deque()
+        self.queued_urls = set()
         self.scraped_data = []
+        self.stream_output = stream_output
+        self.writer = None
+        
+        # Near-duplicate detection: skipped URL -> URL of the page that was kept
+        self.dedup = dedup
+        self.duplicate_index = NearDuplicateIndex(max_distance=dedup_distance)
+        self.duplicates = {}
+        
+        # Site-wide boilerplate: how many pages each text block appears on
+        self.strip_boilerplate = strip_boilerplate
+        self.boilerplate = BoilerplateDetector(threshold=boilerplate_threshold)
+        
+        # robots.txt / sitemap seeding. skipped_urls are marked visited but were
+        # never fetched (disallowed or unchanged), so they don't use up max_pages
+        self.respect_robots = respect_robots
+        self.use_sitemaps = use_sitemaps
+        self.previous_output = previous_output
+        self.robots = None
+        self.sitemap_lastmod = {}
+        self.unchanged_urls = set()
+        self.skipped_urls = set()
+        
+        # URL canonicalisation: distinct non-canonical spellings seen so far
+        self.canonicalize = canonicalize
+        self.url_variants = set()
+        
+        # PDF ingestion (brochures, fee schedules, notices)
+        self.include_pdfs = include_pdfs and PdfReader is not None
+        self.max_pdf_bytes = max_pdf_bytes
+        self.max_pdf_pages = max_pdf_pages
+        
+        # Checkpointing: URLs currently being fetched or parsed go back into the
+        # frontier of a checkpoint, so a resumed crawl picks them up again
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._in_flight = set()
+        self._pages_since_checkpoint = 0
+        
+        # Per-stage counters for throughput reporting
+        self.stats = {
+            'fetched': 0,
+            'fetch_errors': 0,
+            'bytes_fetched': 0,
+            'fetch_seconds': 0.0,
+            'parsed': 0,
+            'parse_errors': 0,
+            'parse_seconds': 0.0,
+            'wall_seconds': 0.0,
+            'pages': 0,
+            'words': 0,
+            'pages_with_sections': 0,
+            'near_duplicates': 0,
+            'embeddings_saved': 0,
+            'sitemap_urls': 0,
+            'unchanged_skipped': 0,
+            'robots_disallowed': 0,
+            'canonical_collapsed': 0,
+            'pdfs': 0,
+            'pdfs_too_large': 0,
+        }
+        self._stats_lock = Lock()
+        self._throttle_lock = Lock()
+        self._last_request_at = 0.0
         
         # Headers to mimic a real browser
         self.headers = {
@@ -38,12 +150,73 @@ class APEXWebScraper:
             parsed_base = urlparse(self.base_url)
             parsed_url = urlparse(url)
             
-            # Must be same domain and not a file download
+            # Must be same domain and not a file download (PDFs have their own path)
+            blocked = ['.jpg', '.png', '.gif', '.zip', '.doc', '.docx']
+            if not self.include_pdfs:
+                blocked.append('.pdf')
             return (parsed_url.netloc == parsed_base.netloc and 
-                    not any(ext in url.lower() for ext in ['.pdf', '.jpg', '.png', '.gif', '.zip', '.doc', '.docx']))
+                    not any(ext in url.lower() for ext in blocked))
         except:
             return False
     
+    def is_pdf_url(self, url: str) -> bool:
+        """Check if a URL points at a PDF document"""
+        return urlparse(url).path.lower().endswith('.pdf')
+    
+    def canonicalize_url(self, url: str) -> str:
+        """Normalise a URL so trivially different spellings of a page compare equal
+
+        Lower-cases scheme and host, maps the www/non-www and http/https variants
+        of the site's own host onto base_url's, drops default ports, fragments and
+        tracking parameters, sorts the query and strips trailing slashes.
+        """
+        if not self.canonicalize:
+            return url
+        
+        try:
+            parsed = urlparse(url)
+            base = urlparse(self.base_url)
+        except ValueError:
+            return url
+        
+        scheme = parsed.scheme.lower()
+        host = (parsed.hostname or '').lower()
+        port = parsed.port if parsed.port not in (None, 80, 443) else None
+        
+        base_host = (base.hostname or '').lower()
+        if strip_www(host) == strip_www(base_host) and port == base.port:
+            host, scheme = base_host, base.scheme.lower()
+        netloc = f"{host}:{port}" if port else host
+        
+        path = re.sub(r'/{2,}', '/', parsed.path) or '/'
+        if len(path) > 1:
+            path = path.rstrip('/') or '/'
+        
+        query = urlencode(sorted(
+            (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+            if not is_tracking_param(key)
+        ))
+        
+        return urlunparse((scheme, netloc, path, '', query, ''))
+    
+    def _note_variant(self, url: str, canonical: str):
+        """Remember a non-canonical spelling; each distinct one is a fetch avoided"""
+        if url != canonical:
+            self.url_variants.add(url)
+    
+    def find_canonical_link(self, soup: BeautifulSoup, url: str) -> Optional[str]:
+        """Return the page's <link rel="canonical"> target if it is on this site"""
+        if not self.canonicalize:
+            return None
+        for link in soup.find_all('link', href=True):
+            rel = link.get('rel') or []
+            if isinstance(rel, str):
+                rel = rel.split()
+            if 'canonical' in [value.lower() for value in rel]:
+                canonical = self.canonicalize_url(urljoin(url, link['href']))
+                return canonical if self.is_valid_url(canonical) else None
+        return None
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize text content"""
         if not text:
@@ -85,20 +258,7 @@ class APEXWebScraper:
                 description = self.clean_text(meta_desc.get('content', ''))
             
             # Extract main content using multiple selectors
-            content_selectors = [
-                'main', '.main-content', '#main', '.content',
-                '.page-content', 'article', '.article', '.container',
-                '.wrapper', 'section'
-            ]
-            
-            main_content = None
-            for selector in content_selectors:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-            
-            if not main_content:
-                main_content = soup.find('body')
+            main_content = self._select_main_content(soup)
             
             if not main_content:
                 return None
@@ -158,65 +318,639 @@ class APEXWebScraper:
             print(f"Error extracting content from {url}: {str(e)}")
             return None
     
+    def _select_main_content(self, soup: BeautifulSoup):
+        """Pick the element holding the page's main content"""
+        content_selectors = [
+            'main', '.main-content', '#main', '.content',
+            '.page-content', 'article', '.article', '.container',
+            '.wrapper', 'section'
+        ]
+        
+        for selector in content_selectors:
+            main_content = soup.select_one(selector)
+            if main_content:
+                return main_content
+        
+        return soup.find('body')
+    
+    def extract_blocks(self, soup: BeautifulSoup) -> List[str]:
+        """Split the main content into text blocks (innermost block-level elements)"""
+        main_content = self._select_main_content(soup)
+        if not main_content:
+            return []
+        
+        block_tags = ['p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'td', 'th', 'dt', 'dd',
+                      'blockquote', 'pre', 'address', 'figcaption', 'caption', 'div', 'section']
+        blocks = []
+        for element in main_content.find_all(block_tags):
+            # Only innermost blocks, so a wrapper div doesn't repeat its children
+            if element.find(block_tags):
+                continue
+            text = self.clean_text(element.get_text(separator=' ', strip=True))
+            if len(text) >= 20:
+                blocks.append(text)
+        return blocks
+    
     def find_internal_links(self, soup: BeautifulSoup, current_url: str) -> List[str]:
-        """Find internal links from current page"""
-        links = set()
+        """Find internal links from current page, in page order
+
+        Parse workers don't see the crawl's visited set, so the per-page limit
+        is applied by select_links once the links are back in the crawler.
+        """
+        links = {}
         
         try:
             for link in soup.find_all('a', href=True):
                 href = link['href']
-                full_url = urljoin(current_url, href)
+                raw_url = urljoin(current_url, href)
+                full_url = self.canonicalize_url(raw_url)
                 
                 # Check if it's a valid internal link
-                if (self.is_valid_url(full_url) and 
-                    full_url not in self.visited_urls and
-                    len(links) < 20):  # Limit links per page
-                    
-                    # Prioritize important sections
-                    if any(section in full_url.lower() for section in self.important_sections):
-                        links.add(full_url)
-                    elif len(links) < 10:  # Add other links if space available
-                        links.add(full_url)
+                if self.is_valid_url(full_url) and full_url not in self.visited_urls:
+                    self._note_variant(raw_url, full_url)
+                    links[full_url] = None
         except Exception as e:
             print(f"Error finding links: {e}")
         
         return list(links)
     
-    def scrape_page(self, url: str) -> bool:
-        """Scrape a single page"""
+    def select_links(self, links: List[str]) -> List[str]:
+        """Pick up to 20 unvisited links from a page's links"""
+        selected = set()
+        for url in links:
+            if len(selected) >= 20:  # Limit links per page
+                break
+            if url in self.visited_urls or not self.is_valid_url(url):
+                continue
+            # Prioritize important sections and documents like brochures
+            if (any(section in url.lower() for section in self.important_sections) or
+                    self.is_pdf_url(url)):
+                selected.add(url)
+            elif len(selected) < 10:  # Add other links if space available
+                selected.add(url)
+        return list(selected)
+    
+    def load_robots(self):
+        """Fetch robots.txt and adopt its crawl-delay if it is longer than ours"""
+        robots_url = urljoin(self.base_url + '/', 'robots.txt')
+        try:
+            response = requests.get(robots_url, headers=self.headers, timeout=15)
+            if response.status_code != 200:
+                return
+            self.robots = RobotFileParser(robots_url)
+            self.robots.parse(response.text.splitlines())
+            # parse() alone leaves the parser looking unread; crawl_delay() then returns None
+            self.robots.modified()
+        except Exception as e:
+            print(f"Error reading {robots_url}: {e}")
+            return
+        
+        crawl_delay = self.robots.crawl_delay(self.headers['User-Agent'])
+        if crawl_delay and float(crawl_delay) > self.delay:
+            self.delay = float(crawl_delay)
+            print(f"🐢 robots.txt asks for a {self.delay:g}s crawl delay")
+    
+    def can_fetch(self, url: str) -> bool:
+        """Check robots.txt rules for a URL"""
+        if not self.respect_robots or self.robots is None:
+            return True
+        return self.robots.can_fetch(self.headers['User-Agent'], url)
+    
+    def fetch_sitemap(self, sitemap_url: str, depth: int = 0) -> Dict[str, Optional[str]]:
+        """Collect {url: lastmod} from a sitemap, following sitemap indexes"""
+        entries = {}
+        try:
+            self._throttle()
+            response = requests.get(sitemap_url, headers=self.headers, timeout=15)
+            response.raise_for_status()
+            content = response.content
+            # *.xml.gz sitemaps arrive as raw gzip, not Content-Encoding
+            if content[:2] == b'\x1f\x8b':
+                content = gzip.decompress(content)
+            root = ElementTree.fromstring(content)
+        except Exception as e:
+            print(f"Error reading sitemap {sitemap_url}: {e}")
+            return entries
+        
+        def local_name(tag):
+            return tag.rsplit('}', 1)[-1]
+        
+        is_index = local_name(root.tag) == 'sitemapindex'
+        for node in root:
+            fields = {local_name(child.tag): (child.text or '').strip() for child in node}
+            loc = fields.get('loc')
+            if not loc:
+                continue
+            if is_index:
+                if depth < 3:
+                    entries.update(self.fetch_sitemap(loc, depth + 1))
+            else:
+                url = self.canonicalize_url(loc)
+                self._note_variant(loc, url)
+                if self.is_valid_url(url):
+                    entries[url] = fields.get('lastmod') or None
+        return entries
+    
+    def discover_sitemap_urls(self) -> Dict[str, Optional[str]]:
+        """Collect URLs from the sitemaps listed in robots.txt, or /sitemap.xml"""
+        sitemaps = (self.robots.site_maps() if self.robots else None) or [urljoin(self.base_url + '/', 'sitemap.xml')]
+        entries = {}
+        for sitemap_url in sitemaps:
+            entries.update(self.fetch_sitemap(sitemap_url))
+        return entries
+    
+    def _previous_versions(self) -> Dict[str, str]:
+        """Map URL -> lastmod (or scrape time) from the previous crawl's output"""
+        if not self.previous_output or not os.path.exists(self.previous_output):
+            return {}
+        try:
+            return {record['url']: record.get('lastmod') or record.get('scraped_at')
+                    for record in iter_records(self.previous_output)}
+        except Exception as e:
+            print(f"Error reading previous crawl {self.previous_output}: {e}")
+            return {}
+    
+    def _carry_forward_unchanged(self, source: str):
+        """Emit the previous crawl's records for pages the sitemap says are unchanged"""
+        try:
+            for record in iter_records(source):
+                if record['url'] in self.unchanged_urls:
+                    record['lastmod'] = self.sitemap_lastmod.get(record['url'], record.get('lastmod'))
+                    self._emit(record)
+        finally:
+            if source != self.previous_output:
+                os.remove(source)
+        print(f"♻️ Kept {len(self.unchanged_urls)} unchanged pages from {self.previous_output}")
+    
+    def _budget_left(self) -> bool:
+        """Check if fewer than max_pages pages have been fetched"""
+        return len(self.visited_urls) - len(self.skipped_urls) < self.max_pages
+    
+    def _throttle(self):
+        """Space out request starts by self.delay seconds across all fetch workers"""
+        with self._throttle_lock:
+            wait_for = self._last_request_at + self.delay - time.monotonic()
+            if wait_for > 0:
+                time.sleep(wait_for)
+            self._last_request_at = time.monotonic()
+    
+    def fetch_page(self, url: str) -> Optional[bytes]:
+        """Download a page and return its raw bytes (I/O stage)"""
+        self._throttle()
+        start = time.perf_counter()
+        content = None
         try:
             print(f"Scraping: {url}")
             
             response = requests.get(url, headers=self.headers, timeout=15)
             response.raise_for_status()
+            content = response.content
+        except Exception as e:
+            print(f"Error scraping {url}: {str(e)}")
+        
+        with self._stats_lock:
+            self.stats['fetch_seconds'] += time.perf_counter() - start
+            if content is None:
+                self.stats['fetch_errors'] += 1
+            else:
+                self.stats['fetched'] += 1
+                self.stats['bytes_fetched'] += len(content)
+        return content
+    
+    def fetch_pdf(self, url: str) -> Optional[str]:
+        """Stream a PDF to a temporary file and return its path (I/O stage)
+
+        The download is abandoned once it passes max_pdf_bytes, so a huge file
+        is never held in memory or written out in full.
+        """
+        self._throttle()
+        start = time.perf_counter()
+        path = None
+        size = 0
+        too_large = False
+        try:
+            print(f"Scraping PDF: {url}")
             
-            # Parse content
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract content
-            page_data = self.extract_content(soup, url)
-            if page_data:
-                self.scraped_data.append(page_data)
-                print(f"✓ Scraped: {page_data['title'][:50]}... ({page_data['word_count']} words)")
+            with requests.get(url, headers=self.headers, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                if int(response.headers.get('Content-Length') or 0) > self.max_pdf_bytes:
+                    too_large = True
+                    raise ValueError("PDF is over the size limit")
                 
-                # Find more links to scrape
-                if len(self.visited_urls) < self.max_pages:
-                    internal_links = self.find_internal_links(soup, url)
-                    return internal_links
-            
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+                    path = f.name
+                    for block in response.iter_content(chunk_size=64 * 1024):
+                        size += len(block)
+                        if size > self.max_pdf_bytes:
+                            too_large = True
+                            raise ValueError("PDF is over the size limit")
+                        f.write(block)
+        except Exception as e:
+            print(f"Error scraping {url}: {str(e)}")
+            if path and os.path.exists(path):
+                os.remove(path)
+            path = None
+        
+        with self._stats_lock:
+            self.stats['fetch_seconds'] += time.perf_counter() - start
+            self.stats['bytes_fetched'] += size
+            if path is None:
+                self.stats['fetch_errors'] += 1
+                self.stats['pdfs_too_large'] += int(too_large)
+            else:
+                self.stats['fetched'] += 1
+        return path
+    
+    def fetch(self, url: str):
+        """Fetch stage: raw bytes for web pages, a temp file path for PDFs"""
+        if self.include_pdfs and self.is_pdf_url(url):
+            return self.fetch_pdf(url)
+        return self.fetch_page(url)
+    
+    def _parse_job(self, url: str, content) -> tuple:
+        """Pick the parse function and arguments for a fetched document"""
+        if self.include_pdfs and self.is_pdf_url(url):
+            return parse_pdf_file, (self.base_url, url, content, self.max_pdf_pages)
+        return parse_page_content, (self.base_url, url, content, self.canonicalize, self.include_pdfs)
+    
+    def enqueue(self, url: str):
+        """Add a URL to the crawl frontier unless it was already visited or queued"""
+        canonical = self.canonicalize_url(url)
+        self._note_variant(url, canonical)
+        if self.is_pdf_url(canonical) and not self.include_pdfs:
+            return
+        if canonical not in self.visited_urls and canonical not in self.queued_urls:
+            self.queued_urls.add(canonical)
+            self.urls_to_visit.append(canonical)
+    
+    def save_checkpoint(self):
+        """Atomically persist frontier, visited set and extracted pages"""
+        if not self.checkpoint_path:
+            return
+        
+        if self.writer:
+            self.writer.flush()
+        
+        state = {
+            'base_url': self.base_url,
+            'frontier': list(self._in_flight) + list(self.urls_to_visit),
+            'visited': sorted(self.visited_urls - self._in_flight),
+            'skipped': sorted(self.skipped_urls),
+            'sitemap_lastmod': self.sitemap_lastmod,
+            'url_variants': sorted(self.url_variants),
+            'scraped_data': self.scraped_data,
+            'stream_output': self.stream_output,
+            'duplicates': self.duplicates,
+            'boilerplate': self.boilerplate.to_dict(),
+            'stats': self.stats,
+            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            # os.replace is atomic, so a crash never leaves a half-written checkpoint
+            os.replace(tmp_path, self.checkpoint_path)
+            self._pages_since_checkpoint = 0
+        except Exception as e:
+            print(f"Error saving checkpoint: {e}")
+    
+    def load_checkpoint(self) -> bool:
+        """Restore crawl state saved by save_checkpoint"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            print(f"Error loading checkpoint: {e}")
+            return False
+        
+        if state.get('base_url') != self.base_url:
+            print(f"⚠️ Checkpoint is for {state.get('base_url')}, not {self.base_url}; ignoring it")
+            return False
+        
+        self.urls_to_visit = deque(state['frontier'])
+        self.queued_urls = set(state['frontier'])
+        self.visited_urls = set(state['visited'])
+        self.skipped_urls = set(state.get('skipped', []))
+        self.sitemap_lastmod = state.get('sitemap_lastmod', {})
+        self.url_variants = set(state.get('url_variants', []))
+        self.scraped_data = state['scraped_data']
+        self.duplicates = state.get('duplicates', {})
+        self.boilerplate.load_dict(state.get('boilerplate', {}))
+        self.stats.update(state.get('stats', {}))
+        
+        # Rebuild page totals and the duplicate index from the kept pages
+        self.stats['pages'] = self.stats['words'] = self.stats['pages_with_sections'] = 0
+        for record in self.scraped_data:
+            self._count_page(record)
+        
+        if self.stream_output and os.path.exists(self.stream_output):
+            # Pages streamed after the last checkpoint are already in the output
+            # file; count them as done instead of fetching them again
+            for record in iter_records(self.stream_output):
+                self.visited_urls.add(record['url'])
+                self._count_page(record)
+        
+        print(f"♻️ Resumed from {self.checkpoint_path} ({state.get('saved_at')}): "
+              f"{self.stats['pages']} pages done, {len(self.urls_to_visit)} queued")
+        return True
+    
+    def _maybe_checkpoint(self):
+        """Save a checkpoint once enough pages have completed"""
+        self._pages_since_checkpoint += 1
+        if self._pages_since_checkpoint >= self.checkpoint_every:
+            self.save_checkpoint()
+    
+    def _count_page(self, page_data: Dict):
+        """Keep running totals so summaries work without the pages in memory"""
+        self.stats['pages'] += 1
+        self.stats['words'] += page_data['word_count']
+        if page_data['sections']:
+            self.stats['pages_with_sections'] += 1
+        if page_data.get('fingerprint'):
+            self.duplicate_index.add(int(page_data['fingerprint'], 16), page_data['url'])
+    
+    def _find_duplicate(self, page_data: Dict) -> Optional[str]:
+        """Return the URL of an already collected near-duplicate of this page"""
+        if not self.dedup or not page_data.get('fingerprint'):
+            return None
+        return self.duplicate_index.find(int(page_data['fingerprint'], 16))
+    
+    def _emit(self, page_data: Dict):
+        """Hand an extracted page to the output: the stream file or scraped_data"""
+        if self.writer:
+            self.writer.write(page_data)
+        else:
+            self.scraped_data.append(page_data)
+        self._count_page(page_data)
+    
+    def _handle_parsed(self, result: Dict) -> List[str]:
+        """Merge a parse result back into the crawl state and the frontier"""
+        self.stats['parsed'] += 1
+        self.stats['parse_seconds'] += result['parse_time']
+        if result.get('pdf'):
+            self.stats['pdfs'] += 1
+        self.url_variants.update(result.get('variants', []))
+        
+        page_data = result['page']
+        if not page_data:
+            return []
+        
+        canonical = result.get('canonical')
+        if canonical and canonical != page_data['url']:
+            if canonical in self.visited_urls:
+                # Another spelling of a page that was already fetched
+                self.url_variants.add(page_data['url'])
+                print(f"≡ {page_data['url']} declares canonical {canonical}, already crawled")
+                links = self.select_links(result['links'])
+                for link in links:
+                    self.enqueue(link)
+                return links
+            # Index the page under its canonical URL and never fetch that one separately
+            self.visited_urls.add(canonical)
+            self.skipped_urls.add(canonical)
+            self.url_variants.add(page_data['url'])
+            page_data['url'] = canonical
+        
+        if page_data['url'] in self.sitemap_lastmod:
+            page_data['lastmod'] = self.sitemap_lastmod[page_data['url']]
+        
+        duplicate_of = self._find_duplicate(page_data)
+        if duplicate_of:
+            # Skip the copy before it becomes chunks and embeddings downstream
+            self.duplicates[page_data['url']] = duplicate_of
+            self.stats['near_duplicates'] += 1
+            self.stats['embeddings_saved'] += estimate_chunks(page_data['content'])
+            print(f"≈ Near-duplicate of {duplicate_of}: {page_data['url']}")
+        else:
+            self.boilerplate.observe(result['blocks'], page_data['url'])
+            self._emit(page_data)
+            print(f"✓ Scraped: {page_data['title'][:50]}... ({page_data['word_count']} words)")
+        
+        # Find more links to scrape. They are queued even past max_pages so a
+        # checkpoint keeps the full frontier for a resumed, longer crawl.
+        links = self.select_links(result['links'])
+        for link in links:
+            self.enqueue(link)
+        return links
+    
+    def scrape_page(self, url: str) -> List[str]:
+        """Scrape a single page in the calling thread"""
+        content = self.fetch(url)
+        if content is None:
+            return []
+        
+        try:
+            parse, args = self._parse_job(url, content)
+            result = parse(*args)
         except Exception as e:
+            self.stats['parse_errors'] += 1
             print(f"Error scraping {url}: {str(e)}")
+            return []
         
-        return []
+        return self._handle_parsed(result)
+    
+    def _next_url(self) -> Optional[str]:
+        """Pop the next unvisited URL from the frontier and mark it visited"""
+        while self.urls_to_visit:
+            url = self.urls_to_visit.popleft()
+            self.queued_urls.discard(url)
+            if url in self.visited_urls:
+                continue
+            if self.is_pdf_url(url) and not self.include_pdfs:
+                # Queued by a checkpointed crawl that had PDFs enabled
+                continue
+            self.visited_urls.add(url)
+            if not self.can_fetch(url):
+                self.skipped_urls.add(url)
+                self.stats['robots_disallowed'] += 1
+                continue
+            return url
+        return None
+    
+    def _scrape_sequential(self):
+        """Fetch and parse one page at a time"""
+        while self._budget_left():
+            current_url = self._next_url()
+            if current_url is None:
+                break
+            self._in_flight = {current_url}
+            self.scrape_page(current_url)
+            self._in_flight = set()
+            self._maybe_checkpoint()
     
-    def scrape_website(self) -> List[Dict]:
+    def _scrape_pipelined(self):
+        """Two-stage crawl: fetch threads feed raw bytes to parse processes"""
+        fetches = {}
+        parses = {}
+        # Keep at most two pages per parse worker waiting, so fetching can't race ahead
+        max_pending_parses = self.parse_workers * 2
+        
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetch_pool, \
+                ProcessPoolExecutor(max_workers=self.parse_workers) as parse_pool:
+            while True:
+                while (len(fetches) < self.fetch_workers and
+                       len(parses) < max_pending_parses and
+                       self._budget_left()):
+                    url = self._next_url()
+                    if url is None:
+                        break
+                    fetches[fetch_pool.submit(self.fetch, url)] = url
+                
+                self._in_flight = set(fetches.values()) | set(parses.values())
+                if not fetches and not parses:
+                    break
+                
+                done, _ = wait(list(fetches) + list(parses), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        url = fetches.pop(future)
+                        content = future.result()
+                        if content is not None:
+                            parse, args = self._parse_job(url, content)
+                            parses[parse_pool.submit(parse, *args)] = url
+                        else:
+                            self._in_flight.discard(url)
+                            self._maybe_checkpoint()
+                    else:
+                        url = parses.pop(future)
+                        try:
+                            self._handle_parsed(future.result())
+                        except Exception as e:
+                            self.stats['parse_errors'] += 1
+                            print(f"Error scraping {url}: {str(e)}")
+                        self._in_flight.discard(url)
+                        self._maybe_checkpoint()
+    
+    def scrape_website(self, resume: bool = False) -> List[Dict]:
         """Main scraping function"""
         print(f"🚀 Starting scrape of {self.base_url}")
         
+        if self.respect_robots:
+            self.load_robots()
+        
+        resumed = resume and self.load_checkpoint()
+        if not resumed:
+            self._seed_frontier()
+        
+        # Read unchanged pages from a side copy if the output file is about to be rewritten
+        previous_source = None
+        if self.unchanged_urls:
+            previous_source = self.previous_output
+            if self.stream_output and os.path.abspath(previous_source) == os.path.abspath(self.stream_output):
+                directory, name = os.path.split(previous_source)
+                previous_source = os.path.join(directory, f".prev-{name}")
+                os.replace(self.previous_output, previous_source)
+        
+        if self.stream_output:
+            self.writer = JSONLWriter(self.stream_output, append=resumed)
+            print(f"📝 Streaming pages to {self.stream_output}")
+        
+        start = time.perf_counter()
+        try:
+            if previous_source:
+                self._carry_forward_unchanged(previous_source)
+            
+            if self.parse_workers > 0:
+                print(f"⚙️ Pipelined crawl: {self.fetch_workers} fetch threads, {self.parse_workers} parse processes")
+                self._scrape_pipelined()
+            else:
+                self._scrape_sequential()
+        finally:
+            self.stats['wall_seconds'] += time.perf_counter() - start
+            # Also runs on Ctrl+C or an unexpected error, keeping everything done so far
+            self.save_checkpoint()
+            if self.writer:
+                self.writer.close()
+                self.writer = None
+        
+        if self.strip_boilerplate:
+            self.remove_boilerplate()
+        
+        self.stats['canonical_collapsed'] = len(self.url_variants)
+        
+        print(f"✅ Scraping complete! Collected {self.stats['pages']} pages")
+        if self.stats['canonical_collapsed']:
+            print(f"🔗 URL canonicalisation collapsed {self.stats['canonical_collapsed']} duplicate URLs (fetches avoided)")
+        if self.stats['unchanged_skipped']:
+            print(f"🗺️ {self.stats['unchanged_skipped']} unchanged pages were not refetched")
+        if self.stats['near_duplicates']:
+            print(f"🧬 Skipped {self.stats['near_duplicates']} near-duplicate pages "
+                  f"(~{self.stats['embeddings_saved']} embeddings saved)")
+        print("⏱️ Pipeline stats:")
+        for key, value in self.get_pipeline_stats().items():
+            print(f"  {key}: {value}")
+        return self.scraped_data
+    
+    def remove_boilerplate(self):
+        """Strip site-wide repeated blocks from the collected pages
+
+        Streamed output is rewritten in place through a temporary file.
+        """
+        blocks = self.boilerplate.boilerplate_blocks()
+        if not blocks:
+            return
+        
+        totals = {'chars_before': 0, 'chars_after': 0, 'chunks_before': 0, 'chunks_after': 0}
+        words = 0
+        
+        def strip_all(records):
+            nonlocal words
+            for record in records:
+                totals['chars_before'] += len(record['content'])
+                totals['chunks_before'] += estimate_chunks(record['content'])
+                record = self.boilerplate.strip(record, blocks)
+                totals['chars_after'] += len(record['content'])
+                totals['chunks_after'] += estimate_chunks(record['content'])
+                words += record['word_count']
+                yield record
+        
+        if self.stream_output:
+            directory, name = os.path.split(self.stream_output)
+            tmp_path = os.path.join(directory, f".tmp-{name}")
+            save_records(strip_all(iter_records(self.stream_output)), tmp_path)
+            os.replace(tmp_path, self.stream_output)
+        else:
+            self.scraped_data = list(strip_all(self.scraped_data))
+        
+        self.stats['words'] = words
+        self.stats.update({f"boilerplate_{key}": value for key, value in totals.items()})
+        saved = totals['chars_before'] - totals['chars_after']
+        percent = 100 * saved / totals['chars_before'] if totals['chars_before'] else 0.0
+        print(f"✂️ Stripped {len(blocks)} boilerplate blocks: {saved:,} characters ({percent:.1f}%), "
+              f"~{totals['chunks_before'] - totals['chunks_after']} chunks fewer")
+    
+    def _seed_frontier(self):
+        """Queue the start pages of a fresh crawl"""
         # Start with main page
-        urls_to_visit = [self.base_url]
+        self.enqueue(self.base_url)
         
-        # Add some important pages directly
+        sitemap_entries = self.discover_sitemap_urls() if self.use_sitemaps else {}
+        if sitemap_entries:
+            previous = self._previous_versions()
+            for url, lastmod in sitemap_entries.items():
+                if lastmod:
+                    self.sitemap_lastmod[url] = lastmod
+                if is_unchanged(lastmod, previous.get(url)):
+                    self.unchanged_urls.add(url)
+                    self.visited_urls.add(url)
+                    self.skipped_urls.add(url)
+                else:
+                    self.enqueue(url)
+            
+            self.stats['sitemap_urls'] = len(sitemap_entries)
+            self.stats['unchanged_skipped'] = len(self.unchanged_urls)
+            print(f"🗺️ Sitemap lists {len(sitemap_entries)} pages, "
+                  f"{len(self.unchanged_urls)} unchanged since the last crawl")
+            return
+        
+        # No sitemap - fall back to likely section pages
         important_urls = [
             f"{self.base_url}/programs",
             f"{self.base_url}/admission", 
@@ -227,53 +961,287 @@ class APEXWebScraper:
             f"{self.base_url}/contact"
         ]
         
-        urls_to_visit.extend(important_urls)
-        
-        while urls_to_visit and len(self.visited_urls) < self.max_pages:
-            current_url = urls_to_visit.pop(0)
-            
-            if current_url in self.visited_urls:
-                continue
-            
-            self.visited_urls.add(current_url)
-            
-            # Scrape the page
-            new_links = self.scrape_page(current_url)
-            if new_links:
-                # Add new links to queue (prioritize unvisited)
-                for link in new_links:
-                    if link not in self.visited_urls:
-                        urls_to_visit.append(link)
-            
-            # Be respectful - add delay
-            time.sleep(1)
-        
-        print(f"✅ Scraping complete! Collected {len(self.scraped_data)} pages")
-        return self.scraped_data
+        for url in important_urls:
+            self.enqueue(url)
     
     def save_data(self, filename: str = "apex_college_data.json"):
-        """Save scraped data to JSON file"""
+        """Save scraped data to a JSON file, or JSON Lines for *.jsonl[.gz|.zst]"""
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.scraped_data, f, indent=2, ensure_ascii=False)
+            save_records(self.scraped_data, filename)
             print(f"💾 Data saved to {filename}")
         except Exception as e:
             print(f"Error saving data: {e}")
     
     def get_summary(self) -> Dict:
         """Get summary of scraped data"""
-        if not self.scraped_data:
+        if not self.stats['pages']:
             return {"status": "No data scraped"}
         
-        total_words = sum(item['word_count'] for item in self.scraped_data)
+        total_words = self.stats['words']
         
         return {
-            "total_pages": len(self.scraped_data),
+            "total_pages": self.stats['pages'],
             "total_words": total_words,
-            "average_words_per_page": total_words / len(self.scraped_data),
-            "pages_with_sections": len([item for item in self.scraped_data if item['sections']]),
-            "sample_titles": [item['title'][:50] + "..." for item in self.scraped_data[:5]]
+            "average_words_per_page": total_words / self.stats['pages'],
+            "pages_with_sections": self.stats['pages_with_sections'],
+            "near_duplicates_skipped": self.stats['near_duplicates'],
+            "embeddings_saved": self.stats['embeddings_saved'],
+            "boilerplate_chars_removed": self.stats.get('boilerplate_chars_before', 0) - self.stats.get('boilerplate_chars_after', 0),
+            "boilerplate_chunks_removed": self.stats.get('boilerplate_chunks_before', 0) - self.stats.get('boilerplate_chunks_after', 0),
+            "sample_titles": [item['title'][:50] + "..." for item in self.scraped_data[:5]],
+            "pipeline": self.get_pipeline_stats()
         }
+    
+    def get_pipeline_stats(self) -> Dict:
+        """Get per-stage throughput of the crawl"""
+        stats = self.stats
+        wall = stats['wall_seconds']
+        return {
+            "fetched_pages": stats['fetched'],
+            "fetch_errors": stats['fetch_errors'],
+            "megabytes_fetched": round(stats['bytes_fetched'] / 1e6, 2),
+            "avg_fetch_ms": round(1000 * stats['fetch_seconds'] / stats['fetched'], 1) if stats['fetched'] else 0.0,
+            "fetch_pages_per_sec": round(stats['fetched'] / wall, 2) if wall else 0.0,
+            "parsed_pages": stats['parsed'],
+            "parse_errors": stats['parse_errors'],
+            "avg_parse_ms": round(1000 * stats['parse_seconds'] / stats['parsed'], 1) if stats['parsed'] else 0.0,
+            "parse_pages_per_sec": round(stats['parsed'] / wall, 2) if wall else 0.0,
+            "sitemap_urls": stats['sitemap_urls'],
+            "unchanged_skipped": stats['unchanged_skipped'],
+            "robots_disallowed": stats['robots_disallowed'],
+            "canonical_collapsed": stats['canonical_collapsed'],
+            "pdfs": stats['pdfs'],
+            "pdfs_too_large": stats['pdfs_too_large'],
+            "wall_seconds": round(wall, 2),
+        }
+
+class NearDuplicateIndex:
+    """SimHash fingerprints bucketed into LSH bands for near-duplicate lookup
+
+    Each 64-bit fingerprint is split into `bands` equal slices. Two fingerprints
+    within max_distance bits (max_distance < bands) must agree on at least one
+    whole slice, so only pages sharing a bucket need a Hamming-distance check.
+    """
+    
+    def __init__(self, max_distance: int = 3, bands: int = 4):
+        if max_distance >= bands:
+            raise ValueError("bands must be greater than max_distance")
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = 64 // bands
+        self.buckets = {}
+    
+    def _band_keys(self, fingerprint: int) -> List[tuple]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+    
+    def find(self, fingerprint: int) -> Optional[str]:
+        """Return the URL of a stored page within max_distance bits, if any"""
+        for key in self._band_keys(fingerprint):
+            for other, url in self.buckets.get(key, []):
+                if bin(fingerprint ^ other).count('1') <= self.max_distance:
+                    return url
+        return None
+    
+    def add(self, fingerprint: int, url: str):
+        """Store a fingerprint under each of its band buckets"""
+        for key in self._band_keys(fingerprint):
+            self.buckets.setdefault(key, []).append((fingerprint, url))
+
+class BoilerplateDetector:
+    """Count on how many pages each text block appears, across the whole crawl
+
+    A block seen on at least `threshold` of all pages (and at least min_pages
+    pages) is boilerplate. It is kept on the first page it appeared on, so
+    the information is still embedded once, and stripped everywhere else.
+    """
+    
+    def __init__(self, threshold: float = 0.5, min_pages: int = 3):
+        self.threshold = threshold
+        self.min_pages = min_pages
+        self.pages = 0
+        self.block_counts = Counter()
+        self.first_seen = {}
+    
+    def observe(self, blocks: List[str], url: str):
+        """Record the distinct blocks of one page"""
+        self.pages += 1
+        for block in set(blocks):
+            self.block_counts[block] += 1
+            self.first_seen.setdefault(block, url)
+    
+    def boilerplate_blocks(self) -> List[str]:
+        """Blocks over the threshold, longest first so nested repeats strip cleanly"""
+        min_count = max(self.min_pages, self.threshold * self.pages)
+        blocks = [block for block, count in self.block_counts.items() if count >= min_count]
+        return sorted(blocks, key=len, reverse=True)
+    
+    def strip(self, page_data: Dict, blocks: List[str]) -> Dict:
+        """Remove boilerplate blocks from a page's content and sections"""
+        def strip_text(text):
+            for block in blocks:
+                if self.first_seen.get(block) != page_data['url']:
+                    text = text.replace(block, ' ')
+            return re.sub(r'\s+', ' ', text).strip()
+        
+        page_data['content'] = strip_text(page_data['content'])
+        for section in page_data.get('sections', []):
+            section['content'] = strip_text(section['content'])
+        page_data['sections'] = [section for section in page_data.get('sections', []) if section['content']]
+        page_data['word_count'] = len(page_data['content'].split())
+        return page_data
+    
+    def to_dict(self) -> Dict:
+        """Serializable state for crawl checkpoints"""
+        return {'pages': self.pages, 'block_counts': dict(self.block_counts), 'first_seen': self.first_seen}
+    
+    def load_dict(self, state: Dict):
+        """Restore state saved by to_dict"""
+        self.pages = state.get('pages', 0)
+        self.block_counts = Counter(state.get('block_counts', {}))
+        self.first_seen = state.get('first_seen', {})
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of a text over word shingles"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    
+    weights = [0] * 64
+    for shingle in set(shingles):
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        bits = int.from_bytes(digest, 'big')
+        for bit in range(64):
+            weights[bit] += 1 if (bits >> bit) & 1 else -1
+    
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+                   '_ga', '_gl', 'ref', 'ref_src', 'sessionid', 'phpsessid', 'jsessionid'}
+
+def is_tracking_param(name: str) -> bool:
+    """Check if a query parameter only tracks the visitor and never changes the page"""
+    name = name.lower()
+    return name.startswith('utm_') or name in TRACKING_PARAMS
+
+def strip_www(host: str) -> str:
+    """Drop a leading www. from a host name"""
+    return host[4:] if host.startswith('www.') else host
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime (sitemap lastmod) or a scraped_at timestamp"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    # Naive times are taken as local time, like scraped_at
+    return parsed.astimezone()
+
+def is_unchanged(lastmod: Optional[str], previous: Optional[str]) -> bool:
+    """True when a page's lastmod is not newer than what the previous crawl saw"""
+    lastmod_time = parse_timestamp(lastmod)
+    previous_time = parse_timestamp(previous)
+    return lastmod_time is not None and previous_time is not None and lastmod_time <= previous_time
+
+def estimate_chunks(text: str, chunk_size: int = 1000, overlap: int = 100) -> int:
+    """Approximate how many chunks (and so embeddings) rag_pipeline makes of a text"""
+    if len(text) <= chunk_size:
+        return 1
+    return math.ceil((len(text) - overlap) / (chunk_size - overlap))
+
+def parse_page_content(base_url: str, url: str, content: bytes, canonicalize: bool = True,
+                       include_pdfs: bool = True) -> Dict:
+    """Parse raw page bytes into extracted content and outgoing links.
+
+    Kept at module level so it can be shipped to ProcessPoolExecutor workers.
+    """
+    start = time.perf_counter()
+    parser = APEXWebScraper(base_url, canonicalize=canonicalize, include_pdfs=include_pdfs)
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    canonical = parser.find_canonical_link(soup, url)
+    page_data = parser.extract_content(soup, url)
+    links = parser.find_internal_links(soup, url) if page_data else []
+    blocks = []
+    if page_data:
+        page_data['fingerprint'] = f"{simhash(page_data['content']):016x}"
+        blocks = parser.extract_blocks(soup)
+    
+    return {
+        'url': url,
+        'page': page_data,
+        'links': links,
+        'blocks': blocks,
+        'canonical': canonical,
+        'variants': sorted(parser.url_variants),
+        'parse_time': time.perf_counter() - start
+    }
+
+def parse_pdf_file(base_url: str, url: str, path: str, max_pages: int = 200) -> Dict:
+    """Extract a downloaded PDF page by page into a record shaped like extract_content's
+
+    Runs in parse workers. Pages are read one at a time from the temp file
+    written by fetch_pdf, which is deleted afterwards.
+    """
+    start = time.perf_counter()
+    parser = APEXWebScraper(base_url)
+    page_data = None
+    
+    try:
+        if PdfReader is None:
+            raise ImportError("pypdf is required for PDF ingestion: pip install pypdf")
+        
+        reader = PdfReader(path)
+        sections = []
+        for number, page in enumerate(reader.pages, 1):
+            if number > max_pages:
+                break
+            try:
+                text = parser.clean_text(page.extract_text() or '')
+            except Exception as e:
+                print(f"Error extracting page {number} of {url}: {e}")
+                continue
+            if text:
+                sections.append({'heading': f"Page {number}", 'content': text})
+        
+        content = ' '.join(section['content'] for section in sections)
+        if len(content) >= 100:
+            metadata_title = reader.metadata.title if reader.metadata else None
+            title = parser.clean_text(metadata_title or '') or os.path.basename(urlparse(url).path)
+            page_data = {
+                'url': url,
+                'title': title,
+                'description': '',
+                'content': content,
+                'headings': [section['heading'] for section in sections],
+                'sections': sections,
+                'word_count': len(content.split()),
+                'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'content_type': 'application/pdf',
+                'page_count': len(reader.pages),
+                'fingerprint': f"{simhash(content):016x}"
+            }
+    finally:
+        os.remove(path)
+    
+    return {
+        'url': url,
+        'page': page_data,
+        'links': [],
+        'blocks': [],
+        'canonical': None,
+        'variants': [],
+        'pdf': True,
+        'parse_time': time.perf_counter() - start
+    }
 
 def create_sample_data():
     """Create sample APEX data if scraping fails"""
@@ -426,16 +1394,78 @@ def create_sample_data():
     return sample_data
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the APEX College website")
+    parser.add_argument("--base-url", default="https://www.apex.ac.in")
+    parser.add_argument("--max-pages", type=int, default=50)
+    parser.add_argument("--fetch-workers", type=int, default=1,
+                        help="Concurrent download threads")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Parse processes (0 parses in the fetching thread)")
+    parser.add_argument("--delay", type=float, default=1.0,
+                        help="Minimum seconds between requests")
+    parser.add_argument("--checkpoint", default="crawl_checkpoint.json",
+                        help="Crawl state file, rewritten atomically during the crawl")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="Pages between checkpoints")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the crawl saved in --checkpoint")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep near-duplicate pages instead of skipping them")
+    parser.add_argument("--dedup-distance", type=int, default=3,
+                        help="Max SimHash bit difference for pages to count as near-duplicates")
+    parser.add_argument("--keep-boilerplate", action="store_true",
+                        help="Don't strip text blocks repeated across pages")
+    parser.add_argument("--boilerplate-threshold", type=float, default=0.5,
+                        help="Fraction of pages a block must appear on to count as boilerplate")
+    parser.add_argument("--ignore-robots", action="store_true",
+                        help="Don't read robots.txt rules and crawl-delay")
+    parser.add_argument("--no-sitemap", action="store_true",
+                        help="Seed from guessed section URLs instead of sitemap.xml")
+    parser.add_argument("--previous", default=None,
+                        help="Previous crawl output used to skip unchanged pages (defaults to --output)")
+    parser.add_argument("--no-canonicalize", action="store_true",
+                        help="Treat every URL spelling as a separate page")
+    parser.add_argument("--no-pdfs", action="store_true",
+                        help="Skip linked PDF documents")
+    parser.add_argument("--max-pdf-mb", type=float, default=20.0,
+                        help="Largest PDF to download, in megabytes")
+    parser.add_argument("--max-pdf-pages", type=int, default=200,
+                        help="Pages extracted per PDF")
+    parser.add_argument("--output", default="apex_college_data.json",
+                        help="Output file; *.jsonl, *.jsonl.gz or *.jsonl.zst streams pages as they are extracted")
+    args = parser.parse_args()
+    
     # Example usage
-    scraper = APEXWebScraper(max_pages=50)
+    scraper = APEXWebScraper(
+        base_url=args.base_url,
+        max_pages=args.max_pages,
+        fetch_workers=args.fetch_workers,
+        parse_workers=args.parse_workers,
+        delay=args.delay,
+        checkpoint_path=args.checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        stream_output=args.output if is_jsonl(args.output) else None,
+        dedup=not args.no_dedup,
+        dedup_distance=args.dedup_distance,
+        strip_boilerplate=not args.keep_boilerplate,
+        boilerplate_threshold=args.boilerplate_threshold,
+        respect_robots=not args.ignore_robots,
+        use_sitemaps=not args.no_sitemap,
+        previous_output=args.previous or args.output,
+        canonicalize=not args.no_canonicalize,
+        include_pdfs=not args.no_pdfs,
+        max_pdf_bytes=int(args.max_pdf_mb * 1_000_000),
+        max_pdf_pages=args.max_pdf_pages
+    )
     
     try:
         # Try scraping
-        data = scraper.scrape_website()
+        scraper.scrape_website(resume=args.resume)
         
-        if data:
-            # Save scraped data
-            scraper.save_data()
+        if scraper.stats['pages']:
+            # Streamed pages are already on disk
+            if not scraper.stream_output:
+                scraper.save_data(args.output)
             
             # Print summary
             summary = scraper.get_summary()
@@ -447,17 +1477,19 @@ if __name__ == "__main__":
             sample_data = create_sample_data()
             
             # Save sample data
-            with open("apex_college_data.json", 'w', encoding='utf-8') as f:
-                json.dump(sample_data, f, indent=2, ensure_ascii=False)
+            save_records(sample_data, args.output)
             
             print("✅ Sample data created and saved!")
             
     except Exception as e:
         print(f"❌ Scraping failed: {e}")
-        print("Creating sample data as fallback...")
-        
-        sample_data = create_sample_data()
-        with open("apex_college_data.json", 'w', encoding='utf-8') as f:
-            json.dump(sample_data, f, indent=2, ensure_ascii=False)
         
-        print("✅ Sample data created!")
\ No newline at end of file
+        if scraper.stats['pages'] and scraper.stream_output:
+            print(f"💾 {scraper.stats['pages']} pages already streamed to {args.output}; keeping them")
+        else:
+            print("Creating sample data as fallback...")
+            
+            sample_data = create_sample_data()
+            save_records(sample_data, args.output)
+            
+            print("✅ Sample data created!")
\ No newline at end of file